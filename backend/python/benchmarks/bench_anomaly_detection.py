@@ -0,0 +1,137 @@
+"""
+Sensor anomaly detection benchmark
+
+Generates a labelled synthetic stream (daily cycle plus noise per sensor,
+with injected spikes and level shifts), scores it batch by batch with
+AnomalyDetector, and reports throughput, per-batch latency and
+precision/recall against the injected anomalies. Readings in the first
+SHIFT_SETTLE_TICKS after a level shift, while the detector adapts to the
+new level, are left out of both. The z-score detector is run alone and
+together with the IsolationForest.
+
+Usage:
+    python -m benchmarks.bench_anomaly_detection --sensors 5000 --ticks 200
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from iot_processor.anomaly import AnomalyDetector
+from iot_processor.ingestion import ReadingFrame
+
+TICK_MS = 10_000
+SPIKE_RATE = 5e-4
+SHIFT_RATE = 1e-4
+SHIFT_SETTLE_TICKS = 60
+
+
+def synthetic_stream(sensors: int, ticks: int, seed: int = 0):
+    """Yield (ReadingFrame, labels) per tick; labels are '', 'spike', 'shift' or 'settling' per reading"""
+    rng = np.random.default_rng(seed)
+    sensor_ids = np.array([f"sensor-{i}" for i in range(sensors)], dtype=object)
+    units = np.full(sensors, 'C', dtype=object)
+    level = rng.uniform(10.0, 1000.0, sensors)
+    amplitude = level * rng.uniform(0.01, 0.1, sensors)
+    noise = level * rng.uniform(0.002, 0.01, sensors)
+    phase = rng.uniform(0, 2 * np.pi, sensors)
+    offset = np.zeros(sensors)
+    shifted_at = np.full(sensors, -SHIFT_SETTLE_TICKS - 1)
+    start_ms = int(time.time() * 1000) - ticks * TICK_MS
+
+    for tick in range(ticks):
+        timestamp = start_ms + tick * TICK_MS
+        labels = np.full(sensors, '', dtype=object)
+        labels[tick - shifted_at <= SHIFT_SETTLE_TICKS] = 'settling'
+
+        shifts = rng.random(sensors) < SHIFT_RATE
+        offset[shifts] += rng.choice([-1, 1], shifts.sum()) * rng.uniform(8, 12, shifts.sum()) * noise[shifts]
+        labels[shifts] = 'shift'
+        shifted_at[shifts] = tick
+
+        values = (level + offset + noise * rng.standard_normal(sensors)
+                  + amplitude * np.sin(2 * np.pi * timestamp / 86_400_000 + phase))
+
+        spikes = (rng.random(sensors) < SPIKE_RATE) & ~shifts
+        values[spikes] += rng.choice([-1, 1], spikes.sum()) * rng.uniform(6, 12, spikes.sum()) * noise[spikes]
+        labels[spikes] = 'spike'
+
+        yield ReadingFrame(sensor_ids, np.full(sensors, timestamp, dtype=np.int64), values, units), labels
+
+
+def evaluate(detector: AnomalyDetector, sensors: int, ticks: int, warmup_ticks: int) -> dict:
+    """Score the stream and compare flags with the injected labels"""
+    latencies = []
+    flagged = expected = hits = 0
+    recall_by_kind = {'spike': [0, 0], 'shift': [0, 0]}
+
+    for tick, (frame, labels) in enumerate(synthetic_stream(sensors, ticks)):
+        start = time.perf_counter()
+        scores = detector.score(frame)
+        latencies.append(time.perf_counter() - start)
+
+        if tick < warmup_ticks:
+            continue
+
+        # All readings of a tick share one timestamp, so scores are in sensor order
+        order = np.argsort(frame.sensor_ids.astype(str), kind='stable')
+        labels = labels[order]
+        scored = labels != 'settling'
+        truth = (labels == 'spike') | (labels == 'shift')
+        flagged += int((scores.anomalous & scored).sum())
+        expected += int(truth.sum())
+        hits += int((scores.anomalous & truth).sum())
+        for kind, counts in recall_by_kind.items():
+            is_kind = labels == kind
+            counts[0] += int((scores.anomalous & is_kind).sum())
+            counts[1] += int(is_kind.sum())
+
+    latencies = np.array(latencies[warmup_ticks:] or latencies)
+    seconds = float(latencies.sum())
+    precision = hits / flagged if flagged else None
+    recall = hits / expected if expected else None
+    return {
+        'readings': sensors * len(latencies),
+        'readings_per_second': round(sensors * len(latencies) / seconds) if seconds else None,
+        'batch_ms_p50': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'batch_ms_p99': round(float(np.percentile(latencies, 99)) * 1000, 2),
+        'batch_ms_max': round(float(latencies.max()) * 1000, 2),
+        'flagged': flagged,
+        'injected': expected,
+        'precision': round(precision, 3) if precision is not None else None,
+        'recall': round(recall, 3) if recall is not None else None,
+        'f1': round(2 * precision * recall / (precision + recall), 3) if precision and recall else None,
+        'recall_by_kind': {
+            kind: round(found / total, 3) if total else None for kind, (found, total) in recall_by_kind.items()
+        }
+    }
+
+
+def run_benchmark(sensors: int, ticks: int, threshold: float, forest_retrain_readings: int) -> dict:
+    """Run the z-score detector alone and with the IsolationForest"""
+    warmup_ticks = 30
+    results = {'sensors': sensors, 'ticks': ticks, 'batch_size': sensors, 'threshold': threshold}
+    results['zscore'] = evaluate(AnomalyDetector(threshold=threshold, seed=0), sensors, ticks, warmup_ticks)
+    results['zscore_forest'] = evaluate(
+        AnomalyDetector(threshold=threshold, forest=True,
+                        forest_retrain_readings=forest_retrain_readings, seed=0),
+        sensors, ticks, warmup_ticks
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sensor anomaly detection')
+    parser.add_argument('--sensors', type=int, default=5000)
+    parser.add_argument('--ticks', type=int, default=200, help='Readings per sensor (one batch per tick)')
+    parser.add_argument('--threshold', type=float, default=4.0)
+    parser.add_argument('--forest-retrain-readings', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.sensors, args.ticks, args.threshold, args.forest_retrain_readings), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Clash detection throughput benchmark
+
+Builds a synthetic multi-storey model of box-shaped ducts, beams and
+columns scattered over each storey (ducts and beams at ceiling height, so
+many of them cross) and times ducts-against-structure clash detection:
+broad phase, narrow phase, candidate pairs and triangle pairs tested, for
+one and for several worker threads.
+
+Usage:
+    python -m benchmarks.bench_clash --elements 300000 --workers 1 4
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from bim_processor.clash import ClashDetector
+from bim_processor.elements import BIMElement, ElementTable
+from bim_processor.geometry import MeshGeometry
+from bim_processor.processor import BIMModel
+
+STOREY_HEIGHT = 3.0
+FLOOR_SIZE = 200.0
+
+BOX_VERTICES = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float64)
+BOX_FACES = np.array([
+    [0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+    [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]
+], dtype=np.uint32)
+
+
+def _synthetic_model(count: int, storeys: int, rng) -> BIMModel:
+    def elements():
+        for index in range(count):
+            z = (index // 3 % storeys) * STOREY_HEIGHT
+            x, y = rng.uniform(0, FLOOR_SIZE, 2)
+            kind = index % 3
+            if kind == 0:
+                ifc_type, low, size = 'IfcDuctSegment', (x, y, z + 2.4), (rng.uniform(1, 6), 0.4, 0.3)
+            elif kind == 1:
+                ifc_type, low, size = 'IfcBeam', (x, y, z + 2.5), (0.3, rng.uniform(3, 8), 0.5)
+            else:
+                ifc_type, low, size = 'IfcColumn', (x, y, z), (0.4, 0.4, STOREY_HEIGHT)
+            low, size = np.array(low), np.array(size)
+            yield BIMElement(
+                id=str(1000 + index),
+                name=f"{ifc_type[3:]}-{index}",
+                type=ifc_type,
+                global_id=f"{index:022d}",
+                geometry=MeshGeometry(vertices=low + BOX_VERTICES * size, faces=BOX_FACES, type='mesh'),
+                properties={},
+                bounding_box={'min': low.tolist(), 'max': (low + size).tolist()}
+            )
+
+    table = ElementTable.from_elements(elements())
+    return BIMModel(id='synthetic', name='Synthetic', version='IFC4', elements=table,
+                    metadata={}, bounding_box=table.bounding_box())
+
+
+def run_benchmark(elements: int, storeys: int, workers, tolerance: float, clearance: float) -> dict:
+    model = _synthetic_model(elements, storeys, np.random.default_rng(0))
+    runs = []
+    for num_workers in workers:
+        detector = ClashDetector(tolerance=tolerance, clearance=clearance, num_workers=num_workers)
+        start = time.perf_counter()
+        detector.detect(model, ['IfcFlowSegment'], ['IfcBeam', 'IfcColumn'])
+        runs.append({
+            'workers': num_workers,
+            'seconds': round(time.perf_counter() - start, 2),
+            'stages': {name: round(seconds, 2) for name, seconds in detector.metrics.stages.items()},
+            **detector.statistics
+        })
+    return {'elements': elements, 'storeys': storeys, 'tolerance': tolerance, 'clearance': clearance,
+            'runs': runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time clash detection on a synthetic model')
+    parser.add_argument('--elements', type=int, default=300_000)
+    parser.add_argument('--storeys', type=int, default=30)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--tolerance', type=float, default=0.01)
+    parser.add_argument('--clearance', type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.elements, args.storeys, args.workers, args.tolerance, args.clearance),
+                     indent=2))
+
+
+if __name__ == '__main__':
+    main()
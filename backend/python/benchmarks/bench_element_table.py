@@ -0,0 +1,179 @@
+"""
+Element storage memory and query benchmark
+
+Builds a synthetic model of elements with realistic attributes, shared
+property sets, materials and storeys, and compares a list of BIMElement
+objects (with attribute values stringified as _extract_properties used to
+do) against the columnar ElementTable: memory retained per element
+(meshes excluded; every element references one shared mesh) and the time
+of type counts and type/storey filters.
+
+Usage:
+    python -m benchmarks.bench_element_table --elements 500000
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from bim_processor.elements import BIMElement, ElementTable
+from bim_processor.geometry import MeshGeometry
+
+TYPES = ('IfcWall', 'IfcSlab', 'IfcBeam', 'IfcColumn', 'IfcDoor', 'IfcWindow', 'IfcFurnishingElement')
+STOREYS = 40
+MATERIALS = ('Concrete', 'Steel', 'Timber', 'Glass', 'Gypsum')
+
+
+def _shared_property_sets():
+    """One common property set and one quantity set per type, shared by its elements"""
+    return {
+        ifc_type: [
+            {'IsExternal': index % 2 == 0, 'LoadBearing': index % 3 == 0, 'FireRating': f'{index % 4}HR',
+             'Reference': f'{ifc_type}-Standard', 'AcousticRating': 'R45'},
+            {'Width': 0.2 + index / 10, 'Height': 3.0, 'NetVolume': 1.5 * (index + 1), 'GrossArea': 12.0}
+        ]
+        for index, ifc_type in enumerate(TYPES)
+    }
+
+
+def _source_elements(count: int, rng, stringify: bool):
+    """Synthetic processed elements; stringify reproduces the former str() of every attribute"""
+    property_sets = _shared_property_sets()
+    materials = [{'name': name, 'description': '', 'category': ''} for name in MATERIALS]
+    storeys = [f"storey-{index:02d}-{'x' * 10}" for index in range(STOREYS)]
+    mesh = MeshGeometry(vertices=np.zeros((8, 3)), faces=np.zeros((12, 3), dtype=np.int32))
+    type_indices = rng.integers(0, len(TYPES), count)
+    storey_indices = rng.integers(0, STOREYS, count)
+    material_indices = rng.integers(0, len(MATERIALS), count)
+    locations = rng.uniform(0, 100, (count, 3))
+
+    elements = []
+    for index in range(count):
+        ifc_type = TYPES[type_indices[index]]
+        step_id = 1000 + index * 7
+        global_id = f"{index:022d}"
+        name = f"{ifc_type[3:]}:{ifc_type[3:]}-Standard:{index % 50}"
+        if stringify:
+            attributes = {
+                'GlobalId': global_id,
+                'OwnerHistory': '#5=IfcOwnerHistory(#4,#3,$,.ADDED.,1700000000,$,$,1700000000)',
+                'Name': name,
+                'ObjectPlacement': f'#{step_id + 1}=IfcLocalPlacement(#{step_id + 2},#{step_id + 3})',
+                'Representation': f'#{step_id + 4}=IfcProductDefinitionShape($,$,(#{step_id + 5}))',
+                'Tag': str(index),
+                'PredefinedType': 'NOTDEFINED'
+            }
+        else:
+            attributes = {
+                'GlobalId': global_id,
+                'OwnerHistory': '#5',
+                'Name': name,
+                'ObjectPlacement': f'#{step_id + 1}',
+                'Representation': f'#{step_id + 4}',
+                'Tag': str(index),
+                'PredefinedType': 'NOTDEFINED'
+            }
+        properties = dict(attributes)
+        for values in property_sets[ifc_type]:
+            properties.update(values)
+
+        x, y, z = locations[index].tolist()
+        elements.append(BIMElement(
+            id=str(step_id),
+            name=name,
+            type=ifc_type,
+            global_id=global_id,
+            geometry=mesh,
+            properties=properties,
+            material=materials[material_indices[index]],
+            location={'x': x, 'y': y, 'z': z},
+            bounding_box={'min': [x, y, z], 'max': [x + 1.0, y + 0.2, z + 3.0]},
+            storey=storeys[storey_indices[index]]
+        ))
+    return elements
+
+
+def _retained(build) -> tuple:
+    """(result, bytes retained by it) of build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def _best_seconds(function, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(elements: int) -> dict:
+    rng = np.random.default_rng(0)
+
+    legacy, legacy_bytes = _retained(lambda: _source_elements(elements, rng, stringify=True))
+    del legacy
+    gc.collect()
+
+    # The table is measured with everything it references, the source elements freed
+    table, table_bytes = _retained(lambda: ElementTable.from_elements(
+        _source_elements(elements, np.random.default_rng(0), stringify=False)
+    ))
+    source, source_bytes = _retained(lambda: _source_elements(elements, np.random.default_rng(0), stringify=False))
+    pack_seconds = _best_seconds(lambda: ElementTable.from_elements(source), repeat=1)
+
+    storey = table.storeys[0]
+    wanted = {'IfcWall', 'IfcColumn'}
+
+    def list_type_counts():
+        counts = {}
+        for element in source:
+            counts[element.type] = counts.get(element.type, 0) + 1
+        return counts
+
+    def list_filter():
+        return [element for element in source if element.type in wanted and element.storey == storey]
+
+    assert list_type_counts() == table.type_counts()
+    assert [int(element.id) for element in list_filter()] == \
+        table.step_ids[table.select(types=wanted, storeys=[storey])].tolist()
+
+    return {
+        'elements': elements,
+        'memory': {
+            'element_list_stringified_bytes_per_element': round(legacy_bytes / elements, 1),
+            'element_list_bytes_per_element': round(source_bytes / elements, 1),
+            'element_table_bytes_per_element': round(table_bytes / elements, 1),
+            'reduction': round(legacy_bytes / table_bytes, 1) if table_bytes else None,
+            'table_pack_seconds': round(pack_seconds, 3)
+        },
+        'type_counts': {
+            'element_list_ms': round(_best_seconds(list_type_counts) * 1000, 2),
+            'element_table_ms': round(_best_seconds(table.type_counts) * 1000, 2)
+        },
+        'type_and_storey_filter': {
+            'matches': len(table.select(types=wanted, storeys=[storey])),
+            'element_list_ms': round(_best_seconds(list_filter) * 1000, 2),
+            'element_table_ms': round(_best_seconds(lambda: table.select(types=wanted, storeys=[storey])) * 1000, 2)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare element list and columnar element table storage')
+    parser.add_argument('--elements', type=int, default=500_000)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.elements), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Export format size/time benchmark
+
+Processes an IFC file once, then writes it with each exporter and reports
+file size, write time and the time a consumer needs to load the geometry
+back (json.load for the text formats, a GLB header parse plus zero-copy
+accessor views for the binary format).
+
+Usage:
+    python -m benchmarks.bench_export_formats model.ifc --output-dir /tmp/bench
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+
+from bim_processor.gltf import accessor_array, load_glb
+from bim_processor.processor import BIMProcessor
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _load_json(path: str):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        return json.load(f)
+
+
+def _load_ndjson(path: str):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+def _load_glb_geometry(path: str):
+    document, binary = load_glb(path)
+    return [
+        (accessor_array(document, binary, mesh['primitives'][0]['attributes']['POSITION']),
+         accessor_array(document, binary, mesh['primitives'][0]['indices']))
+        for mesh in document.get('meshes', [])
+    ]
+
+
+def run_benchmark(ifc_path: str, output_dir: str) -> dict:
+    """Write the same model in every format and compare size and timings"""
+    processor = BIMProcessor()
+    model, process_seconds = _timed(processor.process_ifc_file, ifc_path)
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, os.path.basename(ifc_path))
+
+    formats = {
+        'json_indented': (f'{base}.json', lambda p: processor.export_to_json(model, p), _load_json),
+        'json_compact': (f'{base}.compact.json', lambda p: processor.export_to_json(model, p, indent=None), _load_json),
+        'ndjson_gzip': (f'{base}.ndjson.gz', lambda p: processor.stream_ifc_file(ifc_path, p, compression='gzip'), _load_ndjson),
+        'glb': (f'{base}.glb', lambda p: processor.export_to_glb(model, p), _load_glb_geometry),
+    }
+
+    results = {'elements': len(model.elements), 'process_seconds': round(process_seconds, 3), 'formats': {}}
+
+    for name, (path, write, load) in formats.items():
+        _, write_seconds = _timed(write, path)
+        _, load_seconds = _timed(load, path)
+        size = os.path.getsize(path)
+        entry = {'bytes': size, 'write_seconds': round(write_seconds, 3), 'load_seconds': round(load_seconds, 4)}
+        if name == 'glb':
+            entry['sidecar_bytes'] = os.path.getsize(path[:-4] + '.meta.json')
+        results['formats'][name] = entry
+
+    baseline = results['formats']['json_indented']
+    for entry in results['formats'].values():
+        entry['size_ratio'] = round(entry['bytes'] / baseline['bytes'], 3)
+        entry['load_speedup'] = round(baseline['load_seconds'] / entry['load_seconds'], 1) if entry['load_seconds'] else None
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare BIM export formats')
+    parser.add_argument('ifc_path', help='Path to the IFC file to process')
+    parser.add_argument('--output-dir', default='bench_exports')
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.ifc_path, args.output_dir), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Level-of-detail benchmark for BIMProcessor
+
+Processes an IFC file without LODs and then with one more coarse level at
+a time, reporting the triangle count and culled elements of each level and
+the processing time each level adds.
+
+Usage:
+    python -m benchmarks.bench_lod model.ifc --ratios 0.25 0.05 --min-sizes 0.1 1.0
+"""
+
+import argparse
+import json
+import time
+
+from bim_processor.lod import DEFAULT_LOD_LEVELS, LodLevel, lod_statistics
+from bim_processor.processor import BIMProcessor
+
+
+def _timed_process(processor: BIMProcessor, ifc_path: str, repeats: int):
+    """Best processing time over repeats, and the last model"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model = processor.process_ifc_file(ifc_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, model
+
+
+def run_benchmark(ifc_path: str, levels: list, repeats: int = 1) -> dict:
+    """Run the LOD benchmark and return per-level triangle counts and time overhead"""
+    baseline_seconds, model = _timed_process(BIMProcessor(), ifc_path, repeats)
+    results = {
+        'elements': len(model.elements),
+        'seconds': round(baseline_seconds, 3),
+        'triangles': lod_statistics(model.elements, [])['triangles'],
+        'levels': []
+    }
+
+    previous_seconds = baseline_seconds
+    for count in range(1, len(levels) + 1):
+        processor = BIMProcessor(lod=True, lod_levels=levels[:count])
+        seconds, model = _timed_process(processor, ifc_path, repeats)
+        statistics = lod_statistics(model.elements, levels[:count])
+        level = statistics['levels'][-1]
+        results['levels'].append({
+            'level': count,
+            'ratio': level['ratio'],
+            'min_size': level['min_size'],
+            'triangles': level['triangles'],
+            'triangle_ratio': round(level['triangle_ratio'], 3),
+            'culled': level['culled'],
+            'seconds_overhead': round(seconds - previous_seconds, 3),
+            'overhead_ratio': round((seconds - previous_seconds) / baseline_seconds, 3) if baseline_seconds else None
+        })
+        previous_seconds = seconds
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark level-of-detail generation')
+    parser.add_argument('ifc_path', help='Path to the IFC file to process')
+    parser.add_argument('--ratios', type=float, nargs='+',
+                        default=[level.ratio for level in DEFAULT_LOD_LEVELS])
+    parser.add_argument('--min-sizes', type=float, nargs='+',
+                        default=[level.min_size for level in DEFAULT_LOD_LEVELS])
+    parser.add_argument('--repeats', type=int, default=1)
+    args = parser.parse_args()
+
+    if len(args.ratios) != len(args.min_sizes):
+        parser.error('--ratios and --min-sizes need the same number of values')
+
+    levels = [LodLevel(ratio, min_size) for ratio, min_size in zip(args.ratios, args.min_sizes)]
+    print(json.dumps(run_benchmark(args.ifc_path, levels, args.repeats), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Mesh storage memory benchmark
+
+Builds a synthetic model of grid meshes (1M triangles by default) and
+compares the memory held by the legacy nested-list geometry layout with
+the NumPy-backed MeshGeometry layout.
+
+Usage:
+    python -m benchmarks.bench_mesh_memory --triangles 1000000 --elements 5000
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+import numpy as np
+
+from bim_processor.geometry import MeshGeometry
+
+
+def _grid_buffers(cells: int, offset: float):
+    """Flat vertex/face/edge buffers for a cells x cells grid (2 * cells^2 triangles)"""
+    side = cells + 1
+    ys, xs = np.divmod(np.arange(side * side), side)
+    verts = np.column_stack([xs + offset, ys, np.zeros(side * side)]).ravel()
+
+    corner = (np.arange(cells)[:, None] * side + np.arange(cells)[None, :]).ravel()
+    faces = np.column_stack([
+        corner, corner + 1, corner + side,
+        corner + 1, corner + side + 1, corner + side
+    ]).ravel()
+    edges = np.column_stack([corner, corner + 1, corner, corner + side]).ravel()
+
+    # ifcopenshell hands out plain tuples of Python floats/ints
+    return tuple(verts.tolist()), tuple(faces.tolist()), tuple(edges.tolist())
+
+
+def _legacy_geometry(verts, faces, edges) -> dict:
+    """The nested-list layout previously produced by _extract_geometry"""
+    return {
+        'vertices': [[verts[i], verts[i+1], verts[i+2]] for i in range(0, len(verts), 3)],
+        'faces': [[faces[i], faces[i+1], faces[i+2]] for i in range(0, len(faces), 3)],
+        'edges': [[edges[i], edges[i+1]] for i in range(0, len(edges), 2)],
+        'type': 'mesh'
+    }
+
+
+class _Triangulation:
+    """Stand-in for an ifcopenshell triangulation without raw buffers"""
+
+    def __init__(self, verts, faces, edges):
+        self.verts = verts
+        self.faces = faces
+        self.edges = edges
+
+
+def _measure(build, sources) -> int:
+    """Bytes retained by the geometries built from sources"""
+    gc.collect()
+    tracemalloc.start()
+    geometries = [build(*source) for source in sources]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del geometries
+    gc.collect()
+    return current
+
+
+def run_benchmark(triangles: int, elements: int) -> dict:
+    """Compare nested-list and array storage for the same synthetic model"""
+    cells = max(1, int(round((triangles / elements / 2) ** 0.5)))
+    sources = [_grid_buffers(cells, float(i)) for i in range(elements)]
+    total_triangles = elements * 2 * cells * cells
+    total_vertices = elements * (cells + 1) ** 2
+
+    results = {
+        'elements': elements,
+        'triangles': total_triangles,
+        'vertices': total_vertices,
+        'layouts': {}
+    }
+
+    layouts = {
+        'nested_lists': _legacy_geometry,
+        'numpy_float64': lambda v, f, e: MeshGeometry.from_triangulation(_Triangulation(v, f, e), np.float64),
+        'numpy_float32': lambda v, f, e: MeshGeometry.from_triangulation(_Triangulation(v, f, e), np.float32),
+    }
+
+    for name, build in layouts.items():
+        retained = _measure(build, sources)
+        results['layouts'][name] = {
+            'megabytes': round(retained / 2 ** 20, 1),
+            'bytes_per_vertex': round(retained / total_vertices, 1)
+        }
+
+    baseline = results['layouts']['nested_lists']['megabytes']
+    for layout in results['layouts'].values():
+        layout['reduction'] = round(baseline / layout['megabytes'], 1) if layout['megabytes'] else None
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare mesh storage memory layouts')
+    parser.add_argument('--triangles', type=int, default=1_000_000)
+    parser.add_argument('--elements', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.triangles, args.elements), indent=2))
+
+
+if __name__ == '__main__':
+    main()
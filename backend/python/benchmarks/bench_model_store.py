@@ -0,0 +1,170 @@
+"""
+Model store load and query latency benchmark
+
+Builds a synthetic processed model (every element with its own box mesh
+and a small property set), exports it both as JSON and as a memory-mapped
+model store, and compares what a query process pays: loading the JSON
+document versus mapping the store, then per-query latency of an element
+lookup, its properties, its mesh, and a type filter.
+
+Usage:
+    python -m benchmarks.bench_model_store --elements 200000 --queries 2000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bim_processor.elements import BIMElement, ElementTable
+from bim_processor.geometry import MeshGeometry
+from bim_processor.model_store import ModelStore
+from bim_processor.processor import BIMModel, BIMProcessor
+
+TYPES = ('IfcWall', 'IfcSlab', 'IfcBeam', 'IfcColumn', 'IfcDoor', 'IfcWindow')
+STOREYS = 20
+
+BOX_VERTICES = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float64)
+BOX_FACES = np.array([
+    [0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+    [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]
+], dtype=np.uint32)
+
+
+def _synthetic_model(count: int, rng) -> BIMModel:
+    storeys = [f"storey-{index:02d}" for index in range(STOREYS)]
+    type_indices = rng.integers(0, len(TYPES), count)
+    storey_indices = rng.integers(0, STOREYS, count)
+    origins = rng.uniform(0, 100, (count, 3))
+    sizes = rng.uniform(0.2, 5, (count, 3))
+
+    def elements():
+        for index in range(count):
+            ifc_type = TYPES[type_indices[index]]
+            box_min = origins[index]
+            box_max = origins[index] + sizes[index]
+            x, y, z = box_min.tolist()
+            yield BIMElement(
+                id=str(1000 + index),
+                name=f"{ifc_type[3:]}-{index}",
+                type=ifc_type,
+                global_id=f"{index:022d}",
+                geometry=MeshGeometry(vertices=box_min + BOX_VERTICES * sizes[index], faces=BOX_FACES,
+                                      type='mesh'),
+                properties={'GlobalId': f"{index:022d}", 'Tag': str(index), 'IsExternal': index % 2 == 0,
+                            'FireRating': f"{index % 4}HR", 'NetVolume': float(np.prod(sizes[index]))},
+                location={'x': x, 'y': y, 'z': z},
+                bounding_box={'min': box_min.tolist(), 'max': box_max.tolist()},
+                storey=storeys[storey_indices[index]]
+            )
+
+    table = ElementTable.from_elements(elements())
+    return BIMModel(id='synthetic', name='Synthetic', version='IFC4', elements=table,
+                    metadata={}, bounding_box=table.bounding_box())
+
+
+def _seconds(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def _best_seconds(function, repeat: int = 5) -> float:
+    return min(_seconds(function) for _ in range(repeat))
+
+
+def _mean_us(function, keys) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        function(key)
+    return round((time.perf_counter() - start) / len(keys) * 1e6, 2)
+
+
+def run_benchmark(elements: int, queries: int) -> dict:
+    rng = np.random.default_rng(0)
+    model = _synthetic_model(elements, rng)
+    processor = BIMProcessor()
+    ids = [str(1000 + index) for index in rng.integers(0, elements, queries).tolist()]
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'model.json')
+        store_path = os.path.join(directory, 'model.bims')
+        json_write = _seconds(lambda: processor.export_to_json(model, json_path, indent=None))
+        store_write = _seconds(lambda: processor.export_to_store(model, store_path))
+
+        def load_json():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+            return document, {element['id']: element for element in document['elements']}
+
+        start = time.perf_counter()
+        document, by_id = load_json()
+        json_load = time.perf_counter() - start
+
+        store_open = _best_seconds(lambda: ModelStore.open(store_path).close())
+        store = ModelStore.open(store_path)
+
+        def store_element(element_id):
+            return store.element(store.row(element_id))
+
+        def store_mesh(element_id):
+            vertices, faces, _ = store.mesh(int(store.element_mesh[store.row(element_id)]))
+            return vertices.tobytes() + faces.tobytes()
+
+        def json_mesh(element_id):
+            geometry = by_id[element_id]['geometry']
+            return np.asarray(geometry['vertices']).tobytes() + np.asarray(geometry['faces']).tobytes()
+
+        wanted = {'IfcWall', 'IfcColumn'}
+        result = {
+            'elements': elements,
+            'json': {
+                'bytes': os.path.getsize(json_path),
+                'write_seconds': round(json_write, 3),
+                'load_ms': round(json_load * 1000, 1)
+            },
+            'store': {
+                'bytes': os.path.getsize(store_path),
+                'write_seconds': round(store_write, 3),
+                'open_ms': round(store_open * 1000, 3)
+            },
+            'query_us': {
+                'element': {
+                    'json': _mean_us(lambda element_id: by_id[element_id], ids),
+                    'store': _mean_us(store_element, ids)
+                },
+                'properties': {
+                    'json': _mean_us(lambda element_id: json.dumps(by_id[element_id]['properties']), ids),
+                    'store': _mean_us(lambda element_id: bytes(store.property_bytes(store.row(element_id))), ids)
+                },
+                'mesh': {
+                    'json': _mean_us(json_mesh, ids),
+                    'store': _mean_us(store_mesh, ids)
+                }
+            },
+            'type_filter_ms': {
+                'json': round(_best_seconds(
+                    lambda: [element for element in document['elements'] if element['type'] in wanted]
+                ) * 1000, 2),
+                'store': round(_best_seconds(lambda: store.select(types=wanted)) * 1000, 2)
+            }
+        }
+        del document, by_id
+        store.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON and memory-mapped model store loading and queries')
+    parser.add_argument('--elements', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.elements, args.queries), indent=2))
+
+
+if __name__ == '__main__':
+    main()
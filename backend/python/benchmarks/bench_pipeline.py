@@ -0,0 +1,265 @@
+"""
+End-to-end BIM processing pipeline benchmark
+
+Generates synthetic IFC buildings (benchmarks.ifc_generator) at several
+scales and processes each one with BIMProcessor, or with the Celery
+process_bim_file task run in-process, reporting the time of every pipeline
+stage (open, metadata, relations, element collection, geometry, properties,
+materials, element table, bounding box, export per format), elements per
+second and peak resident memory. With --storey, runs are scoped to those
+storeys (process_ifc_file(storeys=...)), timing what loading one floor costs.
+
+Every run happens in a fresh Python process so peak memory belongs to that
+run alone. Results are written as JSON; pass an earlier results file as
+--baseline to add per-stage ratios against it (above 1 is slower).
+
+Scales are STOREYSxWALLSxSLABSxDOORS, element counts per storey.
+
+Usage:
+    python -m benchmarks.bench_pipeline --scales 5x20x1x10 20x50x4x25 --output pipeline.json
+    python -m benchmarks.bench_pipeline --celery --repeat 3 --baseline pipeline.json
+    python -m benchmarks.bench_pipeline --scales 40x100x4x50 --storey "Level 20"
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.ifc_generator import generate_ifc
+from bim_processor.model_store import STORE_SUFFIX
+
+DEFAULT_SCALES = ['2x20x1x10', '10x50x4x25', '20x100x4x50']
+EXPORT_SUFFIXES = {'json': '.json', 'glb': '.glb', 'store': STORE_SUFFIX}
+EXPORT_FORMATS = tuple(EXPORT_SUFFIXES)
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _parse_scale(scale: str) -> dict:
+    storeys, walls, slabs, doors = (int(value) for value in scale.lower().split('x'))
+    return {'storeys': storeys, 'walls': walls, 'slabs': slabs, 'doors': doors}
+
+
+def _processor_run(path: str, workers: int, instancing: bool, formats, output_dir: str, storeys) -> dict:
+    from bim_processor.processor import BIMProcessor
+
+    processor = BIMProcessor(num_workers=workers, instancing=instancing)
+    start = time.perf_counter()
+    model = processor.process_ifc_file(path, storeys=storeys)
+    seconds = time.perf_counter() - start
+    processing = processor.metrics.to_dict()
+
+    exports = {}
+    for output_format in formats:
+        output_path = os.path.join(output_dir, 'model' + EXPORT_SUFFIXES[output_format])
+        export = {'json': processor.export_to_json, 'glb': processor.export_to_glb,
+                  'store': processor.export_to_store}[output_format]
+        start = time.perf_counter()
+        export(model, output_path)
+        exports[output_format] = {'seconds': round(time.perf_counter() - start, 4),
+                                  'bytes': os.path.getsize(output_path)}
+
+    stages = {name: value for name, value in processing['stages'].items() if name != 'export'}
+    stages.update({f"export_{name}": export['seconds'] for name, export in exports.items()})
+    return {
+        'process_seconds': round(seconds, 4),
+        'elements': len(model.elements),
+        'elements_per_second': round(len(model.elements) / seconds, 1) if seconds > 0 else None,
+        'stages': stages,
+        'counters': processing['counters'],
+        'ifc_types': processing['ifc_types'],
+        'exports': exports
+    }
+
+
+def _celery_run(path: str, workers: int, output_format: str, output_dir: str, storeys) -> dict:
+    # Task.apply runs in this process; its state updates go to an in-memory backend
+    os.environ['REDIS_URL'] = 'cache+memory://'
+    from celery_tasks.tasks import process_bim_file
+
+    os.chdir(output_dir)
+    start = time.perf_counter()
+    result = process_bim_file.apply(args=(path,), kwargs={'num_workers': workers, 'output_format': output_format,
+                                                           'storeys': storeys}).get()
+    seconds = time.perf_counter() - start
+    if result['status'] != 'SUCCESS':
+        raise RuntimeError(f"process_bim_file failed: {result.get('error')}")
+    metrics = result['metrics']
+    elements = result['statistics']['total_elements']
+    return {
+        'task_seconds': round(seconds, 4),
+        'elements': elements,
+        'elements_per_second': round(elements / seconds, 1) if seconds > 0 else None,
+        'stages': metrics['stages'],
+        'counters': metrics['counters'],
+        'ifc_types': metrics['ifc_types'],
+        'exports': {output_format: {'bytes': os.path.getsize(result['output_path'])}}
+    }
+
+
+def measure(path: str, workers: int, instancing: bool, formats, celery: bool, storeys=None) -> dict:
+    """One run over path in this process, with the process's peak memory"""
+    from bim_processor.metrics import peak_rss_bytes
+
+    baseline_rss = peak_rss_bytes()
+    with tempfile.TemporaryDirectory() as output_dir:
+        if celery:
+            result = _celery_run(path, workers, formats[0], output_dir, storeys)
+        else:
+            result = _processor_run(path, workers, instancing, formats, output_dir, storeys)
+    result['import_rss_bytes'] = baseline_rss
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def _measure_in_subprocess(path: str, args) -> dict:
+    command = [sys.executable, '-m', 'benchmarks.bench_pipeline', '--run', os.path.abspath(path),
+               '--workers', str(args.workers), '--formats', *args.formats]
+    if args.instancing:
+        command.append('--instancing')
+    if args.celery:
+        command.append('--celery')
+    for storey in args.storey or ():
+        command.extend(['--storey', storey])
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PACKAGE_ROOT, env.get('PYTHONPATH')]))
+    completed = subprocess.run(command, cwd=PACKAGE_ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark run failed for {path} (exit code {completed.returncode})")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _best(runs) -> dict:
+    """Fastest time per stage and lowest peak memory across runs"""
+    total_key = 'task_seconds' if 'task_seconds' in runs[0] else 'process_seconds'
+    stages = sorted({name for run in runs for name in run['stages']})
+    return {
+        total_key: min(run[total_key] for run in runs),
+        'stages': {name: min(run['stages'][name] for run in runs if name in run['stages']) for name in stages},
+        'peak_rss_bytes': min(run['peak_rss_bytes'] or 0 for run in runs) or None
+    }
+
+
+def _ratio(current, baseline):
+    if current is None or not baseline:
+        return None
+    return round(current / baseline, 3)
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """Per-scale ratios of the best stage times and peak memory against a baseline"""
+    previous = {scale['label']: scale['best'] for scale in baseline.get('scales', [])}
+    comparison = {}
+    for scale in results['scales']:
+        before = previous.get(scale['label'])
+        if before is None:
+            continue
+        best = scale['best']
+        comparison[scale['label']] = {
+            'stages': {name: _ratio(seconds, before['stages'].get(name))
+                       for name, seconds in best['stages'].items()},
+            **{key: _ratio(best[key], before.get(key))
+               for key in ('process_seconds', 'task_seconds', 'peak_rss_bytes') if key in best}
+        }
+    return comparison
+
+
+def _environment() -> dict:
+    environment = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__
+    }
+    try:
+        import ifcopenshell
+        environment['ifcopenshell'] = ifcopenshell.version
+    except ImportError:
+        pass
+    return environment
+
+
+def _run_scale(label: str, scale: dict, work_dir: str, args) -> dict:
+    """Generate the scale's IFC file (reused if present) and measure it args.repeat times"""
+    path = os.path.join(work_dir, f"synthetic_{label}_{args.seed}.ifc")
+    generate_seconds = None
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        generate_ifc(path, scale['storeys'], scale['walls'], scale['slabs'], scale['doors'], args.seed)
+        generate_seconds = round(time.perf_counter() - start, 3)
+    runs = [_measure_in_subprocess(path, args) for _ in range(args.repeat)]
+    return {
+        'label': label,
+        **scale,
+        'elements': scale['storeys'] * (scale['walls'] + scale['slabs'] + scale['doors']),
+        'file_bytes': os.path.getsize(path),
+        'generate_seconds': generate_seconds,
+        'best': _best(runs),
+        'runs': runs
+    }
+
+
+def run_benchmark(scales, args) -> dict:
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'settings': {'workers': args.workers, 'instancing': args.instancing, 'celery': args.celery,
+                     'formats': args.formats, 'repeat': args.repeat, 'seed': args.seed, 'storeys': args.storey},
+        'scales': []
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for label, scale in scales:
+            results['scales'].append(_run_scale(label, scale, args.work_dir or temp_dir, args))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the BIM processing pipeline on synthetic IFC files')
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES,
+                        help='STOREYSxWALLSxSLABSxDOORS, counts per storey')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--instancing', action='store_true')
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, default=list(EXPORT_FORMATS),
+                        help='export formats to time (the first one only with --celery)')
+    parser.add_argument('--celery', action='store_true', help='run the process_bim_file task in-process')
+    parser.add_argument('--storey', action='append',
+                        help="only process this storey (name such as 'Level 0', or GlobalId); repeatable")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', help='where generated IFC files are kept and reused')
+    parser.add_argument('--output', help='write the results JSON here')
+    parser.add_argument('--baseline', help='earlier results JSON to compare against')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        # Child process of a benchmark: one measurement, printed as a single JSON line
+        print(json.dumps(measure(args.run, args.workers, args.instancing, args.formats, args.celery, args.storey)))
+        return
+
+    try:
+        scales = [(scale.lower(), _parse_scale(scale)) for scale in args.scales]
+    except ValueError:
+        parser.error('scales must be STOREYSxWALLSxSLABSxDOORS, e.g. 10x50x4x25')
+    results = run_benchmark(scales, args)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            results['comparison'] = compare(results, json.load(f))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    # Individual runs are only in the output file
+    summary = dict(results, scales=[{key: value for key, value in scale.items() if key != 'runs'}
+                                    for scale in results['scales']])
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
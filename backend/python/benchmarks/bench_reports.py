@@ -0,0 +1,125 @@
+"""
+Report generation benchmark
+
+Generates energy, maintenance and asset reports over a year of daily
+buckets for a synthetic fleet of sensors: without a cache, with an empty
+partials cache (filling it), and one day later with the cache warm, when
+only the newest bucket is computed, both with per-bucket detail rows and
+summary only. The synthetic source
+returns rows already rolled up per sensor and bucket, as the MongoDB
+aggregation pipeline does, so the timings cover the report engine itself.
+
+Usage:
+    python -m benchmarks.bench_reports --sensors 5000 --days 365
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bim_processor.cache import ProcessedModelCache
+from report_processor.engine import REPORT_TYPES, ReportEngine
+from report_processor.sources import bucket_starts, empty_anomalies
+
+UNITS = np.array(['W', 'kWh', 'C', '%'], dtype=object)
+
+
+class SyntheticReadingSource:
+    """Deterministic per-(sensor, bucket) rollups of hourly windows"""
+
+    def __init__(self, sensors: int):
+        self.sensor_ids = np.array([f"sensor-{i}" for i in range(sensors)], dtype=object)
+        self.units = UNITS[np.arange(sensors) % len(UNITS)]
+        self.queries = 0
+
+    def window_aggregates(self, start, end, bucket_seconds, origin=0, sensor_ids=None, active_threshold=None):
+        self.queries += 1
+        frames = []
+        for bucket_start in range(int(bucket_starts(np.array([start]), bucket_seconds, origin)[0]),
+                                  end, bucket_seconds):
+            rng = np.random.default_rng(bucket_start)
+            sensors = len(self.sensor_ids)
+            windows = np.full(sensors, bucket_seconds // 3600)
+            count = windows * 60
+            mean = rng.uniform(10, 5000, sensors)
+            frames.append(pd.DataFrame({
+                'sensor_id': self.sensor_ids,
+                'bucket_start': bucket_start,
+                'unit': self.units,
+                'windows': windows,
+                'seconds': windows * 3600,
+                'count': count,
+                'sum': mean * count,
+                'min': mean * 0.5,
+                'max': mean * 1.5,
+                'active_windows': rng.integers(0, windows + 1) if active_threshold is not None else np.nan
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    def anomaly_counts(self, start, end, bucket_seconds, origin=0, sensor_ids=None):
+        rng = np.random.default_rng(start)
+        flagged = rng.random(len(self.sensor_ids)) < 0.01
+        if not flagged.any():
+            return empty_anomalies()
+        return pd.DataFrame({'sensor_id': self.sensor_ids[flagged],
+                             'bucket_start': int(bucket_starts(np.array([start]), bucket_seconds, origin)[0]),
+                             'anomalies': rng.integers(1, 5, flagged.sum())})
+
+
+def run_benchmark(sensors: int, days: int, compression: str = None) -> dict:
+    """Run each report cold, cache-filling and incremental; returns timings per report type"""
+    workdir = tempfile.mkdtemp(prefix='bench_reports_')
+    source = SyntheticReadingSource(sensors)
+    end = int(time.time()) // 86400 * 86400
+    parameters = {'start': end - days * 86400, 'end': end, 'bucket': 'day',
+                  'tariff_per_kwh': 0.25, 'active_threshold': 1000.0}
+
+    results = {'sensors': sensors, 'days': days, 'reports': []}
+    try:
+        for report_type in REPORT_TYPES:
+            cache = ProcessedModelCache(os.path.join(workdir, 'cache', report_type))
+            output_path = os.path.join(workdir, f"{report_type}.ndjson")
+            runs = {
+                'uncached': (ReportEngine(source), parameters),
+                'fill_cache': (ReportEngine(source, cache), parameters),
+                'next_day': (ReportEngine(source, cache, settle_seconds=-86400),
+                             {**parameters, 'start': parameters['start'] + 86400, 'end': end + 86400}),
+                'next_day_summary': (ReportEngine(source, cache, settle_seconds=-86400),
+                                     {**parameters, 'start': parameters['start'] + 86400, 'end': end + 86400,
+                                      'detail': False})
+            }
+            row = {'report_type': report_type}
+            for name, (engine, run_parameters) in runs.items():
+                stats = engine.generate(report_type, run_parameters, output_path, compression)
+                row[name] = {
+                    'seconds': stats['seconds'],
+                    'computed_buckets': stats['computed_buckets'],
+                    'cached_buckets': stats['cached_buckets'],
+                    'rows': stats['rows'],
+                    'output_megabytes': round(os.path.getsize(output_path) / 1e6, 1)
+                }
+            results['reports'].append(row)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark report generation')
+    parser.add_argument('--sensors', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--compression', choices=['gzip', 'zstd'])
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.sensors, args.days, args.compression), indent=2))
+
+
+if __name__ == '__main__':
+    main()
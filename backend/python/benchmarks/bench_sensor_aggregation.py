@@ -0,0 +1,95 @@
+"""
+Streaming sensor aggregation benchmark
+
+Feeds SensorAggregator one batch per simulated second (one reading per
+sensor) and reports readings/second, then fills a year of 10 minute
+readings for one sensor and times range queries at each resolution.
+Memory per sensor is reported alongside.
+
+Usage:
+    python -m benchmarks.bench_sensor_aggregation --sensors 5000 --seconds 300
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from iot_processor.aggregation import SensorAggregator
+from iot_processor.ingestion import ReadingFrame
+
+DAY = 86400
+QUERY_RANGES = {'hour': 3600, 'day': DAY, 'week': 7 * DAY, 'year': 365 * DAY}
+
+
+def _frame(sensor_ids: np.ndarray, timestamps: np.ndarray, values: np.ndarray) -> ReadingFrame:
+    return ReadingFrame(sensor_ids, timestamps, values, np.full(len(values), 'C', dtype=object))
+
+
+def _best_time(run, repeats: int) -> float:
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark(sensors: int, seconds: int, repeats: int = 20, seed: int = 0) -> dict:
+    """Run the aggregation benchmark and return update throughput and query latencies"""
+    rng = np.random.default_rng(seed)
+    start_ms = (int(time.time()) - 366 * DAY) * 1000
+
+    aggregator = SensorAggregator()
+    sensor_ids = np.array([f"sensor-{i}" for i in range(sensors)], dtype=object)
+    started = time.perf_counter()
+    for second in range(seconds):
+        timestamps = np.full(sensors, start_ms + second * 1000, dtype=np.int64)
+        aggregator.update(_frame(sensor_ids, timestamps, rng.normal(20.0, 5.0, sensors)))
+    update_seconds = time.perf_counter() - started
+
+    # A year of history for one sensor, then queries over growing ranges
+    timestamps = start_ms + np.arange(0, 366 * DAY * 1000, 600_000, dtype=np.int64)
+    history = _frame(np.full(len(timestamps), 'history', dtype=object), timestamps,
+                     rng.normal(20.0, 5.0, len(timestamps)))
+    aggregator.update(history)
+    end = timestamps[-1] / 1000
+
+    queries = []
+    for name, span in QUERY_RANGES.items():
+        for resolution in [None, *aggregator.resolutions]:
+            rollup = aggregator.query('history', end - span, end, resolution)
+            seconds_taken = _best_time(lambda: aggregator.query('history', end - span, end, resolution), repeats)
+            queries.append({
+                'range': name,
+                'requested_resolution': resolution,
+                'resolution': rollup['resolution'],
+                'buckets': len(rollup['timestamps']),
+                'milliseconds': round(seconds_taken * 1000, 3)
+            })
+
+    return {
+        'sensors': sensors,
+        'readings': sensors * seconds,
+        'update_seconds': round(update_seconds, 3),
+        'readings_per_second': round(sensors * seconds / update_seconds) if update_seconds else None,
+        'bytes_per_sensor': aggregator.bytes_per_sensor,
+        'total_megabytes': round(aggregator.nbytes / 1e6, 1),
+        'queries': queries
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming sensor aggregation')
+    parser.add_argument('--sensors', type=int, default=5000)
+    parser.add_argument('--seconds', type=int, default=300, help='Simulated seconds of one reading per sensor')
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.sensors, args.seconds, args.repeats), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Sensor batch ingestion throughput benchmark
+
+Drives SensorBatchIngestor with synthetic readings (mixed units, a few
+invalid ones) at several batch sizes, as record lists and as columns,
+and reports readings/second. A per-message row ingests the smallest batch
+one reading at a time for comparison. Pass --mongodb-uri to include the
+bulk writes; otherwise readings are validated and grouped only.
+
+Usage:
+    python -m benchmarks.bench_sensor_ingestion --batch-sizes 1000 10000 100000 --sensors 5000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from iot_processor.ingestion import MongoSensorStore, SensorBatchIngestor
+
+UNITS = ['C', 'F', 'kW', 'W', 'kWh', '%', 'hPa']
+
+
+def synthetic_columns(batch_size: int, sensors: int, seed: int = 0) -> dict:
+    """Column layout of batch_size readings spread over sensors, about 0.1% invalid"""
+    rng = np.random.default_rng(seed)
+    sensor_index = rng.integers(0, sensors, batch_size)
+    now_ms = int(time.time() * 1000)
+
+    values = rng.normal(20.0, 5.0, batch_size)
+    values[rng.random(batch_size) < 0.001] = np.nan
+
+    return {
+        'sensor_id': [f"sensor-{i}" for i in sensor_index],
+        'timestamp': (now_ms - rng.integers(0, 60_000, batch_size)).tolist(),
+        'value': values.tolist(),
+        'unit': [UNITS[i % len(UNITS)] for i in sensor_index]
+    }
+
+
+def _as_records(columns: dict) -> list:
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def _best_time(run, repeats: int) -> float:
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark(batch_sizes: list, sensors: int, repeats: int = 3, store=None) -> list:
+    """Run the ingestion benchmark and return one result row per batch size and layout"""
+    ingestor = SensorBatchIngestor(store)
+    results = []
+
+    for batch_size in batch_sizes:
+        columns = synthetic_columns(batch_size, sensors)
+        layouts = {'columns': columns, 'records': _as_records(columns)}
+
+        for layout, readings in layouts.items():
+            result = ingestor.ingest(readings)
+            seconds = _best_time(lambda: ingestor.ingest(readings), repeats)
+            results.append({
+                'batch_size': batch_size,
+                'layout': layout,
+                'accepted': result.accepted,
+                'rejected': sum(result.rejected.values()),
+                'buckets': result.buckets,
+                'seconds': round(seconds, 4),
+                'readings_per_second': round(batch_size / seconds) if seconds else None
+            })
+
+    # Baseline: the same readings one task call at a time
+    smallest = min(batch_sizes)
+    records = _as_records(synthetic_columns(smallest, sensors))
+    seconds = _best_time(lambda: [ingestor.ingest([record]) for record in records], 1)
+    results.append({
+        'batch_size': 1,
+        'layout': 'per_message',
+        'readings': smallest,
+        'seconds': round(seconds, 4),
+        'readings_per_second': round(smallest / seconds) if seconds else None
+    })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched sensor ingestion')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--sensors', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--mongodb-uri', help='Include bulk writes to this MongoDB')
+    parser.add_argument('--mongodb-db', default='digital_twin_benchmark')
+    args = parser.parse_args()
+
+    store = None
+    if args.mongodb_uri:
+        store = MongoSensorStore.from_uri(args.mongodb_uri, args.mongodb_db, 'sensor_readings')
+
+    print(json.dumps(run_benchmark(args.batch_sizes, args.sensors, args.repeats, store), indent=2))
+
+
+if __name__ == '__main__':
+    main()
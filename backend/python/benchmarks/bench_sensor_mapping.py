@@ -0,0 +1,169 @@
+"""
+Sensor-to-element mapping benchmark
+
+Builds a SensorElementMap over synthetic box elements, places sensors in
+it, and compares enriching reading batches through the map with a
+per-reading linear scan over all element boxes (agreement is measured on
+the box distance, since a sensor inside overlapping boxes has several
+equally good elements). Also times an incremental update after a small
+revision against a full rebuild and checks that both give the same
+mapping.
+
+Usage:
+    python -m benchmarks.bench_sensor_mapping --elements 100000 --sensors 10000
+"""
+
+import argparse
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from bim_processor.geometry import MeshGeometry
+from bim_processor.processor import BIMElement, ChangeSet
+from bim_processor.sensor_mapping import SensorElementMap
+
+CORNERS = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=np.float64)
+STOREY_HEIGHT = 4.0
+
+
+def _box_element(index: int, center: np.ndarray, half_size: np.ndarray) -> BIMElement:
+    vertices = center + half_size * CORNERS
+    return BIMElement(
+        id=str(index),
+        name=f"Element {index}",
+        type='IfcWall',
+        global_id=f"element-{index}",
+        geometry=MeshGeometry(vertices=vertices, faces=np.zeros((0, 3), dtype=np.int32)),
+        properties={},
+        storey=f"storey-{int(center[2] // STOREY_HEIGHT)}"
+    )
+
+
+def _synthetic_elements(count: int, rng, first_index: int = 0):
+    """Element-sized boxes scattered over a 10-storey, 200 m x 200 m building"""
+    centers = rng.uniform([0, 0, 0], [200, 200, 10 * STOREY_HEIGHT], size=(count, 3))
+    half_sizes = rng.uniform(0.05, 2.0, size=(count, 3))
+    return [_box_element(first_index + i, center, half_size)
+            for i, (center, half_size) in enumerate(zip(centers, half_sizes))]
+
+
+def _linear_enrich(sensor_ids, positions, mins, maxs, element_ids, max_distance):
+    """Per-reading scan: nearest element box (id, distance) of each reading's sensor"""
+    result = []
+    for sensor_id in sensor_ids:
+        point = positions[sensor_id]
+        delta = np.maximum(mins - point, 0) + np.maximum(point - maxs, 0)
+        distances = np.einsum('ij,ij->i', delta, delta)
+        nearest = int(np.argmin(distances))
+        if distances[nearest] <= max_distance ** 2:
+            result.append((element_ids[nearest], float(np.sqrt(distances[nearest]))))
+        else:
+            result.append((None, np.inf))
+    return result
+
+
+def run_benchmark(elements: int, sensors: int, batch_size: int, changed: float, scan_readings: int) -> dict:
+    rng = np.random.default_rng(0)
+    model_elements = _synthetic_elements(elements, rng)
+    sensor_ids = np.array([f"sensor-{i}" for i in range(sensors)], dtype=object)
+    positions = dict(zip(sensor_ids.tolist(), rng.uniform([0, 0, 0], [200, 200, 40], size=(sensors, 3))))
+
+    sensor_map = SensorElementMap()
+    start = time.perf_counter()
+    sensor_map.update(SimpleNamespace(elements=model_elements))
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sensor_map.place_sensors(positions)
+    place_seconds = time.perf_counter() - start
+
+    batch = sensor_ids[rng.integers(0, sensors, batch_size)]
+    start = time.perf_counter()
+    element_ids, _, _ = sensor_map.lookup(batch)
+    lookup_seconds = time.perf_counter() - start
+
+    mins = np.array([element.geometry.vertices.min(axis=0) for element in model_elements])
+    maxs = np.array([element.geometry.vertices.max(axis=0) for element in model_elements])
+    all_ids = [element.global_id for element in model_elements]
+    scan_batch = batch[:scan_readings]
+    start = time.perf_counter()
+    scanned = _linear_enrich(scan_batch, positions, mins, maxs, all_ids, sensor_map.max_distance)
+    scan_seconds = time.perf_counter() - start
+    mapped_distances = [sensor_map.to_dict(sensor_id)['distance'] for sensor_id in scan_batch.tolist()]
+    mapped_distances = np.array([np.inf if distance is None else distance for distance in mapped_distances])
+    agreement = float(np.mean(np.isclose([distance for _, distance in scanned], mapped_distances)))
+
+    # Revise a share of the elements: remove some, move some, add some
+    revision = max(1, int(elements * changed / 3))
+    picked = rng.choice(elements, 2 * revision, replace=False)
+    removed = {model_elements[i].global_id for i in picked[:revision]}
+    modified = {model_elements[i].global_id for i in picked[revision:]}
+    revised = [
+        _box_element(int(element.id), element.geometry.vertices.mean(axis=0) + rng.uniform(-1, 1, 3),
+                     np.full(3, 0.5)) if element.global_id in modified else element
+        for element in model_elements if element.global_id not in removed
+    ]
+    added = _synthetic_elements(revision, rng, first_index=elements)
+    revised_model = SimpleNamespace(elements=revised + added)
+    changes = ChangeSet(added=[element.global_id for element in added],
+                        removed=sorted(removed), modified=sorted(modified))
+
+    start = time.perf_counter()
+    counts = sensor_map.update(revised_model, changes)
+    incremental_seconds = time.perf_counter() - start
+
+    rebuilt = SensorElementMap()
+    start = time.perf_counter()
+    rebuilt.update(revised_model)
+    rebuilt.place_sensors(positions)
+    rebuild_seconds = time.perf_counter() - start
+
+    incremental_ids, _, _ = sensor_map.lookup(sensor_ids)
+    rebuilt_ids, _, _ = rebuilt.lookup(sensor_ids)
+
+    return {
+        'elements': elements,
+        'sensors': sensors,
+        'statistics': sensor_map.statistics(),
+        'build_seconds': round(build_seconds, 3),
+        'place_sensors_seconds': round(place_seconds, 3),
+        'map_lookup': {
+            'readings': batch_size,
+            'ms': round(lookup_seconds * 1000, 2),
+            'readings_per_second': round(batch_size / lookup_seconds)
+        },
+        'linear_scan': {
+            'readings': len(scan_batch),
+            'ms': round(scan_seconds * 1000, 2),
+            'readings_per_second': round(len(scan_batch) / scan_seconds),
+            'agreement_with_map': round(agreement, 4)
+        },
+        'revision': {
+            'added': len(changes.added),
+            'removed': len(changes.removed),
+            'modified': len(changes.modified),
+            'incremental_seconds': round(incremental_seconds, 3),
+            'full_rebuild_seconds': round(rebuild_seconds, 3),
+            'remapped_sensors': counts['remapped_sensors'],
+            'matches_full_rebuild': bool(np.all(incremental_ids == rebuilt_ids))
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark mapping sensors to model elements')
+    parser.add_argument('--elements', type=int, default=100_000)
+    parser.add_argument('--sensors', type=int, default=10_000)
+    parser.add_argument('--batch-size', type=int, default=100_000, help='Readings per enriched batch')
+    parser.add_argument('--changed', type=float, default=0.01, help='Share of elements changed by the revision')
+    parser.add_argument('--scan-readings', type=int, default=1000, help='Readings enriched by the linear scan')
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.elements, args.sensors, args.batch_size, args.changed,
+                                   args.scan_readings), indent=2))
+
+
+if __name__ == '__main__':
+    main()
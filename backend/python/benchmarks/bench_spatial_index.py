@@ -0,0 +1,124 @@
+"""
+Spatial index benchmark
+
+Builds a SpatialIndex over synthetic element bounding boxes, saves and
+reloads it, and compares box, radius, ray and nearest-neighbour query
+latency against a vectorized linear scan over all boxes.
+
+Usage:
+    python -m benchmarks.bench_spatial_index --elements 500000 --queries 200
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from bim_processor.spatial_index import SpatialIndex
+
+
+def _synthetic_boxes(count: int, seed: int = 0):
+    """Element-sized boxes scattered over a 40-storey, 200 m x 200 m building"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform([0, 0, 0], [200, 200, 160], size=(count, 3))
+    half_sizes = rng.uniform(0.05, 2.0, size=(count, 3))
+    return centers - half_sizes, centers + half_sizes
+
+
+def _linear_box(mins, maxs, lo, hi):
+    return np.nonzero(np.all((mins <= hi) & (maxs >= lo), axis=1))[0]
+
+
+def _linear_radius(mins, maxs, point, radius):
+    delta = np.maximum(mins - point, 0) + np.maximum(point - maxs, 0)
+    return np.nonzero(np.einsum('ij,ij->i', delta, delta) <= radius ** 2)[0]
+
+
+def _linear_nearest(mins, maxs, point):
+    delta = np.maximum(mins - point, 0) + np.maximum(point - maxs, 0)
+    return int(np.argmin(np.einsum('ij,ij->i', delta, delta)))
+
+
+def _linear_ray(mins, maxs, origin, direction):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1.0 / direction
+        t1 = (mins - origin) * inv
+        t2 = (maxs - origin) * inv
+    t_near = np.maximum(np.nanmax(np.minimum(t1, t2), axis=1), 0)
+    t_far = np.nanmin(np.maximum(t1, t2), axis=1)
+    return np.nonzero(t_near <= t_far)[0]
+
+
+def _mean_ms(func, arguments) -> float:
+    start = time.perf_counter()
+    for args in arguments:
+        func(*args)
+    return round((time.perf_counter() - start) / len(arguments) * 1000, 4)
+
+
+def run_benchmark(elements: int, queries: int) -> dict:
+    mins, maxs = _synthetic_boxes(elements)
+    ids = np.arange(elements).astype(str)
+
+    start = time.perf_counter()
+    index = SpatialIndex(ids, mins, maxs)
+    build_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'index.npz')
+        index.save(path)
+        start = time.perf_counter()
+        index = SpatialIndex.load(path)
+        load_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    points = rng.uniform([0, 0, 0], [200, 200, 160], size=(queries, 3))
+    boxes = [(p - 5, p + 5) for p in points]
+    radii = [(p, 3.0) for p in points]
+    rays = [(p, rng.normal(size=3)) for p in points]
+    nearest = [(p,) for p in points]
+
+    # First query builds the traversal tables; keep it out of the timings
+    index.query_box(*boxes[0])
+
+    results = {
+        'elements': elements,
+        'nodes': len(index.node_min),
+        'build_seconds': round(build_seconds, 3),
+        'load_seconds': round(load_seconds, 4),
+        'queries': {}
+    }
+
+    comparisons = {
+        'box': (index.query_box, lambda lo, hi: _linear_box(mins, maxs, lo, hi), boxes),
+        'radius': (index.query_radius, lambda p, r: _linear_radius(mins, maxs, p, r), radii),
+        'ray': (index.query_ray, lambda o, d: _linear_ray(mins, maxs, o, d), rays),
+        'nearest': (index.nearest, lambda p: _linear_nearest(mins, maxs, p), nearest),
+    }
+
+    for name, (indexed, linear, arguments) in comparisons.items():
+        indexed_ms = _mean_ms(indexed, arguments)
+        linear_ms = _mean_ms(linear, arguments)
+        results['queries'][name] = {
+            'index_ms': indexed_ms,
+            'linear_scan_ms': linear_ms,
+            'speedup': round(linear_ms / indexed_ms, 1) if indexed_ms else None
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the BIM spatial index')
+    parser.add_argument('--elements', type=int, default=500_000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.elements, args.queries), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Tessellation throughput benchmark for BIMProcessor
+
+Processes the same IFC file with an increasing number of tessellation
+workers, reports elements/second for each and checks that the parallel
+output matches the serial one.
+
+Usage:
+    python -m benchmarks.bench_tessellation model.ifc --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import time
+
+from bim_processor.processor import BIMProcessor
+
+
+def _model_signature(model):
+    """Reduce a BIMModel to a comparable (id, vertex count, face count) list"""
+    return [
+        (element.id, len(element.geometry['vertices']), len(element.geometry['faces']))
+        for element in model.elements
+    ]
+
+
+def run_benchmark(ifc_path: str, workers: list, repeats: int = 1) -> list:
+    """Run the tessellation benchmark and return one result row per worker count"""
+    results = []
+    baseline = None
+    
+    for num_workers in workers:
+        processor = BIMProcessor(num_workers=num_workers)
+        best = None
+        
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model = processor.process_ifc_file(ifc_path)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        
+        signature = _model_signature(model)
+        if baseline is None:
+            baseline = signature
+        
+        results.append({
+            'workers': num_workers,
+            'elements': len(model.elements),
+            'seconds': round(best, 3),
+            'elements_per_second': round(len(model.elements) / best, 1) if best else 0.0,
+            'matches_serial': signature == baseline
+        })
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel IFC tessellation')
+    parser.add_argument('ifc_path', help='Path to the IFC file to process')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeats', type=int, default=1)
+    args = parser.parse_args()
+    
+    results = run_benchmark(args.ifc_path, args.workers, args.repeats)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Parametric synthetic IFC files for benchmarks
+
+Builds an IFC4 building with ifcopenshell's authoring API: a project, site
+and building with a number of storeys, each holding a grid of walls, floor
+slab panels and doors, optionally with spaces below the storey that contain
+its doors. Walls, slabs and doors share one type each (IfcWallType,
+IfcSlabType, IfcDoorType) with a type property set and material; the door
+type carries a shared representation map so every door is a mapped instance.
+Every occurrence also gets its own common property set. Wall lengths and
+door widths vary with a seeded generator, so files are reproducible.
+
+Usage:
+    python -m benchmarks.ifc_generator model.ifc --storeys 10 --walls 50 --slabs 4 --doors 20 --spaces 5
+"""
+
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+try:
+    import ifcopenshell
+    import ifcopenshell.api
+    IFC_AVAILABLE = True
+except ImportError:
+    IFC_AVAILABLE = False
+
+STOREY_HEIGHT = 3.0
+WALL_SPACING = 6.0
+WALL_HEIGHT = 2.8
+WALL_THICKNESS = 0.2
+SLAB_DEPTH = 0.2
+DOOR_HEIGHT = 2.1
+DOOR_THICKNESS = 0.05
+
+
+def _run(ifc_file, command: str, **arguments):
+    return ifcopenshell.api.run(command, ifc_file, **arguments)
+
+
+def _place(ifc_file, product, x: float, y: float, z: float) -> None:
+    matrix = np.eye(4)
+    matrix[:3, 3] = (x, y, z)
+    _run(ifc_file, 'geometry.edit_object_placement', product=product, matrix=matrix)
+
+
+def _pset(ifc_file, product, name: str, properties: dict) -> None:
+    pset = _run(ifc_file, 'pset.add_pset', product=product, name=name)
+    _run(ifc_file, 'pset.edit_pset', pset=pset, properties=properties)
+
+
+def generate_ifc(path: str, storeys: int = 5, walls_per_storey: int = 20, slabs_per_storey: int = 1,
+                 doors_per_storey: int = 10, seed: int = 0, spaces_per_storey: int = 0) -> dict:
+    """
+    Write a synthetic building to path
+
+    Args:
+        path: Destination .ifc path
+        storeys: Number of building storeys
+        walls_per_storey: Walls per storey, laid out on a square grid
+        slabs_per_storey: Floor slab panels per storey, tiling the floor
+        doors_per_storey: Doors per storey, placed along the walls
+        seed: Seed of the wall length and door width variation
+        spaces_per_storey: IfcSpaces aggregated below each storey; doors are
+            contained in them in turn instead of in the storey
+
+    Returns:
+        Summary with the element counts and file size
+    """
+    if not IFC_AVAILABLE:
+        raise ImportError("IFC OpenShell is required to generate IFC files.")
+
+    rng = np.random.default_rng(seed)
+    ifc_file = ifcopenshell.file(schema='IFC4')
+    project = _run(ifc_file, 'root.create_entity', ifc_class='IfcProject', name='Synthetic Building')
+    _run(ifc_file, 'unit.assign_unit')
+    model_context = _run(ifc_file, 'context.add_context', context_type='Model')
+    body = _run(ifc_file, 'context.add_context', context_type='Model', context_identifier='Body',
+                target_view='MODEL_VIEW', parent=model_context)
+
+    site = _run(ifc_file, 'root.create_entity', ifc_class='IfcSite', name='Site')
+    building = _run(ifc_file, 'root.create_entity', ifc_class='IfcBuilding', name='Building')
+    _run(ifc_file, 'aggregate.assign_object', relating_object=project, products=[site])
+    _run(ifc_file, 'aggregate.assign_object', relating_object=site, products=[building])
+
+    concrete = _run(ifc_file, 'material.add_material', name='Concrete', category='concrete')
+    timber = _run(ifc_file, 'material.add_material', name='Timber', category='wood')
+
+    wall_type = _run(ifc_file, 'root.create_entity', ifc_class='IfcWallType', name='Wall 200',
+                     predefined_type='STANDARD')
+    slab_type = _run(ifc_file, 'root.create_entity', ifc_class='IfcSlabType', name='Floor 200',
+                     predefined_type='FLOOR')
+    door_type = _run(ifc_file, 'root.create_entity', ifc_class='IfcDoorType', name='Door 900',
+                     predefined_type='DOOR')
+    _run(ifc_file, 'material.assign_material', products=[wall_type, slab_type], material=concrete)
+    _run(ifc_file, 'material.assign_material', products=[door_type], material=timber)
+    _pset(ifc_file, wall_type, 'Pset_WallCommon', {'Reference': 'Wall 200', 'LoadBearing': True,
+                                                   'ThermalTransmittance': 0.3})
+    _pset(ifc_file, slab_type, 'Pset_SlabCommon', {'Reference': 'Floor 200', 'LoadBearing': True})
+    _pset(ifc_file, door_type, 'Pset_DoorCommon', {'Reference': 'Door 900', 'FireRating': '30'})
+    door_representation = _run(ifc_file, 'geometry.add_wall_representation', context=body, length=0.9,
+                               height=DOOR_HEIGHT, thickness=DOOR_THICKNESS)
+    _run(ifc_file, 'geometry.assign_representation', product=door_type, representation=door_representation)
+
+    columns = max(1, math.ceil(math.sqrt(walls_per_storey)))
+    floor_size = columns * WALL_SPACING
+    slab_columns = max(1, math.ceil(math.sqrt(slabs_per_storey)))
+    slab_size = floor_size / slab_columns
+
+    for level in range(storeys):
+        z = level * STOREY_HEIGHT
+        storey = _run(ifc_file, 'root.create_entity', ifc_class='IfcBuildingStorey', name=f"Level {level}")
+        storey.Elevation = z
+        _run(ifc_file, 'aggregate.assign_object', relating_object=building, products=[storey])
+        products = []
+        spaces = [
+            _run(ifc_file, 'root.create_entity', ifc_class='IfcSpace', name=f"Room {level}-{index}")
+            for index in range(spaces_per_storey)
+        ]
+        if spaces:
+            _run(ifc_file, 'aggregate.assign_object', relating_object=storey, products=spaces)
+        space_products = [[] for _ in spaces]
+
+        for index in range(walls_per_storey):
+            wall = _run(ifc_file, 'root.create_entity', ifc_class='IfcWall', name=f"Wall {level}-{index}")
+            _run(ifc_file, 'type.assign_type', related_objects=[wall], relating_type=wall_type)
+            representation = _run(ifc_file, 'geometry.add_wall_representation', context=body,
+                                  length=float(rng.uniform(3.0, WALL_SPACING - 0.5)), height=WALL_HEIGHT,
+                                  thickness=WALL_THICKNESS)
+            _run(ifc_file, 'geometry.assign_representation', product=wall, representation=representation)
+            _place(ifc_file, wall, index % columns * WALL_SPACING, index // columns * WALL_SPACING, z)
+            _pset(ifc_file, wall, 'Pset_WallCommon', {'IsExternal': index < columns,
+                                                      'FireRating': f"{1 + index % 3}HR"})
+            products.append(wall)
+
+        for index in range(slabs_per_storey):
+            slab = _run(ifc_file, 'root.create_entity', ifc_class='IfcSlab', name=f"Slab {level}-{index}",
+                        predefined_type='FLOOR')
+            _run(ifc_file, 'type.assign_type', related_objects=[slab], relating_type=slab_type)
+            representation = _run(ifc_file, 'geometry.add_slab_representation', context=body, depth=SLAB_DEPTH,
+                                  polyline=[(0.0, 0.0), (slab_size, 0.0), (slab_size, slab_size),
+                                            (0.0, slab_size)])
+            _run(ifc_file, 'geometry.assign_representation', product=slab, representation=representation)
+            _place(ifc_file, slab, index % slab_columns * slab_size, index // slab_columns * slab_size,
+                   z - SLAB_DEPTH)
+            _pset(ifc_file, slab, 'Pset_SlabCommon', {'IsExternal': level == 0, 'AcousticRating': 'B'})
+            products.append(slab)
+
+        for index in range(doors_per_storey):
+            door = _run(ifc_file, 'root.create_entity', ifc_class='IfcDoor', name=f"Door {level}-{index}",
+                        predefined_type='DOOR')
+            # Mapped instance of the door type's representation
+            _run(ifc_file, 'type.assign_type', related_objects=[door], relating_type=door_type)
+            door.OverallHeight = DOOR_HEIGHT
+            door.OverallWidth = float(rng.choice((0.8, 0.9, 1.0)))
+            wall_index = index % max(1, walls_per_storey)
+            _place(ifc_file, door, wall_index % columns * WALL_SPACING + 1.0,
+                   wall_index // columns * WALL_SPACING + WALL_THICKNESS, z)
+            _pset(ifc_file, door, 'Pset_DoorCommon', {'IsExternal': False, 'HandicapAccessible': index % 2 == 0})
+            if spaces:
+                space_products[index % len(spaces)].append(door)
+            else:
+                products.append(door)
+
+        if products:
+            _run(ifc_file, 'spatial.assign_container', relating_structure=storey, products=products)
+        for space, contained in zip(spaces, space_products):
+            if contained:
+                _run(ifc_file, 'spatial.assign_container', relating_structure=space, products=contained)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    ifc_file.write(path)
+    return {
+        'path': path,
+        'storeys': storeys,
+        'walls': storeys * walls_per_storey,
+        'slabs': storeys * slabs_per_storey,
+        'doors': storeys * doors_per_storey,
+        'spaces': storeys * spaces_per_storey,
+        'elements': storeys * (walls_per_storey + slabs_per_storey + doors_per_storey),
+        'file_bytes': os.path.getsize(path)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a parametric synthetic IFC building')
+    parser.add_argument('path')
+    parser.add_argument('--storeys', type=int, default=5)
+    parser.add_argument('--walls', type=int, default=20, help='walls per storey')
+    parser.add_argument('--slabs', type=int, default=1, help='slab panels per storey')
+    parser.add_argument('--doors', type=int, default=10, help='doors per storey')
+    parser.add_argument('--spaces', type=int, default=0, help='spaces per storey, containing the doors')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(generate_ifc(args.path, args.storeys, args.walls, args.slabs, args.doors, args.seed,
+                                  args.spaces), indent=2))
+
+
+if __name__ == '__main__':
+    main()
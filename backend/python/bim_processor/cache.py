@@ -0,0 +1,170 @@
+"""
+Content-addressed on-disk cache of processed BIM models
+
+Entries are keyed by the SHA-256 of the IFC file contents combined with the
+processor settings that affect the output, so re-uploads of the same file
+and models shared between twins are only tessellated once. The cache is
+bounded in size and evicts least recently used entries first.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the processed model layout changes to invalidate old entries
+CACHE_FORMAT_VERSION = 9
+
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+ENTRY_SUFFIX = '.pkl'
+
+
+def file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProcessedModelCache:
+    """Size-bounded LRU cache of processed models on disk"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: Directory holding cache entries (created if missing)
+            max_bytes: Total size above which least recently used entries are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, file_path: str, settings: Dict[str, Any]) -> str:
+        """Cache key for a file processed with the given settings fingerprint"""
+        fingerprint = json.dumps(
+            {'format': CACHE_FORMAT_VERSION, 'settings': settings},
+            sort_keys=True, default=str
+        )
+        digest = hashlib.sha256(file_hash(file_path).encode('ascii'))
+        digest.update(fingerprint.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached artifact for key, or None on a miss"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                artifact = pickle.load(f)
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {str(e)}")
+            self._remove(path)
+            self._count('misses')
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self._count('hits')
+        return artifact
+
+    def put(self, key: str, artifact: Any) -> None:
+        """Store an artifact under key, then evict entries beyond max_bytes"""
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+
+        if removed:
+            self._count('evictions', removed)
+            logger.info(f"Evicted {removed} processed model cache entries")
+        return removed
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes
+        }
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ENTRY_SUFFIX)
+
+    def _entries(self) -> list:
+        """(path, size, last access) for every entry"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,131 @@
+"""
+On-disk checkpoints of chunked BIM processing
+
+A processing run splits the file's elements (in extraction order) into
+fixed-size chunks. Each finished chunk's processed elements are pickled to
+their own file, so a run interrupted by a time limit or a worker restart
+resumes from the chunks already written, and chunks processed by different
+workers can be merged by whichever worker finishes last. A run's directory
+is keyed like the processed model cache (file contents plus processor
+settings) and the chunk size, so checkpoints are never mixed across files,
+revisions or settings.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from bim_processor.cache import CACHE_FORMAT_VERSION, file_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+MANIFEST_NAME = 'manifest.json'
+
+
+class ChunkCheckpoints:
+    """Checkpoint directory of one chunked processing run"""
+
+    def __init__(self, directory: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            directory: Directory of this run's checkpoints (created if missing)
+            chunk_size: Elements per chunk
+        """
+        self.directory = directory
+        self.chunk_size = max(1, int(chunk_size))
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def for_file(cls, root: str, file_path: str, settings: Dict[str, Any],
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'ChunkCheckpoints':
+        """Checkpoints under root for a file processed with the given settings fingerprint"""
+        chunk_size = max(1, int(chunk_size))
+        fingerprint = json.dumps(
+            {'format': CACHE_FORMAT_VERSION, 'settings': settings, 'chunk_size': chunk_size},
+            sort_keys=True, default=str
+        )
+        digest = hashlib.sha256(file_hash(file_path).encode('ascii'))
+        digest.update(fingerprint.encode('utf-8'))
+        return cls(os.path.join(root, digest.hexdigest()), chunk_size)
+
+    # Manifest
+
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        """Run manifest ({'elements', 'chunks', 'chunk_size'}), None before planning"""
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_manifest(self, elements: int) -> Dict[str, Any]:
+        """Record the run's element count and chunking"""
+        manifest = {
+            'elements': int(elements),
+            'chunks': -(-int(elements) // self.chunk_size),
+            'chunk_size': self.chunk_size
+        }
+        self._write(MANIFEST_NAME, json.dumps(manifest).encode('utf-8'))
+        return manifest
+
+    # Chunks
+
+    def chunk_range(self, index: int, elements: int) -> range:
+        """Positions (in extraction order) of the elements of chunk index"""
+        start = index * self.chunk_size
+        return range(start, min(start + self.chunk_size, elements))
+
+    def has(self, index: int) -> bool:
+        return os.path.exists(self._chunk_path(index))
+
+    def completed(self, chunks: int) -> List[int]:
+        """Indices of the chunks already checkpointed"""
+        return [index for index in range(chunks) if self.has(index)]
+
+    def save(self, index: int, elements: list) -> None:
+        """Write a chunk's processed elements atomically"""
+        self._write(os.path.basename(self._chunk_path(index)),
+                    pickle.dumps(elements, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def load(self, index: int) -> Optional[list]:
+        """A chunk's processed elements, None if missing or unreadable"""
+        path = self._chunk_path(index)
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable checkpoint {path}: {str(e)}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def clear(self) -> None:
+        """Remove the run's directory once its model is assembled"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _chunk_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"chunk_{index:06d}.pkl")
+
+    def _write(self, name: str, data: bytes) -> None:
+        # Readers (and resumed runs) never see partially written files
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
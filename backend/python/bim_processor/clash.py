@@ -0,0 +1,496 @@
+"""
+Clash detection between processed model elements
+
+Two sets of elements (by IFC type, subtypes included, e.g. every
+IfcDistributionElement against IfcBeam and IfcColumn) are checked against
+each other in two phases:
+
+- Broad phase: the bounding boxes of one set go into a BVH
+  (SpatialIndex) that the boxes of the other set descend all at once, one
+  tree level per vectorized step.
+- Narrow phase: for every candidate pair, the triangles of each element
+  that reach into the other's bounding box are tested against each other
+  with a vectorized triangle-triangle intersection test (Moller's interval
+  test). Batches of element pairs become flat triangle-pair arrays, so the
+  work runs in NumPy and batches are spread over threads.
+
+A hard clash is a pair whose surfaces cut through each other deeper than
+the tolerance, so elements that merely touch (a wall standing on a slab)
+are not reported, or an element enclosed in a closed mesh of the other.
+With a clearance, pairs closer than the clearance distance are reported as
+clearance clashes.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bim_processor.elements import ElementTable
+from bim_processor.metrics import PipelineMetrics
+from bim_processor.spatial_index import SpatialIndex
+
+try:
+    import ifcopenshell
+    IFC_AVAILABLE = True
+except ImportError:
+    IFC_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Element pairs per narrow-phase batch (the unit of work of a thread)
+DEFAULT_BATCH_SIZE = 2048
+# Triangle pairs tested per vectorized step, bounding temporary memory
+MAX_TRIANGLE_PAIRS = 200_000
+# Elements per leaf of the broad-phase BVH
+BVH_LEAF_SIZE = 4
+
+HARD = 'hard'
+CLEARANCE = 'clearance'
+
+# Ray direction of the containment test, off the axes so rays rarely graze edges
+_RAY = np.array([1.0, 0.0017320508, 0.0031622777]) / np.linalg.norm([1.0, 0.0017320508, 0.0031622777])
+
+
+@dataclass
+class Clash:
+    """A pair of clashing elements"""
+    element_a: str
+    element_b: str
+    global_id_a: str
+    global_id_b: str
+    type_a: str
+    type_b: str
+    kind: str  # HARD or CLEARANCE
+    penetration: float  # Depth surfaces cut into each other (hard clashes)
+    distance: float  # Closest distance between the elements (0 for hard clashes)
+    point: List[float]  # Centre of the region between the two bounding boxes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def expand_types(types: Sequence[str], present: Sequence[str], schema: Optional[str] = None) -> List[str]:
+    """
+    Types in present that are one of types or a subtype of one
+
+    Subtypes are resolved from the IFC schema (e.g. 'IFC4'); without
+    ifcopenshell only exact names match.
+    """
+    wanted = set(types)
+    declarations = None
+    if IFC_AVAILABLE and schema:
+        try:
+            declarations = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema)
+        except Exception:
+            logger.warning(f"IFC schema {schema} not available; matching types by exact name")
+
+    matched = []
+    for name in present:
+        if name in wanted:
+            matched.append(name)
+            continue
+        if declarations is None:
+            continue
+        try:
+            supertype = declarations.declaration_by_name(name).supertype()
+        except Exception:
+            continue
+        while supertype is not None:
+            if supertype.name() in wanted:
+                matched.append(name)
+                break
+            supertype = supertype.supertype()
+    return matched
+
+
+def _ranges(weights: np.ndarray, limit: int) -> Iterator[Tuple[int, int]]:
+    """Consecutive [start, stop) ranges whose weights sum to at most limit (at least one item each)"""
+    cumulative = np.cumsum(weights)
+    start, count = 0, len(weights)
+    while start < count:
+        base = cumulative[start - 1] if start else 0
+        stop = max(int(np.searchsorted(cumulative, base + limit, side='right')), start + 1)
+        yield start, stop
+        start = stop
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Item index repeated counts times and starts[item] + 0..count-1 for each"""
+    items = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    return items, np.repeat(starts, counts) + offsets
+
+
+def candidate_pairs(a_min: np.ndarray, a_max: np.ndarray, b_min: np.ndarray, b_max: np.ndarray,
+                    margin: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index pairs (i, j) of A and B boxes that overlap once A is grown by margin
+
+    The B boxes go into a BVH (SpatialIndex) that all A boxes descend
+    together; the sets are swapped when A is the larger one.
+
+    Args:
+        a_min, a_max: (N, 3) corners of the A boxes
+        b_min, b_max: (M, 3) corners of the B boxes
+        margin: Distance added around every A box
+    """
+    if len(a_min) > len(b_min):
+        index_b, index_a = candidate_pairs(b_min, b_max, a_min, a_max, margin)
+        return index_a, index_b
+    index = SpatialIndex(np.arange(len(b_min)), b_min, b_max, leaf_size=BVH_LEAF_SIZE)
+    return index.query_boxes(a_min - margin, a_max + margin)
+
+
+# Triangle geometry (arrays of m triangles or points, one row per pair)
+
+def _dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.einsum('ij,ij->i', a, b)
+
+
+def _unit_normals(triangles: np.ndarray) -> np.ndarray:
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(lengths[:, None] > 0, normals / lengths[:, None], 0.0)
+
+
+def _plane_interval(triangles: np.ndarray, distances: np.ndarray, direction: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Interval along direction where triangles straddling a plane (signed vertex distances) cross it"""
+    positions = []
+    for i, j in ((0, 1), (1, 2), (2, 0)):
+        crossing = (distances[:, i] > 0) != (distances[:, j] > 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fraction = distances[:, i] / (distances[:, i] - distances[:, j])
+            points = triangles[:, i] + (triangles[:, j] - triangles[:, i]) * fraction[:, None]
+        positions.append(np.where(crossing, _dot(points, direction), np.nan))
+    positions = np.stack(positions, axis=1)
+    return np.nanmin(positions, axis=1), np.nanmax(positions, axis=1)
+
+
+def triangle_penetration(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    How deep (m, 3, 3) triangles p and q cut through each other, 0 where they don't
+
+    The depth is the smallest of how far each triangle reaches to either
+    side of the other's plane and how long their intersection segments
+    overlap; coplanar and touching triangles have depth 0.
+    """
+    normals_p = _unit_normals(p)
+    normals_q = _unit_normals(q)
+    distances_q = np.einsum('mij,mj->mi', q - p[:, :1], normals_p)
+    distances_p = np.einsum('mij,mj->mi', p - q[:, :1], normals_q)
+    depth = np.minimum.reduce([
+        distances_q.max(axis=1), -distances_q.min(axis=1),
+        distances_p.max(axis=1), -distances_p.min(axis=1)
+    ])
+    penetration = np.zeros(len(p))
+    straddling = np.flatnonzero(depth > 0)
+    if not len(straddling):
+        return penetration
+
+    direction = np.cross(normals_p[straddling], normals_q[straddling])
+    lengths = np.linalg.norm(direction, axis=1)
+    direction /= np.where(lengths > 0, lengths, 1.0)[:, None]
+    low_p, high_p = _plane_interval(p[straddling], distances_p[straddling], direction)
+    low_q, high_q = _plane_interval(q[straddling], distances_q[straddling], direction)
+    overlap = np.minimum(high_p, high_q) - np.maximum(low_p, low_q)
+    penetration[straddling] = np.clip(np.minimum(overlap, depth[straddling]), 0, None)
+    return penetration
+
+
+def _point_triangle_distance(points: np.ndarray, triangles: np.ndarray) -> np.ndarray:
+    """Distance from points to triangles (closest point by Voronoi region)"""
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    ab, ac = b - a, c - a
+    d1, d2 = _dot(ab, points - a), _dot(ac, points - a)
+    d3, d4 = _dot(ab, points - b), _dot(ac, points - b)
+    d5, d6 = _dot(ab, points - c), _dot(ac, points - c)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        denominator = va + vb + vc
+        closest = a + ab * (vb / denominator)[:, None] + ac * (vc / denominator)[:, None]
+        # Regions from lowest to highest priority, each overriding the previous
+        regions = [
+            (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0),
+            (vb <= 0) & (d2 >= 0) & (d6 <= 0),
+            (d6 >= 0) & (d5 <= d6),
+            (vc <= 0) & (d1 >= 0) & (d3 <= 0),
+            (d3 >= 0) & (d4 <= d3),
+            (d1 <= 0) & (d2 <= 0)
+        ]
+        candidates = [
+            b + (c - b) * ((d4 - d3) / ((d4 - d3) + (d5 - d6)))[:, None],
+            a + ac * (d2 / (d2 - d6))[:, None],
+            c,
+            a + ab * (d1 / (d1 - d3))[:, None],
+            b,
+            a
+        ]
+    for region, candidate in zip(regions, candidates):
+        closest = np.where(region[:, None], candidate, closest)
+    return np.linalg.norm(points - closest, axis=1)
+
+
+def _segment_distance(p0: np.ndarray, p1: np.ndarray, q0: np.ndarray, q1: np.ndarray) -> np.ndarray:
+    """Distance between segments p0-p1 and q0-q1"""
+    d1, d2, r = p1 - p0, q1 - q0, p0 - q0
+    a, e, f = _dot(d1, d1), _dot(d2, d2), _dot(d2, r)
+    c, b = _dot(d1, r), _dot(d1, d2)
+    denominator = a * e - b * b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s = np.where(denominator > 1e-12, np.clip((b * f - c * e) / denominator, 0, 1), 0.0)
+        t = np.where(e > 1e-12, (b * s + f) / e, 0.0)
+        s = np.where(t < 0, np.clip(np.where(a > 1e-12, -c / a, 0.0), 0, 1), s)
+        s = np.where(t > 1, np.clip(np.where(a > 1e-12, (b - c) / a, 0.0), 0, 1), s)
+    t = np.clip(t, 0, 1)
+    return np.linalg.norm((p0 + d1 * s[:, None]) - (q0 + d2 * t[:, None]), axis=1)
+
+
+def triangle_distance(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Distance between (m, 3, 3) triangles p and q that do not intersect"""
+    distance = np.full(len(p), np.inf)
+    for k in range(3):
+        distance = np.minimum(distance, _point_triangle_distance(p[:, k], q))
+        distance = np.minimum(distance, _point_triangle_distance(q[:, k], p))
+    for i in range(3):
+        for j in range(3):
+            distance = np.minimum(distance, _segment_distance(p[:, i], p[:, (i + 1) % 3],
+                                                              q[:, j], q[:, (j + 1) % 3]))
+    return distance
+
+
+def _inside(point: np.ndarray, triangles: np.ndarray) -> bool:
+    """Whether point lies inside the closed mesh of triangles (ray crossing parity)"""
+    a = triangles[:, 0]
+    edge1, edge2 = triangles[:, 1] - a, triangles[:, 2] - a
+    h = np.cross(np.broadcast_to(_RAY, edge2.shape), edge2)
+    determinant = _dot(edge1, h)
+    valid = np.abs(determinant) > 1e-12
+    with np.errstate(invalid='ignore', divide='ignore'):
+        inverse = 1.0 / determinant
+        s = point - a
+        u = _dot(s, h) * inverse
+        q = np.cross(s, edge1)
+        v = (q @ _RAY) * inverse
+        t = _dot(edge2, q) * inverse
+    hits = valid & (u >= 0) & (u <= 1) & (v >= 0) & (u + v <= 1) & (t > 0)
+    return bool(np.count_nonzero(hits) % 2)
+
+
+class ClashDetector:
+    """Clash detection between two sets of elements of a processed model"""
+
+    def __init__(self, tolerance: float = 0.0, clearance: float = 0.0, num_workers: int = 1,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Args:
+            tolerance: Hard clashes shallower than this are ignored (model units)
+            clearance: Also report elements closer than this distance; 0 disables
+                clearance checks
+            num_workers: Threads checking narrow-phase batches
+            batch_size: Element pairs per narrow-phase batch
+        """
+        self.tolerance = max(0.0, float(tolerance))
+        self.clearance = max(0.0, float(clearance))
+        self.num_workers = max(1, int(num_workers))
+        self.batch_size = max(1, int(batch_size))
+        self.metrics = PipelineMetrics()
+        self.statistics: Dict[str, Any] = {}
+
+    def detect(self, model, types_a: Optional[Sequence[str]] = None,
+               types_b: Optional[Sequence[str]] = None,
+               progress: Optional[Callable[[int, int], None]] = None) -> List[Clash]:
+        """
+        Clashes between elements of types_a and elements of types_b
+
+        Args:
+            model: Processed BIMModel
+            types_a, types_b: IFC types of each set, subtypes included; None
+                for every element. Elements in both sets are checked once per pair.
+            progress: Called with (candidate pairs checked, candidate pairs) after every batch
+
+        Returns:
+            Hard clashes by decreasing penetration, then clearance clashes by
+            increasing distance
+        """
+        self.metrics = PipelineMetrics()
+        start = time.perf_counter()
+        table = model.elements
+        if not isinstance(table, ElementTable):
+            table = ElementTable.from_elements(table)
+
+        with self.metrics.stage('broad_phase'):
+            rows_a = self._rows(table, types_a, model.version)
+            rows_b = self._rows(table, types_b, model.version)
+            index_a, index_b = candidate_pairs(table.bounds_min[rows_a], table.bounds_max[rows_a],
+                                               table.bounds_min[rows_b], table.bounds_max[rows_b],
+                                               margin=self.clearance)
+            pairs = self._unique_pairs(table.step_ids, rows_a[index_a], rows_b[index_b])
+
+        with self.metrics.stage('narrow_phase'):
+            penetration = np.zeros(len(pairs))
+            distance = np.full(len(pairs), np.inf)
+            batches = [(start_row, min(start_row + self.batch_size, len(pairs)))
+                       for start_row in range(0, len(pairs), self.batch_size)]
+            done = 0
+            with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+                for (low, high), (batch_penetration, batch_distance, triangle_pairs) in zip(
+                        batches, executor.map(lambda bounds: self._check(table, pairs[bounds[0]:bounds[1]]),
+                                              batches)):
+                    penetration[low:high] = batch_penetration
+                    distance[low:high] = batch_distance
+                    self.metrics.count('triangle_pairs', triangle_pairs)
+                    done += high - low
+                    if progress is not None:
+                        progress(done, len(pairs))
+
+        clashes = self._clashes(table, pairs, penetration, distance)
+        self.statistics = {
+            'elements_a': len(rows_a),
+            'elements_b': len(rows_b),
+            'candidate_pairs': len(pairs),
+            'triangle_pairs': self.metrics.counters.get('triangle_pairs', 0),
+            'hard_clashes': sum(1 for clash in clashes if clash.kind == HARD),
+            'clearance_clashes': sum(1 for clash in clashes if clash.kind == CLEARANCE),
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+        logger.info(f"Clash detection: {len(clashes)} clashes among {len(pairs)} candidate pairs")
+        return clashes
+
+    def _rows(self, table: ElementTable, types: Optional[Sequence[str]], schema: str) -> np.ndarray:
+        """Rows of the set's elements that have a bounding box"""
+        if types is None:
+            rows = np.arange(len(table))
+        else:
+            rows = table.select(types=expand_types(types, table.types, schema))
+        return rows[~np.isnan(table.bounds_min[rows, 0])]
+
+    @staticmethod
+    def _unique_pairs(step_ids: np.ndarray, rows_a: np.ndarray, rows_b: np.ndarray) -> np.ndarray:
+        """(k, 2) (set A row, set B row) pairs without self pairs, each unordered element pair once"""
+        # Tables of models processed before collection was deduplicated can
+        # hold an element in several rows, so elements are compared by step id
+        ids_a, ids_b = step_ids[rows_a], step_ids[rows_b]
+        keep = ids_a != ids_b
+        pairs = np.stack([rows_a[keep], rows_b[keep]], axis=1)
+        if not len(pairs):
+            return pairs.reshape(0, 2)
+        # Elements in both sets produce (a, b) and (b, a)
+        _, first = np.unique(np.sort(np.stack([ids_a[keep], ids_b[keep]], axis=1), axis=1), axis=0,
+                             return_index=True)
+        pairs = pairs[first]
+        # Batches of pairs sharing elements reuse their triangles
+        return pairs[np.argsort(pairs[:, 0], kind='stable')]
+
+    def _check(self, table: ElementTable, pairs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Penetration and distance of a batch of element pairs, with the triangle pairs tested"""
+        rows, local = np.unique(pairs, return_inverse=True)
+        local = local.reshape(-1, 2)
+        triangles = [self._triangles(table.geometries[row]) for row in rows.tolist()]
+        counts = np.array([len(element) for element in triangles], dtype=np.int64)
+        offsets = np.cumsum(counts) - counts
+        triangles = np.concatenate(triangles) if counts.sum() else np.empty((0, 3, 3))
+        triangle_min = triangles.min(axis=1)
+        triangle_max = triangles.max(axis=1)
+        element_min = table.bounds_min[rows]
+        element_max = table.bounds_max[rows]
+        box_min = element_min - self.clearance
+        box_max = element_max + self.clearance
+
+        # Triangles of each element reaching into the other element's box
+        sides = []
+        for own, other in ((local[:, 0], local[:, 1]), (local[:, 1], local[:, 0])):
+            pair, triangle = _expand(offsets[own], counts[own])
+            keep = np.all((triangle_min[triangle] <= box_max[other[pair]]) &
+                          (triangle_max[triangle] >= box_min[other[pair]]), axis=1)
+            sides.append((pair[keep], triangle[keep]))
+        (pair_a, triangle_a), (pair_b, triangle_b) = sides
+        count_b = np.bincount(pair_b, minlength=len(pairs))
+        start_b = np.cumsum(count_b) - count_b
+
+        penetration = np.zeros(len(pairs))
+        distance = np.full(len(pairs), np.inf)
+        tested = 0
+        repeats = count_b[pair_a]
+        for low, high in _ranges(repeats, MAX_TRIANGLE_PAIRS):
+            entries, positions = _expand(start_b[pair_a[low:high]], repeats[low:high])
+            if not len(entries):
+                continue
+            pair = pair_a[low:high][entries]
+            first = triangle_a[low:high][entries]
+            second = triangle_b[positions]
+            keep = np.all((triangle_min[first] <= triangle_max[second] + self.clearance) &
+                          (triangle_max[first] >= triangle_min[second] - self.clearance), axis=1)
+            pair, first, second = pair[keep], first[keep], second[keep]
+            tested += len(pair)
+
+            depth = triangle_penetration(triangles[first], triangles[second])
+            np.maximum.at(penetration, pair, depth)
+            if self.clearance:
+                apart = depth <= 0
+                np.minimum.at(distance, pair[apart],
+                              triangle_distance(triangles[first[apart]], triangles[second[apart]]))
+                np.minimum.at(distance, pair[~apart], 0.0)
+
+        # Elements with no crossing surfaces may still enclose one another
+        for index in np.flatnonzero(penetration <= self.tolerance).tolist():
+            a, b = local[index]
+            for inner, outer in ((a, b), (b, a)):
+                if not counts[inner] or not counts[outer]:
+                    continue
+                if np.all(element_min[inner] >= element_min[outer]) and \
+                        np.all(element_max[inner] <= element_max[outer]) and \
+                        _inside(triangles[offsets[inner], 0],
+                                triangles[offsets[outer]:offsets[outer] + counts[outer]]):
+                    # An enclosed element penetrates by its own thickness
+                    extent = float((element_max[inner] - element_min[inner]).min())
+                    penetration[index] = max(extent, np.nextafter(self.tolerance, np.inf))
+                    break
+        return penetration, distance, tested
+
+    @staticmethod
+    def _triangles(geometry) -> np.ndarray:
+        """World-space (k, 3, 3) triangles of an element's geometry"""
+        if geometry is None or not len(geometry.faces):
+            return np.empty((0, 3, 3))
+        return np.asarray(geometry.vertices, dtype=np.float64)[geometry.faces.astype(np.int64)]
+
+    def _clashes(self, table: ElementTable, pairs: np.ndarray, penetration: np.ndarray,
+                 distance: np.ndarray) -> List[Clash]:
+        hard = penetration > self.tolerance
+        near = ~hard & (distance < self.clearance) if self.clearance else np.zeros(len(pairs), dtype=bool)
+        order = np.concatenate([
+            np.flatnonzero(hard)[np.argsort(-penetration[hard], kind='stable')],
+            np.flatnonzero(near)[np.argsort(distance[near], kind='stable')]
+        ])
+
+        first, second = pairs[order, 0], pairs[order, 1]
+        points = (np.maximum(table.bounds_min[first], table.bounds_min[second]) +
+                  np.minimum(table.bounds_max[first], table.bounds_max[second])) / 2
+        is_hard = hard[order]
+        columns = zip(
+            table.step_ids[first].tolist(), table.step_ids[second].tolist(),
+            table.global_ids[first].tolist(), table.global_ids[second].tolist(),
+            table.type_codes[first].tolist(), table.type_codes[second].tolist(),
+            is_hard.tolist(),
+            np.where(is_hard, penetration[order], 0.0).round(6).tolist(),
+            np.where(is_hard, 0.0, distance[order]).round(6).tolist(),
+            points.tolist()
+        )
+        clashes = [
+            Clash(
+                element_a=str(id_a), element_b=str(id_b),
+                global_id_a=global_a.decode('utf-8'), global_id_b=global_b.decode('utf-8'),
+                type_a=table.types[type_a], type_b=table.types[type_b],
+                kind=HARD if hard_clash else CLEARANCE,
+                penetration=clash_penetration, distance=clash_distance, point=point
+            )
+            for id_a, id_b, global_a, global_b, type_a, type_b, hard_clash, clash_penetration, clash_distance, point
+            in columns
+        ]
+        return clashes
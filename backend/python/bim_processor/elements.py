@@ -0,0 +1,447 @@
+"""
+Columnar storage of processed BIM elements
+
+A processed model holds its elements in an ElementTable instead of a list
+of BIMElement objects. Step ids, type/name/storey/space codes, locations
+and bounding boxes are NumPy columns; type names, element names, storeys,
+spaces and materials are stored once in pools that the codes index; property dicts
+are split into a pooled key tuple (elements of one type share it) and a
+tuple of values, with repeated strings stored once. Meshes are already NumPy
+buffers and are referenced as they are.
+
+Iterating the table (or indexing a row) yields ElementView objects, which
+are BIMElements reading their fields from the table, so exporters and
+other consumers work unchanged. Statistics and filters (type counts,
+selection by type, storey, space or box) run on the columns (ElementColumns).
+"""
+
+import sys
+from collections import Counter
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bim_processor.geometry import MeshGeometry
+
+# Code of a missing storey, space or material
+MISSING = -1
+
+
+@dataclass
+class BIMElement:
+    """Represents a BIM element with its properties and geometry"""
+    id: str
+    name: str
+    type: str
+    global_id: str
+    geometry: MeshGeometry
+    properties: Dict[str, Any]
+    material: Optional[Dict[str, Any]] = None
+    location: Optional[Dict[str, Any]] = None
+    fingerprint: Optional[str] = None
+    bounding_box: Optional[Dict[str, List[float]]] = None
+    lods: Optional[List[Any]] = None  # Per coarse level: geometry, None if culled, 0 if full detail
+    storey: Optional[str] = None  # GlobalId of the containing IfcBuildingStorey
+    space: Optional[str] = None  # GlobalId of the containing IfcSpace
+
+
+class ElementView(BIMElement):
+    """Read-only BIMElement backed by one row of an ElementTable"""
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: 'ElementTable', row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def id(self) -> str:
+        return str(self._table.step_ids[self._row])
+
+    @property
+    def name(self) -> str:
+        return self._table.names[self._table.name_codes[self._row]]
+
+    @property
+    def type(self) -> str:
+        return self._table.types[self._table.type_codes[self._row]]
+
+    @property
+    def global_id(self) -> str:
+        return self._table.global_ids[self._row].decode('utf-8')
+
+    @property
+    def geometry(self):
+        return self._table.geometries[self._row]
+
+    @property
+    def properties(self) -> Dict[str, Any]:
+        table = self._table
+        return dict(zip(table.property_keys[table.property_key_codes[self._row]],
+                        table.property_values[self._row]))
+
+    @property
+    def material(self) -> Optional[Dict[str, Any]]:
+        code = self._table.material_codes[self._row]
+        return self._table.materials[code] if code != MISSING else None
+
+    @property
+    def location(self) -> Optional[Dict[str, float]]:
+        x, y, z = self._table.locations[self._row].tolist()
+        return None if x != x else {'x': x, 'y': y, 'z': z}
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        fingerprints = self._table.fingerprints
+        if fingerprints is None or not fingerprints[self._row]:
+            return None
+        return fingerprints[self._row].decode('ascii')
+
+    @property
+    def bounding_box(self) -> Optional[Dict[str, List[float]]]:
+        box_min = self._table.bounds_min[self._row]
+        if np.isnan(box_min[0]):
+            return None
+        return {'min': box_min.tolist(), 'max': self._table.bounds_max[self._row].tolist()}
+
+    @property
+    def lods(self) -> Optional[List[Any]]:
+        return self._table.lods[self._row] if self._table.lods is not None else None
+
+    @property
+    def storey(self) -> Optional[str]:
+        code = self._table.storey_codes[self._row]
+        return self._table.storeys[code] if code != MISSING else None
+
+    @property
+    def space(self) -> Optional[str]:
+        code = self._table.space_codes[self._row]
+        return self._table.spaces[code] if code != MISSING else None
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ElementView):
+            return self._table is other._table and self._row == other._row
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._table), self._row))
+
+    def __repr__(self) -> str:
+        return f"ElementView(row={self._row}, id={self.id!r}, type={self.type!r}, name={self.name!r})"
+
+
+def to_element(element: BIMElement) -> BIMElement:
+    """Standalone BIMElement with the fields of element (a copy for table rows, element itself otherwise)"""
+    if isinstance(element, ElementView):
+        return BIMElement(**{field.name: getattr(element, field.name) for field in fields(BIMElement)})
+    return element
+
+
+class _Pool:
+    """Distinct values in first-seen order with a code per value"""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values: list = []
+        self.codes: Dict[Any, int] = {}
+
+    def code(self, key, value=None) -> int:
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.values)
+            self.values.append(key if value is None else value)
+        return code
+
+
+def _material_key(material: Dict[str, Any]):
+    return repr(sorted(material.items()))
+
+
+class ElementColumns:
+    """
+    Statistics and filters over element columns
+
+    Shared by ElementTable and the memory-mapped ModelStore; subclasses
+    provide type_codes/types, storey_codes/storeys, space_codes/spaces,
+    bounds_min/bounds_max and __len__.
+    """
+
+    __slots__ = ()
+
+    def type_counts(self) -> Dict[str, int]:
+        """Element count per IFC type, in order of first occurrence"""
+        counts = np.bincount(self.type_codes, minlength=len(self.types))
+        return {name: int(count) for name, count in zip(self.types, counts) if count}
+
+    def storey_counts(self) -> Dict[Optional[str], int]:
+        """Element count per storey GlobalId (None for uncontained elements)"""
+        counts = np.bincount(self.storey_codes + 1, minlength=len(self.storeys) + 1)
+        result = {storey: int(count) for storey, count in zip(self.storeys, counts[1:]) if count}
+        if counts[0]:
+            result[None] = int(counts[0])
+        return result
+
+    def select(self, types: Optional[Iterable[str]] = None, storeys: Optional[Iterable[str]] = None,
+               spaces: Optional[Iterable[str]] = None, box_min: Optional[Sequence[float]] = None,
+               box_max: Optional[Sequence[float]] = None) -> np.ndarray:
+        """
+        Rows matching every given filter, in table order
+
+        Args:
+            types: IFC type names (exact, subtypes are not included)
+            storeys: Storey GlobalIds
+            spaces: Space GlobalIds
+            box_min, box_max: Keep elements whose bounding box intersects this box
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if types is not None:
+            mask &= np.isin(self.type_codes, self._codes(self.types, types))
+        if storeys is not None:
+            mask &= np.isin(self.storey_codes, self._codes(self.storeys, storeys))
+        if spaces is not None:
+            mask &= np.isin(self.space_codes, self._codes(self.spaces, spaces))
+        if box_min is not None or box_max is not None:
+            low = np.full(3, -np.inf) if box_min is None else np.asarray(box_min, dtype=np.float64)
+            high = np.full(3, np.inf) if box_max is None else np.asarray(box_max, dtype=np.float64)
+            # NaN boxes (elements without geometry) compare False and drop out
+            mask &= np.all((self.bounds_min <= high) & (self.bounds_max >= low), axis=1)
+        return np.flatnonzero(mask)
+
+    def bounding_box(self) -> Dict[str, List[float]]:
+        """Box around every element box, zero-sized when no element has geometry"""
+        has_box = ~np.isnan(self.bounds_min[:, 0])
+        if not has_box.any():
+            return {'min': [0, 0, 0], 'max': [0, 0, 0], 'size': [0, 0, 0]}
+        min_coords = self.bounds_min[has_box].min(axis=0)
+        max_coords = self.bounds_max[has_box].max(axis=0)
+        return {
+            'min': min_coords.tolist(),
+            'max': max_coords.tolist(),
+            'size': (max_coords - min_coords).tolist()
+        }
+
+    @staticmethod
+    def _codes(pool: List[Any], values: Iterable[Any]) -> np.ndarray:
+        wanted = set(values)
+        return np.array([code for code, value in enumerate(pool) if value in wanted], dtype=np.int32)
+
+
+class ElementTable(ElementColumns):
+    """Processed elements of a model, stored column by column"""
+
+    __slots__ = (
+        'step_ids', 'global_ids', 'type_codes', 'types', 'name_codes', 'names',
+        'storey_codes', 'storeys', 'space_codes', 'spaces', 'material_codes', 'materials', 'locations',
+        'bounds_min', 'bounds_max', 'geometries', 'lods', 'property_key_codes',
+        'property_keys', 'property_values', 'fingerprints', '_global_index'
+    )
+
+    def __init__(self, step_ids: np.ndarray, global_ids: np.ndarray,
+                 type_codes: np.ndarray, types: List[str],
+                 name_codes: np.ndarray, names: List[str],
+                 storey_codes: np.ndarray, storeys: List[str],
+                 material_codes: np.ndarray, materials: List[Dict[str, Any]],
+                 locations: np.ndarray, bounds_min: np.ndarray, bounds_max: np.ndarray,
+                 geometries: list, lods: Optional[list],
+                 property_key_codes: np.ndarray, property_keys: List[Tuple[str, ...]],
+                 property_values: List[tuple], fingerprints: Optional[np.ndarray] = None,
+                 space_codes: Optional[np.ndarray] = None, spaces: Optional[List[str]] = None):
+        self.step_ids = step_ids
+        self.global_ids = global_ids
+        self.type_codes = type_codes
+        self.types = types
+        self.name_codes = name_codes
+        self.names = names
+        self.storey_codes = storey_codes
+        self.storeys = storeys
+        self.material_codes = material_codes
+        self.materials = materials
+        self.locations = locations
+        self.bounds_min = bounds_min
+        self.bounds_max = bounds_max
+        self.geometries = geometries
+        self.lods = lods
+        self.property_key_codes = property_key_codes
+        self.property_keys = property_keys
+        self.property_values = property_values
+        self.fingerprints = fingerprints
+        # Tables built without space containment have every element outside a space
+        if space_codes is None:
+            space_codes = np.full(len(step_ids), MISSING, dtype=np.int32)
+        self.space_codes = space_codes
+        self.spaces = spaces if spaces is not None else []
+        self._global_index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_elements(cls, elements: Iterable[BIMElement]) -> 'ElementTable':
+        """Pack elements (standalone BIMElements or rows of other tables) in order"""
+        step_ids, global_ids, fingerprints = [], [], []
+        type_codes, name_codes, storey_codes, space_codes, material_codes, key_codes = [], [], [], [], [], []
+        locations, bounds_min, bounds_max = [], [], []
+        geometries, lods, property_values = [], [], []
+        types, names, storeys, spaces, keys = _Pool(), _Pool(), _Pool(), _Pool(), _Pool()
+        materials = _Pool()
+        material_ids: Dict[int, int] = {}
+        # Repeated property strings (enumerations, shared names) are kept once
+        strings: Dict[str, str] = {}
+        nan3 = (np.nan, np.nan, np.nan)
+
+        for element in elements:
+            step_ids.append(int(element.id))
+            global_ids.append((element.global_id or '').encode('utf-8'))
+            type_codes.append(types.code(sys.intern(element.type)))
+            name_codes.append(names.code(element.name))
+
+            storey = element.storey
+            storey_codes.append(storeys.code(storey) if storey is not None else MISSING)
+            space = element.space
+            space_codes.append(spaces.code(space) if space is not None else MISSING)
+
+            # Materials are shared dicts; the content key is only built once per object
+            material = element.material
+            if material is None:
+                material_codes.append(MISSING)
+            else:
+                code = material_ids.get(id(material))
+                if code is None:
+                    code = material_ids[id(material)] = materials.code(_material_key(material), material)
+                material_codes.append(code)
+
+            location = element.location
+            locations.append((location['x'], location['y'], location['z']) if location else nan3)
+
+            box = element.bounding_box
+            bounds_min.append(box['min'] if box else nan3)
+            bounds_max.append(box['max'] if box else nan3)
+
+            properties = element.properties or {}
+            key_codes.append(keys.code(tuple(map(sys.intern, properties))))
+            property_values.append(tuple(
+                strings.setdefault(value, value) if type(value) is str else value
+                for value in properties.values()
+            ))
+
+            geometries.append(element.geometry)
+            lods.append(element.lods)
+            fingerprints.append((element.fingerprint or '').encode('ascii'))
+
+        count = len(step_ids)
+        return cls(
+            step_ids=np.array(step_ids, dtype=np.int64),
+            global_ids=np.array(global_ids, dtype='S') if count else np.empty(0, dtype='S22'),
+            type_codes=np.array(type_codes, dtype=np.int32),
+            types=types.values,
+            name_codes=np.array(name_codes, dtype=np.int32),
+            names=names.values,
+            storey_codes=np.array(storey_codes, dtype=np.int32),
+            storeys=storeys.values,
+            material_codes=np.array(material_codes, dtype=np.int32),
+            materials=materials.values,
+            locations=np.array(locations, dtype=np.float64).reshape(count, 3),
+            bounds_min=np.array(bounds_min, dtype=np.float64).reshape(count, 3),
+            bounds_max=np.array(bounds_max, dtype=np.float64).reshape(count, 3),
+            geometries=geometries,
+            lods=lods if any(lod is not None for lod in lods) else None,
+            property_key_codes=np.array(key_codes, dtype=np.int32),
+            property_keys=keys.values,
+            property_values=property_values,
+            fingerprints=np.array(fingerprints, dtype='S') if any(fingerprints) else None,
+            space_codes=np.array(space_codes, dtype=np.int32),
+            spaces=spaces.values
+        )
+
+    # Sequence access
+
+    def __len__(self) -> int:
+        return len(self.step_ids)
+
+    def __iter__(self) -> Iterator[ElementView]:
+        for row in range(len(self.step_ids)):
+            yield ElementView(self, row)
+
+    def __getitem__(self, index):
+        """Row view for an int, sub-table for a slice, boolean mask or row array"""
+        if isinstance(index, (int, np.integer)):
+            row = int(index)
+            if row < 0:
+                row += len(self)
+            if not 0 <= row < len(self):
+                raise IndexError(f"Element row {index} out of range")
+            return ElementView(self, row)
+        rows = np.arange(len(self))[index]
+        return self.take(rows)
+
+    def __repr__(self) -> str:
+        return f"ElementTable({len(self)} elements, {len(self.type_counts())} types)"
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != '_global_index'}
+
+    def __setstate__(self, state) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._global_index = None
+
+    def index(self, global_id: str) -> Optional[int]:
+        """Row of the element with this GlobalId, None if there is none"""
+        if self._global_index is None:
+            self._global_index = {
+                value.decode('utf-8'): row for row, value in enumerate(self.global_ids.tolist())
+            }
+        return self._global_index.get(global_id)
+
+    def get(self, global_id: str) -> Optional[ElementView]:
+        """Element with this GlobalId, None if there is none"""
+        row = self.index(global_id)
+        return ElementView(self, row) if row is not None else None
+
+    def take(self, rows: Sequence[int]) -> 'ElementTable':
+        """Table of the given rows in the given order; pools are shared with this table"""
+        rows = np.asarray(rows, dtype=np.int64)
+        row_list = rows.tolist()
+        return ElementTable(
+            step_ids=self.step_ids[rows],
+            global_ids=self.global_ids[rows],
+            type_codes=self.type_codes[rows],
+            types=self.types,
+            name_codes=self.name_codes[rows],
+            names=self.names,
+            storey_codes=self.storey_codes[rows],
+            storeys=self.storeys,
+            material_codes=self.material_codes[rows],
+            materials=self.materials,
+            locations=self.locations[rows],
+            bounds_min=self.bounds_min[rows],
+            bounds_max=self.bounds_max[rows],
+            geometries=[self.geometries[row] for row in row_list],
+            lods=[self.lods[row] for row in row_list] if self.lods is not None else None,
+            property_key_codes=self.property_key_codes[rows],
+            property_keys=self.property_keys,
+            property_values=[self.property_values[row] for row in row_list],
+            fingerprints=self.fingerprints[rows] if self.fingerprints is not None else None,
+            space_codes=self.space_codes[rows],
+            spaces=self.spaces
+        )
+
+    def filter(self, **filters) -> 'ElementTable':
+        """Sub-table of the rows matching select(**filters)"""
+        return self.take(self.select(**filters))
+
+    def boxes(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Ids, minimum and maximum corners of the elements that have a bounding box"""
+        rows = np.flatnonzero(~np.isnan(self.bounds_min[:, 0]))
+        return [str(step_id) for step_id in self.step_ids[rows].tolist()], \
+            self.bounds_min[rows], self.bounds_max[rows]
+
+
+def type_counts(elements) -> Dict[str, int]:
+    """Element count per IFC type of a table, or of any iterable of elements"""
+    if isinstance(elements, ElementTable):
+        return elements.type_counts()
+    return dict(Counter(element.type for element in elements))
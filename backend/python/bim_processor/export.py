@@ -0,0 +1,181 @@
+"""
+Streaming export of processed BIM models
+
+Elements are serialized one at a time, either as NDJSON (one record per
+line) or as a single JSON document whose 'elements' array is written
+incrementally, so memory use stays flat regardless of model size.
+"""
+
+import gzip
+import io
+import json
+import logging
+import os
+from dataclasses import fields
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from bim_processor.geometry import MeshGeometry, MeshInstance
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('json', 'ndjson')
+COMPRESSIONS = (None, 'gzip', 'zstd')
+
+
+def json_default(value):
+    """Serialize mesh arrays and NumPy values; anything else falls back to str"""
+    if isinstance(value, (MeshGeometry, MeshInstance)):
+        return value.to_dict()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def element_to_dict(element, exclude_fields: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Shallow field mapping of a BIMElement; unlike asdict() nothing is deep-copied"""
+    return {
+        field.name: getattr(element, field.name)
+        for field in fields(element) if field.name not in exclude_fields
+    }
+
+
+def open_text_output(output_path: str, compression: Optional[str] = None):
+    """
+    Open a text stream for writing, compressing on the fly if requested
+
+    Args:
+        output_path: Destination file path
+        compression: None, 'gzip' or 'zstd'
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}. Expected one of {COMPRESSIONS}")
+
+    if compression == 'gzip':
+        return gzip.open(output_path, 'wt', encoding='utf-8')
+
+    if compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is not available. Please install zstandard for zstd compression.")
+        raw = open(output_path, 'wb')
+        writer = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(writer, encoding='utf-8')
+
+    return open(output_path, 'w', encoding='utf-8')
+
+
+class StreamingModelWriter:
+    """
+    Incremental writer for BIM models
+
+    Usage:
+        with StreamingModelWriter(path, format='ndjson') as writer:
+            writer.write_header(model_info)
+            for element in elements:
+                writer.write_element(element)
+            writer.write_footer(summary)
+
+    In 'ndjson' format every line is a JSON object tagged with a 'record'
+    key: one 'model' header, one 'element' line per element and a closing
+    'summary'. In 'json' format the output is the regular model document
+    ({..., 'elements': [...], ...}) with the footer fields appended after
+    the elements array.
+
+    Shared meshes of instanced elements are written once: as a 'mesh' record
+    just before the first element using it (ndjson), or in a 'meshes' object
+    after the elements (json).
+
+    bytes_written counts UTF-8 bytes before compression while writing and is
+    the size of the output file once the writer is closed.
+    """
+
+    def __init__(self, output_path: str, format: str = 'ndjson',
+                 compression: Optional[str] = None, indent: Optional[int] = None,
+                 exclude_fields: Tuple[str, ...] = ()):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}. Expected one of {EXPORT_FORMATS}")
+
+        self.output_path = output_path
+        self.format = format
+        self.compression = compression
+        self.indent = indent if format == 'json' else None
+        self.exclude_fields = tuple(exclude_fields)
+        self.element_count = 0
+        self.bytes_written = 0
+        self._stream = None
+        self._meshes: Dict[str, MeshGeometry] = {}
+
+    def __enter__(self) -> 'StreamingModelWriter':
+        self._stream = open_text_output(self.output_path, self.compression)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stream.close()
+        self._stream = None
+        if exc_type is None:
+            self.bytes_written = os.path.getsize(self.output_path)
+
+    def write_header(self, model_info: Dict[str, Any]) -> None:
+        """Write model-level fields (id, name, version, metadata)"""
+        if self.format == 'ndjson':
+            self._write_record({'record': 'model', **model_info})
+        else:
+            body = self._dumps(model_info)
+            prefix = body[:-1].rstrip()
+            separator = ', ' if model_info else ''
+            self._write(f"{prefix}{separator}\"elements\": [")
+
+    def write_element(self, element) -> None:
+        """Write a single BIMElement"""
+        element_dict = element_to_dict(element, self.exclude_fields)
+        for geometry in [element_dict.get('geometry'), *(element_dict.get('lods') or ())]:
+            if isinstance(geometry, MeshInstance) and geometry.mesh_id not in self._meshes:
+                self._meshes[geometry.mesh_id] = geometry.mesh
+                if self.format == 'ndjson':
+                    self._write_record({'record': 'mesh', 'mesh_id': geometry.mesh_id, **geometry.mesh.to_dict()})
+
+        if self.format == 'ndjson':
+            self._write_record({'record': 'element', **element_dict})
+        else:
+            separator = ',\n' if self.element_count else '\n'
+            self._write(separator + self._dumps(element_dict))
+
+        self.element_count += 1
+
+    def write_footer(self, summary: Dict[str, Any]) -> None:
+        """Write fields only known once all elements are processed (e.g. bounding_box)"""
+        if self._meshes and self.format == 'json':
+            summary = {**summary, 'meshes': self._meshes}
+
+        if self.format == 'ndjson':
+            self._write_record({'record': 'summary', 'element_count': self.element_count, **summary})
+        else:
+            closing = '\n]' if self.element_count else ']'
+            tail = ''.join(
+                f", {json.dumps(key)}: {self._dumps(value)}" for key, value in summary.items()
+            )
+            self._write(f"{closing}{tail}}}\n")
+
+    @property
+    def mesh_count(self) -> int:
+        """Number of shared meshes written so far"""
+        return len(self._meshes)
+
+    def _write_record(self, record: Dict[str, Any]) -> None:
+        self._write(self._dumps(record) + '\n')
+
+    def _dumps(self, value) -> str:
+        return json.dumps(value, indent=self.indent, default=json_default)
+
+    def _write(self, text: str) -> None:
+        self._stream.write(text)
+        self.bytes_written += len(text.encode('utf-8'))
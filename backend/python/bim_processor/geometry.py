@@ -0,0 +1,294 @@
+"""
+Compact mesh storage for processed BIM geometry
+"""
+
+import hashlib
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+VERTEX_DTYPE = np.float64
+INDEX_DTYPE = np.uint32
+
+
+class RowListView(Sequence):
+    """Read-only list-of-lists view over a 2-D array, converting rows on access"""
+
+    __slots__ = ('_array',)
+
+    def __init__(self, array: np.ndarray):
+        self._array = array
+
+    def __len__(self) -> int:
+        return len(self._array)
+
+    def __getitem__(self, index):
+        return self._array[index].tolist()
+
+    def __iter__(self):
+        for row in self._array:
+            yield row.tolist()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RowListView):
+            return np.array_equal(self._array, other._array)
+        if isinstance(other, (list, tuple)):
+            return self._array.tolist() == list(other)
+        return NotImplemented
+
+    def __array__(self, dtype=None, copy=None):
+        return self._array if dtype is None else self._array.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"RowListView({len(self)} rows)"
+
+
+class MeshGeometry(Mapping):
+    """
+    Triangle mesh backed by contiguous NumPy arrays
+
+    Vertices are stored as an (N, 3) float array and faces/edges as (M, 3) and
+    (K, 2) uint32 index arrays. The mapping interface keeps the historical
+    dict layout ('vertices', 'faces', 'edges', 'type') working: array keys
+    return a lazy list view instead of materialising nested Python lists.
+    """
+
+    __slots__ = ('vertices', 'faces', 'edges', 'type')
+
+    _ARRAY_KEYS = ('vertices', 'faces', 'edges')
+    _KEYS = _ARRAY_KEYS + ('type',)
+
+    def __init__(self, vertices=None, faces=None, edges=None, type: str = 'unknown',
+                 vertex_dtype=VERTEX_DTYPE):
+        self.vertices = _as_rows(vertices, 3, vertex_dtype)
+        self.faces = _as_rows(faces, 3, INDEX_DTYPE)
+        self.edges = _as_rows(edges, 2, INDEX_DTYPE)
+        self.type = type
+
+    @classmethod
+    def from_triangulation(cls, mesh, vertex_dtype=VERTEX_DTYPE) -> 'MeshGeometry':
+        """Build from an ifcopenshell triangulation, using its raw buffers when available"""
+        return cls(
+            vertices=_read_buffer(mesh, 'verts', np.float64),
+            faces=_read_buffer(mesh, 'faces', np.int32),
+            edges=_read_buffer(mesh, 'edges', np.int32),
+            type='mesh',
+            vertex_dtype=vertex_dtype
+        )
+
+    def __getitem__(self, key: str):
+        if key in self._ARRAY_KEYS:
+            return RowListView(getattr(self, key))
+        if key == 'type':
+            return self.type
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return (f"MeshGeometry(type={self.type!r}, vertices={len(self.vertices)}, "
+                f"faces={len(self.faces)}, edges={len(self.edges)})")
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.vertices)
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self.faces)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the underlying arrays in bytes"""
+        return self.vertices.nbytes + self.faces.nbytes + self.edges.nbytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the plain dict-of-lists layout used by the JSON export"""
+        return {
+            'vertices': self.vertices.tolist(),
+            'faces': self.faces.tolist(),
+            'edges': self.edges.tolist(),
+            'type': self.type
+        }
+
+
+class MeshInstance(Mapping):
+    """
+    Placement of a shared MeshGeometry
+
+    The mesh is stored once in element-local coordinates and referenced by
+    every element using it, each with its own 4x4 local-to-world transform.
+    'vertices' yields world coordinates computed on access, so code reading
+    element geometry works unchanged for instanced elements.
+    """
+
+    __slots__ = ('mesh', 'mesh_id', 'transform')
+
+    _KEYS = ('vertices', 'faces', 'edges', 'type', 'mesh_id', 'transform')
+
+    type = 'instance'
+
+    def __init__(self, mesh: MeshGeometry, mesh_id: str, transform=None):
+        self.mesh = mesh
+        self.mesh_id = mesh_id
+        self.transform = np.eye(4) if transform is None else np.asarray(transform, dtype=np.float64).reshape(4, 4)
+
+    @property
+    def vertices(self) -> np.ndarray:
+        """World-space (N, 3) vertices"""
+        local = self.mesh.vertices
+        world = local @ self.transform[:3, :3].T + self.transform[:3, 3]
+        return world.astype(local.dtype, copy=False)
+
+    @property
+    def faces(self) -> np.ndarray:
+        return self.mesh.faces
+
+    @property
+    def edges(self) -> np.ndarray:
+        return self.mesh.edges
+
+    @property
+    def vertex_count(self) -> int:
+        return self.mesh.vertex_count
+
+    @property
+    def triangle_count(self) -> int:
+        return self.mesh.triangle_count
+
+    def __getitem__(self, key: str):
+        if key in ('vertices', 'faces', 'edges'):
+            return RowListView(getattr(self, key))
+        if key == 'type':
+            return self.type
+        if key == 'mesh_id':
+            return self.mesh_id
+        if key == 'transform':
+            return self.transform.tolist()
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"MeshInstance(mesh_id={self.mesh_id!r}, vertices={self.vertex_count})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Reference layout used by the JSON export; the mesh itself is exported once per model"""
+        return {
+            'type': self.type,
+            'mesh_id': self.mesh_id,
+            'transform': self.transform.tolist()
+        }
+
+
+def mesh_content_id(mesh: MeshGeometry) -> str:
+    """Content hash identifying identical meshes"""
+    digest = hashlib.sha1(mesh.vertices.tobytes())
+    digest.update(mesh.faces.tobytes())
+    return digest.hexdigest()[:20]
+
+
+def as_vertex_array(geometry) -> np.ndarray:
+    """Return the (N, 3) vertex array of a MeshGeometry, MeshInstance or legacy geometry dict"""
+    if isinstance(geometry, (MeshGeometry, MeshInstance)):
+        return geometry.vertices
+    vertices = geometry.get('vertices') if geometry else None
+    return _as_rows(vertices, 3, VERTEX_DTYPE)
+
+
+def element_bounds(geometry) -> Optional[Dict[str, List[float]]]:
+    """Axis-aligned {'min', 'max'} box of an element's geometry, None if it has no vertices"""
+    vertices = as_vertex_array(geometry)
+    if not len(vertices):
+        return None
+    return {'min': vertices.min(axis=0).tolist(), 'max': vertices.max(axis=0).tolist()}
+
+
+def footprint_area(geometry) -> float:
+    """
+    Area of a closed mesh projected onto the horizontal plane
+
+    The top and bottom of a closed solid project onto the same footprint,
+    so the footprint is half the unsigned projected area of all triangles.
+    """
+    vertices = as_vertex_array(geometry)
+    faces = as_face_array(geometry)
+    if not len(faces):
+        return 0.0
+
+    a = vertices[faces[:, 0], :2]
+    b = vertices[faces[:, 1], :2]
+    c = vertices[faces[:, 2], :2]
+    ab = b - a
+    ac = c - a
+    cross_z = ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0]
+    return float(np.abs(cross_z).sum() / 4)
+
+
+def as_face_array(geometry) -> np.ndarray:
+    """Return the (M, 3) face index array of a MeshGeometry, MeshInstance or legacy geometry dict"""
+    if isinstance(geometry, (MeshGeometry, MeshInstance)):
+        return geometry.faces
+    faces = geometry.get('faces') if geometry else None
+    return _as_rows(faces, 3, INDEX_DTYPE)
+
+
+def _as_rows(values, width: int, dtype) -> np.ndarray:
+    """Coerce a flat or nested sequence to a contiguous (N, width) array"""
+    if values is None:
+        return np.empty((0, width), dtype=dtype)
+    array = np.ascontiguousarray(values, dtype=dtype)
+    return array.reshape(-1, width)
+
+
+def _read_buffer(mesh, name: str, buffer_dtype) -> np.ndarray:
+    """Read a triangulation attribute, preferring the zero-copy '<name>_buffer' bytes"""
+    buffer = getattr(mesh, f'{name}_buffer', None)
+    if buffer is not None:
+        return np.frombuffer(buffer, dtype=buffer_dtype)
+    return np.asarray(getattr(mesh, name), dtype=buffer_dtype)
+
+
+class BoundingBoxAccumulator:
+    """Running axis-aligned bounding box over a stream of vertex arrays"""
+
+    __slots__ = ('min', 'max')
+
+    def __init__(self):
+        self.min = np.full(3, np.inf)
+        self.max = np.full(3, -np.inf)
+
+    def update(self, vertices: np.ndarray) -> None:
+        """Extend the box by an (N, 3) vertex array"""
+        if len(vertices):
+            np.minimum(self.min, vertices.min(axis=0), out=self.min)
+            np.maximum(self.max, vertices.max(axis=0), out=self.max)
+
+    def update_box(self, box: Optional[Dict[str, List[float]]]) -> None:
+        """Extend the box by an element's {'min', 'max'} box"""
+        if box:
+            np.minimum(self.min, box['min'], out=self.min)
+            np.maximum(self.max, box['max'], out=self.max)
+
+    @property
+    def empty(self) -> bool:
+        return not np.isfinite(self.min).all()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Bounding box in the model's {'min', 'max', 'size'} layout"""
+        if self.empty:
+            return {'min': [0, 0, 0], 'max': [0, 0, 0], 'size': [0, 0, 0]}
+        return {
+            'min': self.min.tolist(),
+            'max': self.max.tolist(),
+            'size': (self.max - self.min).tolist()
+        }
@@ -0,0 +1,290 @@
+"""
+Binary glTF (GLB) export of processed BIM geometry
+
+All element meshes share one vertex buffer and one index buffer; each
+element gets its own POSITION/indices accessors into those buffers and a
+node carrying its id in 'extras'. Properties and metadata go into a small
+JSON sidecar so the viewer can load geometry without parsing text.
+Coarse levels of detail become extra nodes referenced from the full-detail
+node through the MSFT_lod extension.
+"""
+
+import json
+import logging
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bim_processor.export import StreamingModelWriter
+from bim_processor.geometry import MeshInstance, as_face_array, as_vertex_array
+
+logger = logging.getLogger(__name__)
+
+GLB_MAGIC = 0x46546C67  # 'glTF'
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A  # 'JSON'
+CHUNK_BIN = 0x004E4942  # 'BIN\0'
+
+FLOAT = 5126
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+TRIANGLES = 4
+
+# IFC is Z-up, glTF is Y-up: rotate -90 degrees about X at the root node
+Z_UP_TO_Y_UP = [-0.7071067811865476, 0.0, 0.0, 0.7071067811865476]
+
+
+def export_to_glb(model, output_path: str, sidecar_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write model geometry as GLB and its properties as a JSON sidecar
+
+    Instanced elements (MeshInstance geometry) share one glTF mesh and carry
+    their transform as the node matrix.
+
+    Args:
+        model: BIMModel to export
+        output_path: Destination .glb path
+        sidecar_path: Destination for the properties/metadata JSON. Defaults
+            to output_path with '.glb' replaced by '.meta.json'.
+
+    Returns:
+        Summary with output paths, byte sizes and node/mesh/triangle counts
+    """
+    if sidecar_path is None:
+        sidecar_path = _default_sidecar_path(output_path)
+
+    meshes, placements = _collect_meshes(model.elements)
+
+    document, vertex_bytes, index_bytes = _build_document(model, meshes, placements)
+    json_chunk = _pad(json.dumps(document, separators=(',', ':')).encode('utf-8'), b' ')
+    bin_length = vertex_bytes + index_bytes
+    total_length = 12 + 8 + len(json_chunk) + 8 + bin_length
+
+    with open(output_path, 'wb') as f:
+        f.write(struct.pack('<III', GLB_MAGIC, GLB_VERSION, total_length))
+        f.write(struct.pack('<II', len(json_chunk), CHUNK_JSON))
+        f.write(json_chunk)
+        f.write(struct.pack('<II', bin_length, CHUNK_BIN))
+
+        # Vertex and index sections are streamed mesh by mesh
+        for vertices, _ in meshes:
+            f.write(np.ascontiguousarray(vertices, dtype='<f4').tobytes())
+        for _, faces in meshes:
+            f.write(np.ascontiguousarray(faces, dtype='<u4').tobytes())
+
+    with StreamingModelWriter(sidecar_path, format='json', exclude_fields=('geometry', 'lods')) as writer:
+        writer.write_header({
+            'id': model.id,
+            'name': model.name,
+            'version': model.version,
+            'metadata': model.metadata,
+            'geometry': os.path.basename(output_path)
+        })
+        for element in model.elements:
+            writer.write_element(element)
+        footer = {'bounding_box': model.bounding_box}
+        structure = getattr(model, 'spatial_structure', None)
+        if structure is not None:
+            footer['spatial_structure'] = structure.to_dict()
+        writer.write_footer(footer)
+
+    logger.info(f"Model geometry exported to: {output_path}")
+
+    return {
+        'output_path': output_path,
+        'sidecar_path': sidecar_path,
+        'glb_bytes': total_length,
+        'sidecar_bytes': writer.bytes_written,
+        'nodes': len(placements),
+        'meshes': len(meshes),
+        'triangles': int(sum(len(meshes[mesh][1]) for _, mesh, _, _ in placements))
+    }
+
+
+def load_glb(path: str) -> Tuple[Dict[str, Any], memoryview]:
+    """
+    Read a GLB file into its JSON document and binary chunk
+
+    The binary chunk is returned as a memoryview so accessors can be mapped
+    to NumPy arrays with accessor_array() without copying.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, version, length = struct.unpack_from('<III', data, 0)
+    if magic != GLB_MAGIC or version != GLB_VERSION:
+        raise ValueError(f"Not a glTF 2.0 binary file: {path}")
+
+    json_length, _ = struct.unpack_from('<II', data, 12)
+    document = json.loads(data[20:20 + json_length])
+    bin_offset = 20 + json_length
+    bin_length, _ = struct.unpack_from('<II', data, bin_offset)
+
+    return document, memoryview(data)[bin_offset + 8:bin_offset + 8 + bin_length]
+
+
+def accessor_array(document: Dict[str, Any], binary: memoryview, accessor_index: int) -> np.ndarray:
+    """Zero-copy NumPy view of a POSITION or indices accessor"""
+    accessor = document['accessors'][accessor_index]
+    view = document['bufferViews'][accessor['bufferView']]
+    dtype = np.float32 if accessor['componentType'] == FLOAT else np.uint32
+    width = 3 if accessor['type'] == 'VEC3' else 1
+    offset = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+    array = np.frombuffer(binary, dtype=dtype, count=accessor['count'] * width, offset=offset)
+    return array.reshape(-1, 3) if width == 3 else array
+
+
+def _collect_meshes(elements) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Split elements into unique (vertices, faces) meshes and (element, mesh index, matrix, lods) nodes
+
+    Instanced elements reference their shared local mesh with a transform;
+    other elements get their own world-space mesh and no matrix. lods holds
+    a (mesh index, matrix) pair per coarse level, None where the element is
+    culled and 0 where the level is the full-detail mesh.
+    """
+    meshes = []
+    placements = []
+    shared = {}
+
+    for element in elements:
+        placement = _add_mesh(element.geometry, meshes, shared)
+        if placement is None:
+            continue
+        lods = [lod if lod is None or isinstance(lod, int) else _add_mesh(lod, meshes, shared)
+                for lod in element.lods or ()]
+        placements.append((element, placement[0], placement[1], lods))
+
+    return meshes, placements
+
+
+def _add_mesh(geometry, meshes: List[tuple], shared: Dict[Any, int]) -> Optional[Tuple[int, Any]]:
+    """Register a geometry's mesh once and return its (mesh index, matrix), None if it has no triangles"""
+    if isinstance(geometry, MeshInstance):
+        if not len(geometry.mesh.faces):
+            return None
+        if geometry.mesh_id not in shared:
+            shared[geometry.mesh_id] = len(meshes)
+            meshes.append((geometry.mesh.vertices, geometry.mesh.faces))
+        return shared[geometry.mesh_id], geometry.transform
+
+    key = ('object', id(geometry))
+    if key not in shared:
+        vertices = as_vertex_array(geometry)
+        faces = as_face_array(geometry)
+        if not (len(vertices) and len(faces)):
+            return None
+        shared[key] = len(meshes)
+        meshes.append((vertices, faces))
+    return shared[key], None
+
+
+def _build_document(model, meshes: List[tuple], placements: List[tuple]) -> Tuple[Dict[str, Any], int, int]:
+    """Build the glTF JSON with accessors laid out over the shared buffers"""
+    vertex_total = sum(len(vertices) for vertices, _ in meshes)
+    index_total = sum(faces.size for _, faces in meshes)
+    vertex_bytes = vertex_total * 12
+    index_bytes = index_total * 4
+
+    accessors = []
+    gltf_meshes = []
+    vertex_offset = 0
+    index_offset = 0
+
+    for vertices, faces in meshes:
+        vertices32 = vertices.astype(np.float32, copy=False)
+        position = len(accessors)
+        accessors.append({
+            'bufferView': 0,
+            'byteOffset': vertex_offset * 12,
+            'componentType': FLOAT,
+            'count': len(vertices),
+            'type': 'VEC3',
+            'min': vertices32.min(axis=0).tolist(),
+            'max': vertices32.max(axis=0).tolist()
+        })
+        accessors.append({
+            'bufferView': 1,
+            'byteOffset': index_offset * 4,
+            'componentType': UNSIGNED_INT,
+            'count': int(faces.size),
+            'type': 'SCALAR'
+        })
+        gltf_meshes.append({
+            'primitives': [{'attributes': {'POSITION': position}, 'indices': position + 1,
+                            'mode': TRIANGLES}]
+        })
+        vertex_offset += len(vertices)
+        index_offset += faces.size
+
+    nodes = []
+    for element, mesh_index, matrix, _ in placements:
+        extras = {'id': element.id, 'global_id': element.global_id, 'type': element.type}
+        nodes.append(_node(str(element.name), mesh_index, matrix, extras))
+    children = list(range(1, len(nodes) + 1))
+
+    # Level-of-detail nodes follow the scene nodes and are only reachable through MSFT_lod
+    for node, (element, _, _, lods) in zip(nodes[:len(placements)], placements):
+        ids = []
+        for level, lod in enumerate(lods, start=1):
+            if isinstance(lod, int):
+                # Same mesh as full detail; the viewer keeps showing the finer level
+                continue
+            ids.append(len(nodes) + 1)
+            mesh_index, matrix = lod if lod is not None else (None, None)
+            nodes.append(_node(f"{element.name}_lod{level}", mesh_index, matrix, {'id': element.id, 'lod': level}))
+        if ids:
+            node['extensions'] = {'MSFT_lod': {'ids': ids}}
+
+    root = {'name': str(model.name), 'rotation': Z_UP_TO_Y_UP, 'children': children}
+
+    document = {
+        'asset': {'version': '2.0', 'generator': 'digital-twin-management BIMProcessor'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [root] + nodes,
+        'meshes': gltf_meshes,
+        'accessors': accessors,
+        'bufferViews': [
+            {'buffer': 0, 'byteOffset': 0, 'byteLength': vertex_bytes, 'target': ARRAY_BUFFER},
+            {'buffer': 0, 'byteOffset': vertex_bytes, 'byteLength': index_bytes,
+             'target': ELEMENT_ARRAY_BUFFER}
+        ],
+        'buffers': [{'byteLength': vertex_bytes + index_bytes}],
+        'extras': {'model_id': model.id, 'version': model.version}
+    }
+
+    if any('extensions' in node for node in nodes):
+        document['extensionsUsed'] = ['MSFT_lod']
+
+    if not meshes:
+        # Zero-length buffers are not valid glTF
+        for key in ('meshes', 'accessors', 'bufferViews', 'buffers'):
+            del document[key]
+
+    return document, vertex_bytes, index_bytes
+
+
+def _node(name: str, mesh_index: Optional[int], matrix, extras: Dict[str, Any]) -> Dict[str, Any]:
+    """glTF node for a mesh placement; culled levels get a node without a mesh"""
+    node = {'name': name, 'extras': extras}
+    if mesh_index is not None:
+        node['mesh'] = mesh_index
+    if matrix is not None:
+        # glTF matrices are column-major
+        node['matrix'] = np.asarray(matrix, dtype=np.float64).T.ravel().tolist()
+    return node
+
+
+def _default_sidecar_path(output_path: str) -> str:
+    if output_path.endswith('.glb'):
+        return output_path[:-4] + '.meta.json'
+    return output_path + '.meta.json'
+
+
+def _pad(data: bytes, fill: bytes) -> bytes:
+    """Pad a chunk to the 4-byte alignment required by GLB"""
+    return data + fill * (-len(data) % 4)
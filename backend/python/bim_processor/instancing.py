@@ -0,0 +1,120 @@
+"""
+Geometry instancing for repeated element meshes
+
+Doors, windows, furniture and other type-based elements usually share a
+representation map (IfcMappedItem). The registry keys elements by that
+shared representation so each unique mesh is tessellated once in local
+coordinates, and additionally deduplicates identical meshes by content hash.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from bim_processor.geometry import MeshGeometry, MeshInstance, mesh_content_id
+
+try:
+    import ifcopenshell.util.placement
+    import ifcopenshell.util.unit
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+
+class InstanceRegistry:
+    """Unique meshes of one processing run, by representation key and content hash"""
+
+    def __init__(self, ifc_file=None):
+        self.by_key: Dict[str, str] = {}
+        self.by_id: Dict[str, MeshGeometry] = {}
+        self.unit_scale = 1.0
+        if ifc_file is not None:
+            try:
+                self.unit_scale = ifcopenshell.util.unit.calculate_unit_scale(ifc_file)
+            except Exception as e:
+                logger.warning(f"Error reading length unit, assuming meters: {str(e)}")
+
+    def lookup(self, key: Optional[str]) -> Optional[MeshInstance]:
+        """Shared mesh registered for a representation key, if any"""
+        mesh_id = self.by_key.get(key) if key is not None else None
+        if mesh_id is None:
+            return None
+        return MeshInstance(self.by_id[mesh_id], mesh_id)
+
+    def register(self, mesh: MeshGeometry, key: Optional[str] = None) -> MeshInstance:
+        """Register a tessellated local mesh, reusing an identical one if present"""
+        mesh_id = mesh_content_id(mesh)
+        mesh = self.by_id.setdefault(mesh_id, mesh)
+        if key is not None:
+            self.by_key[key] = mesh_id
+        return MeshInstance(mesh, mesh_id)
+
+    def placement_matrix(self, element) -> np.ndarray:
+        """Element local-to-world matrix from its ObjectPlacement, in meters"""
+        matrix = np.array(ifcopenshell.util.placement.get_local_placement(element.ObjectPlacement),
+                          dtype=np.float64)
+        matrix[:3, 3] *= self.unit_scale
+        return matrix
+
+
+def representation_key(element) -> Optional[str]:
+    """
+    Key identifying elements whose local geometry is guaranteed identical
+
+    Only elements whose body representation consists solely of mapped items
+    and that have no openings qualify; the key is built from the mapping
+    sources and the values of their mapping targets.
+    """
+    try:
+        if getattr(element, 'HasOpenings', None):
+            return None
+        product_shape = getattr(element, 'Representation', None)
+        if product_shape is None:
+            return None
+
+        parts = []
+        for representation in product_shape.Representations:
+            if representation.RepresentationIdentifier not in (None, 'Body'):
+                continue
+            for item in representation.Items:
+                if not item.is_a('IfcMappedItem'):
+                    return None
+                target = item.MappingTarget.get_info(include_identifier=False, recursive=True)
+                parts.append(f"{item.MappingSource.id()}:{target!r}")
+
+        return '|'.join(parts) if parts else None
+    except Exception as e:
+        logger.warning(f"Error reading representation of element {element.id()}: {str(e)}")
+        return None
+
+
+def shape_matrix(shape) -> np.ndarray:
+    """4x4 local-to-world matrix of a shape tessellated without world coordinates"""
+    matrix = shape.transformation.matrix
+    values = list(getattr(matrix, 'data', matrix))
+
+    if len(values) == 16:
+        return np.array(values, dtype=np.float64).reshape(4, 4).T
+
+    # Older ifcopenshell: 4 columns of 3 (rotation columns, then translation)
+    result = np.eye(4)
+    result[:3, :4] = np.array(values, dtype=np.float64).reshape(4, 3).T
+    return result
+
+
+def instancing_statistics(elements) -> Dict[str, Any]:
+    """Instanced element count, unique mesh count and their ratio"""
+    instances = 0
+    mesh_ids = set()
+    for element in elements:
+        if isinstance(element.geometry, MeshInstance):
+            instances += 1
+            mesh_ids.add(element.geometry.mesh_id)
+
+    return {
+        'instances': instances,
+        'unique_meshes': len(mesh_ids),
+        'instancing_ratio': instances / len(mesh_ids) if mesh_ids else 0.0
+    }
@@ -0,0 +1,144 @@
+"""
+On-demand element loading for large IFC models
+
+A LazyBIMModel indexes element ids and types when the file is opened and
+only tessellates and extracts properties for an element when it is first
+accessed. Processed elements are kept in a bounded LRU cache, so metadata
+and type statistics are available at roughly the cost of opening the file.
+"""
+
+import copy
+import logging
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+from bim_processor.geometry import BoundingBoxAccumulator, footprint_area
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ELEMENT_CACHE_SIZE = 1024
+
+
+class LazyElementList:
+    """Iterable over a LazyBIMModel's elements, processing each on access"""
+
+    __slots__ = ('_model',)
+
+    def __init__(self, model: 'LazyBIMModel'):
+        self._model = model
+
+    def __len__(self) -> int:
+        """Number of indexed elements (elements that fail to process are skipped when iterating)"""
+        return len(self._model._element_ids)
+
+    def __iter__(self):
+        for step_id in self._model._element_ids:
+            element = self._model._load(step_id)
+            if element is not None:
+                yield element
+
+    def __repr__(self) -> str:
+        return f"LazyElementList({len(self)} elements)"
+
+
+class LazyBIMModel:
+    """
+    BIM model whose elements are processed on first access
+
+    Exposes the same fields as BIMModel, so it can be passed to
+    get_element_statistics and the exporters. 'elements' processes elements
+    as it is iterated; 'bounding_box' processes every element once and also
+    fills in the floor areas in metadata.
+    """
+
+    def __init__(self, processor, ifc_file, metadata: Dict[str, Any],
+                 cache_size: int = DEFAULT_ELEMENT_CACHE_SIZE):
+        """
+        Args:
+            processor: BIMProcessor whose settings are used to process elements
+            ifc_file: Open IFC file
+            metadata: Model metadata from the processor
+            cache_size: Maximum number of processed elements kept in memory
+        """
+        self.id = metadata.get('project_name', 'unknown')
+        self.name = metadata.get('project_name', 'Unknown Project')
+        self.version = metadata.get('schema_version', 'unknown')
+        self.metadata = metadata
+        self.meshes = {}
+        self.spatial_index = None
+        self.cache_size = max(1, int(cache_size))
+        self.elements = LazyElementList(self)
+
+        # Per-run state (instancing, relationship index) belongs to this model
+        self._processor = copy.copy(processor)
+        self._ifc_file = ifc_file
+        self._started = False
+        self._cache: 'OrderedDict[int, Any]' = OrderedDict()
+        self._bounding_box: Optional[Dict[str, Any]] = None
+
+        ifc_elements = processor._collect_ifc_elements(ifc_file)
+        self._element_ids: List[int] = [element.id() for element in ifc_elements]
+        self._element_types: List[str] = [element.is_a() for element in ifc_elements]
+        self._indexed = set(self._element_ids)
+
+    def element_types(self) -> Dict[str, int]:
+        """Element count per IFC type, from the index alone"""
+        return dict(Counter(self._element_types))
+
+    def get_element(self, element_id: str):
+        """Processed BIMElement by id, None if it is not indexed or fails to process"""
+        step_id = int(element_id)
+        if step_id not in self._indexed:
+            return None
+        return self._load(step_id)
+
+    def iter_elements(self, element_type: Optional[str] = None) -> Iterator[Any]:
+        """Processed elements of one IFC type (or all), in extraction order"""
+        for step_id, ifc_type in zip(self._element_ids, self._element_types):
+            if element_type is None or ifc_type == element_type:
+                element = self._load(step_id)
+                if element is not None:
+                    yield element
+
+    @property
+    def bounding_box(self) -> Dict[str, Any]:
+        if self._bounding_box is None:
+            self._scan()
+        return self._bounding_box
+
+    @property
+    def cached_elements(self) -> int:
+        """Number of processed elements currently held in memory"""
+        return len(self._cache)
+
+    def _load(self, step_id: int):
+        """Process an element, or return it from the LRU cache"""
+        if step_id in self._cache:
+            self._cache.move_to_end(step_id)
+            return self._cache[step_id]
+
+        if not self._started:
+            self._processor._start_run(self._ifc_file)
+            self._started = True
+
+        element = self._processor._process_element(self._ifc_file.by_id(step_id))
+
+        # Failures are cached too so they are not retried on every access
+        self._cache[step_id] = element
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return element
+
+    def _scan(self) -> None:
+        """Process every element once for the bounding box and floor areas"""
+        bounding_box = BoundingBoxAccumulator()
+        slab_areas = {}
+        slab_ids = self._processor._slab_ids(self._ifc_file)
+
+        for element in self.elements:
+            bounding_box.update_box(element.bounding_box)
+            if element.id in slab_ids:
+                slab_areas[element.id] = footprint_area(element.geometry)
+
+        self._processor._apply_floor_areas(self.metadata, self._ifc_file, slab_areas)
+        self._bounding_box = bounding_box.to_dict()
@@ -0,0 +1,144 @@
+"""
+Level-of-detail meshes for processed BIM geometry
+
+Each coarse level keeps a fraction of the full-detail triangles, reduced
+with quadric decimation, and culls elements whose bounding box is too small
+to matter at that distance. Shared meshes of instanced elements are
+decimated once per level and stay shared. A level that decimation leaves
+unchanged (small meshes, failed decimations) is stored as 0, a reference to
+the full-detail level, so exporters do not write the same mesh again.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bim_processor.geometry import MeshGeometry, MeshInstance, as_face_array, mesh_content_id
+
+try:
+    import trimesh
+    import fast_simplification  # noqa: F401 - backend of Trimesh.simplify_quadric_decimation
+    DECIMATION_AVAILABLE = True
+except ImportError:
+    DECIMATION_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Meshes with this many triangles or fewer are kept as-is at every level
+MIN_DECIMATION_FACES = 16
+
+
+@dataclass(frozen=True)
+class LodLevel:
+    """A coarse level of detail"""
+    ratio: float  # Fraction of the full-detail triangles to keep
+    min_size: float  # Elements with a smaller bounding box diagonal (meters) are culled
+
+
+DEFAULT_LOD_LEVELS = (LodLevel(ratio=0.25, min_size=0.1), LodLevel(ratio=0.05, min_size=1.0))
+
+
+class LodGenerator:
+    """Builds the coarse levels of each element during one processing run"""
+
+    def __init__(self, levels: Sequence[LodLevel] = DEFAULT_LOD_LEVELS, vertex_dtype=np.float64):
+        if not DECIMATION_AVAILABLE:
+            raise ImportError("trimesh and fast-simplification are required for level-of-detail meshes.")
+        self.levels = tuple(levels)
+        self.vertex_dtype = np.dtype(vertex_dtype)
+        self._shared: Dict[Tuple[str, int], Tuple[MeshGeometry, str]] = {}
+
+    def generate(self, geometry, bounding_box: Optional[Dict[str, List[float]]]) -> List[Optional[Any]]:
+        """
+        Coarse levels of an element's geometry
+
+        Each entry is the level's geometry, None where the element is culled,
+        or 0 where the level is the full-detail geometry itself.
+
+        Args:
+            geometry: Full-detail MeshGeometry or MeshInstance
+            bounding_box: The element's {'min', 'max'} box, None if it has no geometry
+        """
+        if not bounding_box:
+            return [None] * len(self.levels)
+
+        size = float(np.linalg.norm(np.subtract(bounding_box['max'], bounding_box['min'])))
+        lods = []
+        for level_index, level in enumerate(self.levels):
+            if size < level.min_size:
+                lods.append(None)
+                continue
+            if isinstance(geometry, MeshInstance):
+                lod = self._instance_level(geometry, level_index)
+            else:
+                lod = self.decimate(geometry, level.ratio)
+            # Undecimated levels refer to the full-detail geometry instead of repeating it
+            lods.append(0 if _mesh(lod) is _mesh(geometry) else lod)
+        return lods
+
+    def decimate(self, mesh: MeshGeometry, ratio: float) -> MeshGeometry:
+        """Quadric decimation of a mesh to ratio of its triangles; small meshes are returned unchanged"""
+        target = int(len(mesh.faces) * ratio)
+        if len(mesh.faces) <= MIN_DECIMATION_FACES or target >= len(mesh.faces):
+            return mesh
+
+        try:
+            # Tessellated IFC meshes are unwelded; merge shared vertices so
+            # edge collapses are not blocked by seams between faces
+            source = trimesh.Trimesh(mesh.vertices.astype(np.float64), mesh.faces.astype(np.int64))
+            simplified = source.simplify_quadric_decimation(face_count=max(target, 4))
+        except Exception as e:
+            logger.warning(f"Error decimating mesh, keeping full detail: {str(e)}")
+            return mesh
+
+        return MeshGeometry(simplified.vertices, simplified.faces, type=mesh.type,
+                            vertex_dtype=self.vertex_dtype)
+
+    def _instance_level(self, instance: MeshInstance, level_index: int) -> MeshInstance:
+        """Decimate a shared mesh once per level and place it like the full-detail instance"""
+        key = (instance.mesh_id, level_index)
+        if key not in self._shared:
+            mesh = self.decimate(instance.mesh, self.levels[level_index].ratio)
+            mesh_id = instance.mesh_id if mesh is instance.mesh else mesh_content_id(mesh)
+            self._shared[key] = (mesh, mesh_id)
+
+        mesh, mesh_id = self._shared[key]
+        return MeshInstance(mesh, mesh_id, instance.transform)
+
+
+def _mesh(geometry) -> MeshGeometry:
+    return geometry.mesh if isinstance(geometry, MeshInstance) else geometry
+
+
+def resolve_level(geometry, lods: Sequence[Any], level: int) -> Optional[Any]:
+    """Geometry of coarse level (1-based), following references to earlier levels (0 is full detail)"""
+    lod = lods[level - 1]
+    while isinstance(lod, int) and not isinstance(lod, bool):
+        if lod == 0:
+            return geometry
+        lod = lods[lod - 1]
+    return lod
+
+
+def lod_statistics(elements, levels: Sequence[LodLevel]) -> Dict[str, Any]:
+    """Triangle and culled element counts for the full-detail geometry and each coarse level"""
+    full_triangles = 0
+    rows = [{'ratio': level.ratio, 'min_size': level.min_size, 'triangles': 0, 'culled': 0}
+            for level in levels]
+
+    for element in elements:
+        full_triangles += len(as_face_array(element.geometry))
+        lods = element.lods or ()
+        for level, row in enumerate(rows[:len(lods)], start=1):
+            lod = resolve_level(element.geometry, lods, level)
+            if lod is None:
+                row['culled'] += 1
+            else:
+                row['triangles'] += len(as_face_array(lod))
+
+    for row in rows:
+        row['triangle_ratio'] = row['triangles'] / full_triangles if full_triangles else 0.0
+
+    return {'triangles': full_triangles, 'levels': rows}
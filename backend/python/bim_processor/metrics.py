@@ -0,0 +1,244 @@
+"""
+Per-run instrumentation of the BIM pipeline
+
+PipelineMetrics collects wall-clock time per pipeline stage (opening the
+file, relationship indexing, tessellation, property extraction, export,
+...), per-IFC-type element counts and processing time, and counters such
+as triangles and bytes written. A run's metrics are returned as a dict for
+task results and, when prometheus-client is installed, added to process
+wide Prometheus metrics.
+
+SamplingProfiler is an opt-in, pure-Python sampling profiler writing
+collapsed stacks ("folded" format, one 'frame;frame;frame count' line per
+stack) that flamegraph.pl, speedscope and similar tools read directly.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+try:
+    from prometheus_client import CollectorRegistry, Counter as PrometheusCounter, Gauge, Histogram
+    from prometheus_client import multiprocess, start_http_server
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+# Seconds buckets for pipeline stages, from sub-second steps to hour-long runs
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+MAX_STACK_DEPTH = 128
+
+if PROMETHEUS_AVAILABLE:
+    STAGE_SECONDS = Histogram('bim_stage_seconds', 'Wall-clock seconds per BIM pipeline stage',
+                              ['stage'], buckets=STAGE_BUCKETS)
+    ELEMENTS = PrometheusCounter('bim_elements', 'Processed BIM elements', ['ifc_type'])
+    ELEMENT_SECONDS = PrometheusCounter('bim_element_seconds', 'Seconds spent processing elements',
+                                        ['ifc_type'])
+    TRIANGLES = PrometheusCounter('bim_triangles', 'Triangles of processed element meshes')
+    BYTES_WRITTEN = PrometheusCounter('bim_bytes_written', 'Bytes of BIM exports written')
+    PEAK_RSS = Gauge('process_peak_rss_bytes', 'Peak resident set size of the process',
+                     multiprocess_mode='max')
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, None where unavailable"""
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return int(peak if sys.platform == 'darwin' else peak * 1024)
+
+
+def publish_peak_rss() -> None:
+    """Update the process's peak RSS gauge"""
+    peak = peak_rss_bytes()
+    if PROMETHEUS_AVAILABLE and peak is not None:
+        PEAK_RSS.set(peak)
+
+
+def start_metrics_server(port: int) -> bool:
+    """
+    Serve Prometheus metrics on port; returns False without prometheus-client
+
+    With PROMETHEUS_MULTIPROC_DIR set (prefork Celery workers), the server
+    aggregates the metrics every worker process writes to that directory.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return False
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+    return True
+
+
+def timed_stage(name: str):
+    """Decorator timing a method of an object with a .metrics PipelineMetrics as a stage"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class PipelineMetrics:
+    """Stage timings and counters of one processing run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = Counter()
+        self.type_counts: Dict[str, int] = Counter()
+        self.type_seconds: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block as (part of) a pipeline stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - start
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] += seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += int(amount)
+
+    def element(self, ifc_type: str, seconds: float, triangles: int = 0) -> None:
+        """Record one processed element"""
+        self.type_counts[ifc_type] += 1
+        self.type_seconds[ifc_type] += seconds
+        self.counters['elements'] += 1
+        self.counters['triangles'] += int(triangles)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary suitable for task results"""
+        seconds = time.perf_counter() - self.started
+        elements = self.counters.get('elements', 0)
+        element_seconds = sum(self.type_seconds.values())
+        return {
+            'seconds': round(seconds, 4),
+            'elements_per_second': round(elements / seconds, 1) if seconds > 0 else None,
+            'stages': {name: round(value, 4) for name, value in self.stages.items()},
+            'counters': dict(self.counters),
+            'ifc_types': {
+                ifc_type: {
+                    'elements': count,
+                    'seconds': round(self.type_seconds[ifc_type], 4),
+                    'ms_per_element': round(self.type_seconds[ifc_type] / count * 1000, 3)
+                }
+                for ifc_type, count in sorted(self.type_counts.items(),
+                                              key=lambda item: -self.type_seconds[item[0]])
+            },
+            'element_seconds': round(element_seconds, 4),
+            'peak_rss_bytes': peak_rss_bytes()
+        }
+
+    def publish(self) -> None:
+        """Add the run to the process's Prometheus metrics; call once, when the run is done"""
+        if not PROMETHEUS_AVAILABLE:
+            return
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.labels(stage=name).observe(seconds)
+        for ifc_type, count in self.type_counts.items():
+            ELEMENTS.labels(ifc_type=ifc_type).inc(count)
+            ELEMENT_SECONDS.labels(ifc_type=ifc_type).inc(self.type_seconds[ifc_type])
+        TRIANGLES.inc(self.counters.get('triangles', 0))
+        BYTES_WRITTEN.inc(self.counters.get('bytes_written', 0))
+        publish_peak_rss()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stack of one thread at a fixed interval
+
+    Usage:
+        with SamplingProfiler() as profiler:
+            run()
+        profiler.write('run.folded')
+
+    Samples are taken from a daemon thread. Time in C extension calls that
+    release the GIL (such as ifcopenshell's geometry iterator) shows under
+    the Python frame that made the call; calls holding the GIL delay the
+    samples instead.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL, thread_id: Optional[int] = None):
+        """
+        Args:
+            interval: Seconds between samples
+            thread_id: Thread to sample, by default the one entering the profiler
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, path: str) -> str:
+        """Write collapsed stacks, most frequent first; returns path"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.stacks[_collapse(frame)] += 1
+            self.samples += 1
+
+
+def _collapse(frame) -> str:
+    """Root-first 'module:function' frames of a stack joined by ';'"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', os.path.basename(code.co_filename))
+        names.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
@@ -0,0 +1,377 @@
+"""
+Memory-mapped store of processed BIM models
+
+A processed model is written to one binary file that readers map instead of
+parsing: a small JSON table of contents followed by aligned, raw NumPy
+arrays. Opening a store reads only the table of contents, so it takes
+milliseconds whatever the model size; element columns, meshes and
+properties are paged in by the operating system as queries touch them, and
+every process mapping the same file shares those pages through the page
+cache.
+
+Layout (little-endian):
+
+    b'BIMSTORE' | uint32 format version | uint32 0 | uint64 TOC length
+    TOC (UTF-8 JSON) | padding | arrays, each aligned to ALIGNMENT bytes
+
+The TOC holds the model header (id, name, version, metadata, bounding box),
+the type/storey/space/material pools, the spatial structure tree and, per
+array, its dtype, shape and offset from the start of the array section.
+Arrays are:
+
+- element columns of the ElementTable (step ids, GlobalIds, type/name/
+  storey/space/material codes, locations and bounding box corners);
+- step ids and GlobalIds sorted, with their rows, for binary-search lookups;
+- element names and properties as per-element JSON values in one byte
+  buffer with an offset index, so a property query is a slice of the map;
+- distinct meshes (instanced meshes once) as concatenated vertex, face and
+  edge buffers with per-mesh offsets, plus each element's mesh and
+  transform index.
+
+Coarse levels of detail are not stored.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from bim_processor.elements import MISSING, ElementColumns, ElementTable
+from bim_processor.export import json_default
+from bim_processor.geometry import INDEX_DTYPE, MeshInstance
+
+logger = logging.getLogger(__name__)
+
+STORE_MAGIC = b'BIMSTORE'
+STORE_VERSION = 2
+STORE_SUFFIX = '.bims'
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sIIQ')
+
+# Mesh / transform index of elements without geometry or placement
+NO_MESH = -1
+NO_TRANSFORM = -1
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _json_blob(values: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenated compact JSON encodings of values and their (n + 1) byte offsets"""
+    chunks = [
+        json.dumps(value, separators=(',', ':'), default=json_default).encode('utf-8')
+        for value in values
+    ]
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    if chunks:
+        np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+    return np.frombuffer(b''.join(chunks), dtype=np.uint8), offsets
+
+
+def _stack(arrays: List[np.ndarray], columns: int, dtype) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise concatenation of (k, columns) arrays and their (n + 1) row offsets"""
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    if arrays:
+        np.cumsum([len(array) for array in arrays], out=offsets[1:])
+        stacked = np.concatenate([np.asarray(array, dtype=dtype).reshape(-1, columns) for array in arrays])
+    else:
+        stacked = np.empty((0, columns), dtype=dtype)
+    return stacked, offsets
+
+
+def _geometry_arrays(geometries: list) -> Dict[str, np.ndarray]:
+    """Distinct meshes of the elements and each element's mesh and transform index"""
+    meshes, mesh_index = [], {}
+    transforms = []
+    element_mesh = np.full(len(geometries), NO_MESH, dtype=np.int32)
+    element_transform = np.full(len(geometries), NO_TRANSFORM, dtype=np.int32)
+
+    for row, geometry in enumerate(geometries):
+        if geometry is None:
+            continue
+        if isinstance(geometry, MeshInstance):
+            mesh = geometry.mesh
+            element_transform[row] = len(transforms)
+            transforms.append(geometry.transform)
+        else:
+            mesh = geometry
+        if not len(mesh.faces):
+            continue
+        # Instanced elements share one mesh object
+        index = mesh_index.get(id(mesh))
+        if index is None:
+            index = mesh_index[id(mesh)] = len(meshes)
+            meshes.append(mesh)
+        element_mesh[row] = index
+
+    vertex_dtype = np.result_type(*[mesh.vertices.dtype for mesh in meshes]) if meshes else np.float64
+    vertices, vertex_offsets = _stack([mesh.vertices for mesh in meshes], 3, vertex_dtype)
+    faces, face_offsets = _stack([mesh.faces for mesh in meshes], 3, INDEX_DTYPE)
+    edges, edge_offsets = _stack([mesh.edges for mesh in meshes], 2, INDEX_DTYPE)
+    return {
+        'mesh_vertices': vertices,
+        'mesh_vertex_offsets': vertex_offsets,
+        'mesh_faces': faces,
+        'mesh_face_offsets': face_offsets,
+        'mesh_edges': edges,
+        'mesh_edge_offsets': edge_offsets,
+        'element_mesh': element_mesh,
+        'element_transform': element_transform,
+        'transforms': np.array(transforms, dtype=np.float64).reshape(len(transforms), 4, 4)
+    }
+
+
+def write_model_store(model, output_path: str) -> int:
+    """
+    Write a processed model as a memory-mappable store
+
+    The file is written next to output_path and renamed into place, so
+    readers mapping the previous version keep a consistent file.
+
+    Args:
+        model: BIMModel; elements that are not an ElementTable are packed first
+        output_path: Destination path (conventionally ending in STORE_SUFFIX)
+
+    Returns:
+        Bytes written
+    """
+    table = model.elements
+    structure = getattr(model, 'spatial_structure', None)
+    if not isinstance(table, ElementTable):
+        table = ElementTable.from_elements(table)
+
+    step_order = np.argsort(table.step_ids, kind='stable')
+    global_order = np.argsort(table.global_ids, kind='stable')
+    names, name_offsets = _json_blob(table.names[code] for code in table.name_codes.tolist())
+    properties, property_offsets = _json_blob(element.properties for element in table)
+
+    arrays = {
+        'step_ids': table.step_ids,
+        'global_ids': table.global_ids,
+        'type_codes': table.type_codes,
+        'storey_codes': table.storey_codes,
+        'space_codes': table.space_codes,
+        'material_codes': table.material_codes,
+        'locations': table.locations,
+        'bounds_min': table.bounds_min,
+        'bounds_max': table.bounds_max,
+        'sorted_step_ids': table.step_ids[step_order],
+        'step_id_rows': step_order.astype(np.int64),
+        'sorted_global_ids': table.global_ids[global_order],
+        'global_id_rows': global_order.astype(np.int64),
+        'names': names,
+        'name_offsets': name_offsets,
+        'properties': properties,
+        'property_offsets': property_offsets
+    }
+    arrays.update(_geometry_arrays(table.geometries))
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        arrays[name] = array = np.ascontiguousarray(array)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    toc = json.dumps({
+        'header': {
+            'id': model.id,
+            'name': model.name,
+            'version': model.version,
+            'metadata': model.metadata,
+            'bounding_box': model.bounding_box
+        },
+        'types': table.types,
+        'storeys': table.storeys,
+        'spaces': table.spaces,
+        'materials': table.materials,
+        'spatial_structure': structure.to_dict() if structure is not None else None,
+        'arrays': layout
+    }, default=json_default).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(toc))
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREAMBLE.pack(STORE_MAGIC, STORE_VERSION, 0, len(toc)))
+            f.write(toc)
+            for name, array in arrays.items():
+                if array.size:
+                    f.seek(data_start + layout[name]['offset'])
+                    f.write(memoryview(array).cast('B'))
+            size = max(f.tell(), data_start)
+            f.truncate(size)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    logger.info(f"Model store written to: {output_path}")
+    return size
+
+
+class ModelStore(ElementColumns):
+    """
+    Read-only, memory-mapped processed model
+
+    Usage:
+        store = ModelStore.open('model.bims')
+        row = store.row('1234')
+        store.element(row), store.property_bytes(row), store.mesh(store.element_mesh[row])
+
+    Every array attribute is a view of the map; nothing is copied until a
+    caller converts it. Rows are positions in the original element order.
+    """
+
+    def __init__(self, path: str, buffer: mmap.mmap, toc: Dict[str, Any], data_start: int):
+        self.path = path
+        self.header: Dict[str, Any] = toc['header']
+        self.types: List[str] = toc['types']
+        self.storeys: List[str] = toc['storeys']
+        self.spaces: List[str] = toc['spaces']
+        # Site -> building -> storey -> space tree (SpatialStructure.to_dict), if known
+        self.spatial_structure: Optional[Dict[str, Any]] = toc['spatial_structure']
+        self.materials: List[Dict[str, Any]] = toc['materials']
+        self._buffer = buffer
+        self._array_names = list(toc['arrays'])
+        for name, spec in toc['arrays'].items():
+            shape = tuple(spec['shape'])
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(shape))
+            if count:
+                array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec['offset'])
+            else:
+                # Empty arrays at the end may lie past the end of the file
+                array = np.empty(0, dtype=dtype)
+            setattr(self, name, array.reshape(shape))
+
+    @classmethod
+    def open(cls, path: str) -> 'ModelStore':
+        """Map a store written by write_model_store"""
+        with open(path, 'rb') as f:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) < _PREAMBLE.size:
+                raise ValueError(f"Not a model store: {path}")
+            magic, version, _, toc_length = _PREAMBLE.unpack(preamble)
+            if magic != STORE_MAGIC:
+                raise ValueError(f"Not a model store: {path}")
+            if version != STORE_VERSION:
+                raise ValueError(f"Unsupported model store version {version} in {path}")
+            toc = json.loads(f.read(toc_length).decode('utf-8'))
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(path, buffer, toc, _align(_PREAMBLE.size + toc_length))
+
+    def close(self) -> None:
+        """Drop the arrays and unmap the file once no view of it is left"""
+        for name in self._array_names:
+            setattr(self, name, None)
+        try:
+            self._buffer.close()
+        except BufferError:
+            # Views handed out are still alive; the map closes with them
+            pass
+
+    def __enter__(self) -> 'ModelStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.step_ids)
+
+    def __repr__(self) -> str:
+        return f"ModelStore({self.path!r}, {len(self)} elements, {self.mesh_count} meshes)"
+
+    @property
+    def mesh_count(self) -> int:
+        return len(self.mesh_vertex_offsets) - 1
+
+    # Lookups
+
+    def row(self, element_id: str) -> Optional[int]:
+        """Row of the element with this step id, None if there is none"""
+        try:
+            step_id = int(element_id)
+        except (TypeError, ValueError):
+            return None
+        position = int(np.searchsorted(self.sorted_step_ids, step_id))
+        if position < len(self.sorted_step_ids) and self.sorted_step_ids[position] == step_id:
+            return int(self.step_id_rows[position])
+        return None
+
+    def row_by_global_id(self, global_id: str) -> Optional[int]:
+        """Row of the element with this GlobalId, None if there is none"""
+        key = global_id.encode('utf-8')
+        if len(key) > self.sorted_global_ids.dtype.itemsize:
+            return None
+        position = int(np.searchsorted(self.sorted_global_ids, key))
+        if position < len(self.sorted_global_ids) and self.sorted_global_ids[position] == key:
+            return int(self.global_id_rows[position])
+        return None
+
+    # Element fields
+
+    def name(self, row: int) -> Optional[str]:
+        return json.loads(bytes(self._slice(self.names, self.name_offsets, row)))
+
+    def property_bytes(self, row: int) -> memoryview:
+        """The element's properties as a JSON object, read from the map without parsing"""
+        return self._slice(self.properties, self.property_offsets, row)
+
+    def element_properties(self, row: int) -> Dict[str, Any]:
+        return json.loads(bytes(self.property_bytes(row)))
+
+    def element(self, row: int) -> Dict[str, Any]:
+        """Summary of an element: ids, name, type, storey, space, material, location and box"""
+        material = int(self.material_codes[row])
+        storey = int(self.storey_codes[row])
+        space = int(self.space_codes[row])
+        x, y, z = self.locations[row].tolist()
+        box_min = self.bounds_min[row].tolist()
+        return {
+            'id': str(self.step_ids[row]),
+            'global_id': self.global_ids[row].decode('utf-8'),
+            'name': self.name(row),
+            'type': self.types[self.type_codes[row]],
+            'storey': self.storeys[storey] if storey != MISSING else None,
+            'space': self.spaces[space] if space != MISSING else None,
+            'material': self.materials[material] if material != MISSING else None,
+            'location': None if x != x else {'x': x, 'y': y, 'z': z},
+            'bounding_box': None if box_min[0] != box_min[0] else {
+                'min': box_min, 'max': self.bounds_max[row].tolist()
+            },
+            'mesh': int(self.element_mesh[row]),
+            'transform': self.transform(row)
+        }
+
+    def transform(self, row: int) -> Optional[List[float]]:
+        """Row-major 4x4 local-to-world transform of an instanced element, None otherwise"""
+        index = int(self.element_transform[row])
+        return self.transforms[index].ravel().tolist() if index != NO_TRANSFORM else None
+
+    # Geometry
+
+    def mesh(self, index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(vertices, faces, edges) views of a stored mesh"""
+        if not 0 <= index < self.mesh_count:
+            raise IndexError(f"Mesh {index} out of range")
+        return (
+            self.mesh_vertices[self.mesh_vertex_offsets[index]:self.mesh_vertex_offsets[index + 1]],
+            self.mesh_faces[self.mesh_face_offsets[index]:self.mesh_face_offsets[index + 1]],
+            self.mesh_edges[self.mesh_edge_offsets[index]:self.mesh_edge_offsets[index + 1]]
+        )
+
+    def _slice(self, data: np.ndarray, offsets: np.ndarray, row: int) -> memoryview:
+        return memoryview(data[offsets[row]:offsets[row + 1]])
@@ -7,27 +7,44 @@ except ImportError:
     print("Warning: ifcopenshell not available. BIM processing will be limited.")
 
 import numpy as np
+import hashlib
 import json
 import os
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+import time
+from itertools import repeat
+from typing import Callable, Dict, Iterator, List, Any, Optional, Sequence, Set, Tuple
+from dataclasses import asdict, dataclass, field, replace
 import logging
 
+from bim_processor.cache import ProcessedModelCache
+from bim_processor.checkpoint import DEFAULT_CHUNK_SIZE, ChunkCheckpoints
+from bim_processor.elements import BIMElement, ElementTable, to_element, type_counts
+from bim_processor.export import StreamingModelWriter
+from bim_processor.gltf import export_to_glb
+from bim_processor.geometry import (
+    BoundingBoxAccumulator, MeshGeometry, MeshInstance, element_bounds, footprint_area
+)
+from bim_processor.instancing import (
+    InstanceRegistry, instancing_statistics, representation_key, shape_matrix
+)
+from bim_processor.lazy import DEFAULT_ELEMENT_CACHE_SIZE, LazyBIMModel
+from bim_processor.metrics import PipelineMetrics, timed_stage
+from bim_processor.model_store import write_model_store
+from bim_processor.lod import (
+    DECIMATION_AVAILABLE, DEFAULT_LOD_LEVELS, LodGenerator, LodLevel, lod_statistics
+)
+from bim_processor.relations import (
+    RelationshipIndex, convert_attribute, convert_material, convert_property_definition
+)
+from bim_processor.spatial_index import SpatialIndex
+from bim_processor.spatial_structure import SpatialStructure
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
-class BIMElement:
-    """Represents a BIM element with its properties and geometry"""
-    id: str
-    name: str
-    type: str
-    global_id: str
-    geometry: Dict[str, Any]
-    properties: Dict[str, Any]
-    material: Optional[Dict[str, Any]] = None
-    location: Optional[Dict[str, Any]] = None
+# Called with (elements done, elements total) as processing advances
+ProgressCallback = Callable[[int, int], None]
 
 @dataclass
 class BIMModel:
@@ -35,60 +52,179 @@ class BIMModel:
     id: str
     name: str
     version: str
-    elements: List[BIMElement]
+    elements: ElementTable
     metadata: Dict[str, Any]
     bounding_box: Dict[str, Any]
+    meshes: Dict[str, MeshGeometry] = field(default_factory=dict)
+    spatial_index: Optional[SpatialIndex] = None
+    spatial_structure: Optional[SpatialStructure] = None
+
+@dataclass
+class ChangeSet:
+    """Differences between two revisions of a model, by element GlobalId"""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary suitable for task results"""
+        return {
+            'added': self.added,
+            'removed': self.removed,
+            'modified': self.modified,
+            'unchanged': self.unchanged,
+            'changed': len(self.added) + len(self.removed) + len(self.modified)
+        }
 
 class BIMProcessor:
     """Handles IFC file processing and BIM model extraction"""
     
-    def __init__(self):
+    # Element types to extract, in extraction order
+    ELEMENT_TYPES = [
+        'IfcWall', 'IfcSlab', 'IfcBeam', 'IfcColumn', 'IfcDoor', 'IfcWindow',
+        'IfcRoof', 'IfcStair', 'IfcRamp', 'IfcFurnishingElement', 'IfcSanitaryTerminal',
+        'IfcFlowTerminal', 'IfcDistributionElement', 'IfcElectricalElement'
+    ]
+    
+    # Geometry settings applied to ifcopenshell.geom.settings
+    GEOMETRY_SETTINGS = {
+        'USE_WORLD_COORDS': True,
+        'INCLUDE_CURVES': True,
+        'APPLY_DEFAULT_MATERIALS': True
+    }
+    
+    def __init__(self, num_workers: int = 1, tessellation_batch_size: int = 2000,
+                 vertex_dtype=np.float64, cache: Optional[ProcessedModelCache] = None,
+                 instancing: bool = False, spatial_index: bool = False, lod: bool = False,
+                 lod_levels: Sequence[LodLevel] = DEFAULT_LOD_LEVELS):
+        """
+        Args:
+            num_workers: Number of tessellation threads. Values above 1 enable
+                the parallel geometry iterator instead of per-element create_shape.
+            tessellation_batch_size: Number of elements handed to the geometry
+                iterator at once in parallel mode
+            vertex_dtype: Vertex array dtype, np.float64 or np.float32 to halve
+                vertex memory
+            cache: Processed model cache consulted by process_ifc_file
+            instancing: Tessellate each unique mesh once in local coordinates
+                and give elements a MeshInstance (shared mesh plus transform)
+            spatial_index: Build a SpatialIndex over element bounding boxes
+                for every processed model (stored as model.spatial_index)
+            lod: Generate decimated level-of-detail meshes for every element
+                (stored as element.lods, one entry per level, None where culled
+                and 0 where the level is the full-detail geometry)
+            lod_levels: Coarse levels generated when lod is enabled
+        """
+        self.num_workers = max(1, int(num_workers or 1))
+        self.tessellation_batch_size = max(1, int(tessellation_batch_size))
+        self.vertex_dtype = np.dtype(vertex_dtype)
+        self.cache = cache
+        self.instancing = instancing
+        self.spatial_index = spatial_index
+        self.lod_levels = tuple(lod_levels) if lod else ()
+        self._instances: Optional[InstanceRegistry] = None
+        self._relations: Optional[RelationshipIndex] = None
+        # Entity digests of the current file, by step id (see _entity_digest)
+        self._digests: Dict[int, str] = {}
+        self._lod: Optional[LodGenerator] = None
+        # Stage timings and counters of the latest run (reset by every public entry point)
+        self.metrics = PipelineMetrics()
+        
+        if lod and not DECIMATION_AVAILABLE:
+            raise ImportError("trimesh and fast-simplification are required for level-of-detail meshes.")
+        
         if not IFC_AVAILABLE:
             logger.warning("IFC OpenShell not available. BIM processing will be limited.")
             self.settings = None
+            self.local_settings = None
         else:
-            self.settings = ifcopenshell.geom.settings()
-            self.settings.set(self.settings.USE_WORLD_COORDS, True)
-            self.settings.set(self.settings.INCLUDE_CURVES, True)
-            self.settings.set(self.settings.APPLY_DEFAULT_MATERIALS, True)
+            self.settings = self._create_settings(self.GEOMETRY_SETTINGS)
+            # Instanced meshes are tessellated in element-local coordinates
+            self.local_settings = self._create_settings({**self.GEOMETRY_SETTINGS, 'USE_WORLD_COORDS': False})
+    
+    def _create_settings(self, values: Dict[str, Any]):
+        """Build ifcopenshell geometry settings from a {name: value} mapping"""
+        settings = ifcopenshell.geom.settings()
+        for name, value in values.items():
+            settings.set(getattr(settings, name), value)
+        return settings
+    
+    def settings_fingerprint(self) -> Dict[str, Any]:
+        """Settings that affect processed output, used to key the model cache"""
+        return {
+            'geometry': self.GEOMETRY_SETTINGS,
+            'element_types': self.ELEMENT_TYPES,
+            'vertex_dtype': self.vertex_dtype.name,
+            'instancing': self.instancing,
+            'spatial_index': self.spatial_index,
+            'lod_levels': [asdict(level) for level in self.lod_levels],
+            'ifcopenshell': getattr(ifcopenshell, 'version', 'unknown') if IFC_AVAILABLE else None
+        }
     
-    def process_ifc_file(self, file_path: str) -> BIMModel:
+    def process_ifc_file(self, file_path: str, storeys: Optional[Sequence[str]] = None,
+                         spaces: Optional[Sequence[str]] = None,
+                         types: Optional[Sequence[str]] = None) -> BIMModel:
         """
         Process an IFC file and extract BIM model data
         
+        Storey, space and type filters scope the run: elements outside them
+        are dropped before tessellation, so processing one floor of a tall
+        building costs about that floor's share of the full run. The file is
+        still parsed in full, and floor areas only count processed slabs.
+        
         Args:
             file_path: Path to the IFC file
+            storeys: Only elements in these storeys (GlobalIds or names)
+            spaces: Only elements in these spaces (GlobalIds or names)
+            types: Only elements of these IFC types or their subtypes
             
         Returns:
-            BIMModel object containing all extracted data
+            BIMModel object containing all extracted data, with the scope in
+            metadata['scope'] when filtered
+            
+        Raises:
+            ValueError: If a storey or space matches nothing in the file
         """
         if not IFC_AVAILABLE:
             raise ImportError("IFC OpenShell is not available. Please install ifcopenshell to process IFC files.")
         
+        self.metrics = PipelineMetrics()
         try:
             logger.info(f"Processing IFC file: {file_path}")
             
+            # Return the cached result if this file was processed with the same settings
+            scope = self._scope(storeys, spaces, types)
+            cache_key = None
+            if self.cache is not None:
+                with self.metrics.stage('cache_lookup'):
+                    settings = self.settings_fingerprint()
+                    if scope is not None:
+                        settings['scope'] = scope
+                    cache_key = self.cache.key(file_path, settings)
+                    cached_model = self.cache.get(cache_key)
+                if cached_model is not None:
+                    logger.info(f"Loaded processed model from cache: {file_path}")
+                    return cached_model
+            
             # Load IFC file
-            ifc_file = ifcopenshell.open(file_path)
+            ifc_file = self._open_file(file_path)
             
             # Extract model metadata
             metadata = self._extract_metadata(ifc_file)
+            if scope is not None:
+                metadata['scope'] = scope
             
             # Extract elements
-            elements = self._extract_elements(ifc_file)
-            
-            # Calculate bounding box
-            bounding_box = self._calculate_bounding_box(elements)
+            elements = self._extract_elements(ifc_file, scope)
+            self._apply_floor_areas(metadata, ifc_file, self._slab_areas(ifc_file, elements))
             
             # Create BIM model
-            model = BIMModel(
-                id=metadata.get('project_name', 'unknown'),
-                name=metadata.get('project_name', 'Unknown Project'),
-                version=metadata.get('schema_version', 'unknown'),
-                elements=elements,
-                metadata=metadata,
-                bounding_box=bounding_box
-            )
+            model = self._create_model(metadata, elements, self._relations.structure)
+            
+            if cache_key is not None:
+                with self.metrics.stage('cache_store'):
+                    self.cache.put(cache_key, model)
             
             logger.info(f"Successfully processed IFC file. Found {len(elements)} elements.")
             return model
@@ -97,6 +233,453 @@ class BIMProcessor:
             logger.error(f"Error processing IFC file: {str(e)}")
             raise
     
+    def open_ifc_file(self, file_path: str,
+                      cache_size: int = DEFAULT_ELEMENT_CACHE_SIZE) -> LazyBIMModel:
+        """
+        Open an IFC file without processing its elements
+        
+        Only metadata and the element index are read up front; geometry,
+        properties and materials are extracted per element on first access.
+        
+        Args:
+            file_path: Path to the IFC file
+            cache_size: Maximum number of processed elements kept in memory
+            
+        Returns:
+            LazyBIMModel over the file's elements
+        """
+        if not IFC_AVAILABLE:
+            raise ImportError("IFC OpenShell is not available. Please install ifcopenshell to process IFC files.")
+        
+        self.metrics = PipelineMetrics()
+        try:
+            logger.info(f"Opening IFC file: {file_path}")
+            
+            ifc_file = self._open_file(file_path)
+            model = LazyBIMModel(self, ifc_file, self._extract_metadata(ifc_file), cache_size)
+            
+            logger.info(f"Indexed {len(model.elements)} elements for on-demand processing")
+            return model
+            
+        except Exception as e:
+            logger.error(f"Error opening IFC file: {str(e)}")
+            raise
+    
+    def process_ifc_file_chunked(self, file_path: str, checkpoints: Optional[ChunkCheckpoints] = None,
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                 progress: Optional[ProgressCallback] = None) -> BIMModel:
+        """
+        Process an IFC file chunk by chunk, checkpointing every finished chunk
+        
+        Produces the same model as process_ifc_file. Chunks already written
+        to checkpoints by an earlier, interrupted run are loaded instead of
+        processed again; the checkpoints are removed once the model is
+        assembled.
+        
+        Args:
+            file_path: Path to the IFC file
+            checkpoints: Checkpoints of this file and settings (see
+                ChunkCheckpoints.for_file), None to process in chunks without them
+            chunk_size: Elements per chunk when checkpoints is None
+            progress: Called with (elements done, elements total) after every chunk
+            
+        Returns:
+            BIMModel object containing all extracted data
+        """
+        if not IFC_AVAILABLE:
+            raise ImportError("IFC OpenShell is not available. Please install ifcopenshell to process IFC files.")
+        
+        self.metrics = PipelineMetrics()
+        try:
+            logger.info(f"Processing IFC file in chunks: {file_path}")
+            
+            cached_model = self.get_cached_model(file_path)
+            if cached_model is not None:
+                logger.info(f"Loaded processed model from cache: {file_path}")
+                return cached_model
+            
+            ifc_file = self._open_file(file_path)
+            metadata = self._extract_metadata(ifc_file)
+            self._start_run(ifc_file)
+            ifc_elements = self._collect_ifc_elements(ifc_file)
+            total = len(ifc_elements)
+            
+            size = checkpoints.chunk_size if checkpoints is not None else max(1, int(chunk_size))
+            if checkpoints is not None:
+                checkpoints.write_manifest(total)
+            
+            chunks = []
+            resumed = 0
+            for start in range(0, total, size):
+                index = start // size
+                elements = checkpoints.load(index) if checkpoints is not None else None
+                if elements is None:
+                    elements = self._process_chunk(ifc_file, ifc_elements[start:start + size])
+                    if checkpoints is not None:
+                        checkpoints.save(index, elements)
+                else:
+                    resumed += 1
+                chunks.append(elements)
+                
+                if progress is not None:
+                    progress(min(start + size, total), total)
+            
+            if resumed:
+                logger.info(f"Resumed {resumed} of {len(chunks)} chunks from checkpoints")
+            
+            model = self._assemble_chunks(metadata, ifc_file, chunks, self._relations.structure)
+            self._finish_chunked_run(file_path, model, checkpoints)
+            
+            logger.info(f"Successfully processed IFC file. Found {len(model.elements)} elements.")
+            return model
+            
+        except Exception as e:
+            logger.error(f"Error processing IFC file in chunks: {str(e)}")
+            raise
+    
+    def plan_chunks(self, file_path: str, checkpoints: ChunkCheckpoints) -> Dict[str, Any]:
+        """
+        Count a file's elements and record the chunking for process_chunk/merge_chunks
+        
+        Returns:
+            Manifest with 'elements', 'chunks' and 'chunk_size'
+        """
+        self.metrics = PipelineMetrics()
+        manifest = checkpoints.read_manifest()
+        if manifest is not None:
+            return manifest
+        
+        if not IFC_AVAILABLE:
+            raise ImportError("IFC OpenShell is not available. Please install ifcopenshell to process IFC files.")
+        
+        ifc_file = self._open_file(file_path)
+        return checkpoints.write_manifest(len(self._collect_ifc_elements(ifc_file)))
+    
+    def process_chunk(self, file_path: str, checkpoints: ChunkCheckpoints, index: int) -> int:
+        """
+        Process and checkpoint one chunk of a planned run, e.g. on another worker
+        
+        Returns:
+            Number of elements the chunk produced
+        """
+        self.metrics = PipelineMetrics()
+        if checkpoints.has(index):
+            elements = checkpoints.load(index)
+            if elements is not None:
+                return len(elements)
+        
+        if not IFC_AVAILABLE:
+            raise ImportError("IFC OpenShell is not available. Please install ifcopenshell to process IFC files.")
+        
+        ifc_file = self._open_file(file_path)
+        self._start_run(ifc_file)
+        ifc_elements = self._collect_ifc_elements(ifc_file)
+        positions = checkpoints.chunk_range(index, len(ifc_elements))
+        
+        elements = self._process_chunk(ifc_file, ifc_elements[positions.start:positions.stop])
+        checkpoints.save(index, elements)
+        logger.info(f"Processed chunk {index} of {file_path}: {len(elements)} elements")
+        return len(elements)
+    
+    def merge_chunks(self, file_path: str, checkpoints: ChunkCheckpoints) -> BIMModel:
+        """
+        Assemble the model of a planned run from its checkpointed chunks
+        
+        Raises:
+            RuntimeError: If the run was not planned or chunks are missing
+        """
+        if not IFC_AVAILABLE:
+            raise ImportError("IFC OpenShell is not available. Please install ifcopenshell to process IFC files.")
+        
+        self.metrics = PipelineMetrics()
+        manifest = checkpoints.read_manifest()
+        if manifest is None:
+            raise RuntimeError(f"No chunked processing run planned for {file_path}")
+        
+        chunks = [checkpoints.load(index) for index in range(manifest['chunks'])]
+        missing = [index for index, chunk in enumerate(chunks) if chunk is None]
+        if missing:
+            raise RuntimeError(f"Missing processed chunks of {file_path}: {missing}")
+        
+        ifc_file = self._open_file(file_path)
+        model = self._assemble_chunks(self._extract_metadata(ifc_file), ifc_file, chunks,
+                                      self._build_spatial_structure(ifc_file))
+        self._finish_chunked_run(file_path, model, checkpoints)
+        
+        logger.info(f"Merged {len(chunks)} chunks of {file_path} into {len(model.elements)} elements")
+        return model
+    
+    @timed_stage('open')
+    def _open_file(self, file_path: str):
+        return ifcopenshell.open(file_path)
+    
+    def _process_chunk(self, ifc_file, ifc_elements: list) -> List[BIMElement]:
+        """Processed elements of a slice of the collected IFC elements"""
+        if self.num_workers > 1:
+            return list(self._iter_elements_parallel(ifc_elements, ifc_file))
+        return [bim_element for bim_element in map(self._process_element, ifc_elements) if bim_element]
+    
+    def _assemble_chunks(self, metadata: Dict[str, Any], ifc_file, chunks: List[List[BIMElement]],
+                         structure: Optional[SpatialStructure] = None) -> BIMModel:
+        """Build the model from processed chunks in extraction order"""
+        elements = [element for chunk in chunks for element in chunk]
+        
+        # Chunks pickled separately each carry their own copy of shared meshes
+        meshes = {}
+        for element in elements:
+            for geometry in [element.geometry, *(element.lods or ())]:
+                if isinstance(geometry, MeshInstance):
+                    geometry.mesh = meshes.setdefault(geometry.mesh_id, geometry.mesh)
+        
+        self._apply_floor_areas(metadata, ifc_file, self._slab_areas(ifc_file, elements))
+        return self._create_model(metadata, elements, structure)
+    
+    def _finish_chunked_run(self, file_path: str, model: BIMModel,
+                            checkpoints: Optional[ChunkCheckpoints]) -> None:
+        """Cache the assembled model, then drop the run's checkpoints"""
+        if self.cache is not None:
+            with self.metrics.stage('cache_store'):
+                self.cache.put(self.cache.key(file_path, self.settings_fingerprint()), model)
+        if checkpoints is not None:
+            checkpoints.clear()
+    
+    def process_ifc_file_incremental(self, file_path: str,
+                                     previous_model: Optional[BIMModel] = None,
+                                     progress: Optional[ProgressCallback] = None
+                                     ) -> Tuple[BIMModel, ChangeSet]:
+        """
+        Process a revised IFC file, reusing unchanged elements of a previous revision
+        
+        Elements are matched by GlobalId and compared by a fingerprint of
+        their attributes, placement, representation, property sets and
+        material. Only added or modified elements are tessellated and have
+        their properties extracted; unchanged elements are carried over from
+        previous_model. Elements of previous_model without a fingerprint
+        (models processed before fingerprints were recorded) count as modified.
+        
+        Args:
+            file_path: Path to the revised IFC file
+            previous_model: Model of the previous revision, None to process everything
+            progress: Called with (elements done, elements total) as changed
+                elements are processed; reused elements count as done
+            
+        Returns:
+            Tuple of the new BIMModel (with fingerprints) and its ChangeSet
+        """
+        if not IFC_AVAILABLE:
+            raise ImportError("IFC OpenShell is not available. Please install ifcopenshell to process IFC files.")
+        
+        self.metrics = PipelineMetrics()
+        try:
+            logger.info(f"Incrementally processing IFC file: {file_path}")
+            
+            ifc_file = self._open_file(file_path)
+            metadata = self._extract_metadata(ifc_file)
+            self._start_run(ifc_file)
+            
+            previous = {}
+            if previous_model is not None:
+                previous = {element.global_id: element for element in previous_model.elements}
+            
+            changes = ChangeSet()
+            seen = set()
+            slots = []
+            pending = {}
+            
+            # Fingerprint every element and decide which ones need processing
+            for element in self._collect_ifc_elements(ifc_file):
+                global_id = getattr(element, 'GlobalId', '')
+                fingerprint = self._fingerprint_element(element)
+                previous_element = previous.get(global_id)
+                
+                if global_id not in seen:
+                    seen.add(global_id)
+                    if previous_element is None:
+                        changes.added.append(global_id)
+                    elif previous_element.fingerprint != fingerprint:
+                        changes.modified.append(global_id)
+                    else:
+                        changes.unchanged += 1
+                
+                if previous_element is not None and previous_element.fingerprint == fingerprint:
+                    # Step ids are not stable across revisions, and containment
+                    # is not part of the fingerprint
+                    reused = previous_element
+                    storey = self._relations.element_storey(element)
+                    space = self._relations.element_space(element)
+                    if reused.id != str(element.id()) or reused.storey != storey or reused.space != space:
+                        reused = replace(to_element(reused), id=str(element.id()), storey=storey, space=space)
+                    slots.append(reused)
+                else:
+                    pending[element.id()] = (element, fingerprint)
+                    slots.append(element.id())
+            
+            changes.removed = [global_id for global_id in previous if global_id not in seen]
+            
+            # Process added and modified elements only
+            reused = len(slots) - len(pending)
+            processed = self._process_pending(
+                ifc_file, pending,
+                progress=(lambda done, _: progress(reused + done, len(slots))) if progress is not None else None
+            )
+            elements = []
+            for slot in slots:
+                bim_element = processed.get(slot) if isinstance(slot, int) else slot
+                if bim_element:
+                    elements.append(bim_element)
+            
+            self._apply_floor_areas(metadata, ifc_file, self._slab_areas(ifc_file, elements))
+            model = self._create_model(metadata, elements, self._relations.structure)
+            
+            if self.cache is not None:
+                with self.metrics.stage('cache_store'):
+                    self.cache.put(self.cache.key(file_path, self.settings_fingerprint()), model)
+            
+            logger.info(
+                f"Incremental processing done: {len(changes.added)} added, "
+                f"{len(changes.modified)} modified, {len(changes.removed)} removed, "
+                f"{changes.unchanged} unchanged"
+            )
+            return model, changes
+            
+        except Exception as e:
+            logger.error(f"Error incrementally processing IFC file: {str(e)}")
+            raise
+    
+    def _process_pending(self, ifc_file, pending: Dict[int, tuple],
+                         progress: Optional[ProgressCallback] = None) -> Dict[int, BIMElement]:
+        """Process (element, fingerprint) pairs keyed by step id, in parallel when configured"""
+        processed = {}
+        items = list(pending.values())
+        batch_size = self.tessellation_batch_size
+        
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            shapes = {}
+            if self.num_workers > 1:
+                shapes = self._tessellate_batch(ifc_file, [element for element, _ in batch])
+            
+            for element, fingerprint in batch:
+                processed[element.id()] = self._process_element(element, shapes.get(element.id()), fingerprint)
+            
+            if progress is not None:
+                progress(len(processed), len(items))
+        
+        return processed
+    
+    @timed_stage('fingerprint')
+    def _fingerprint_element(self, element) -> str:
+        """
+        Hash of everything the processed element is derived from
+        
+        Covers the element's own attributes (including placement and
+        representation, followed recursively) plus its property sets and
+        material, ignoring step ids and owner history.
+        """
+        parts = [self._entity_digest(element)]
+        
+        for definition in getattr(element, 'IsDefinedBy', None) or ():
+            if definition.is_a('IfcRelDefinesByProperties'):
+                parts.append(self._value_digest(definition.RelatingPropertyDefinition))
+        
+        for association in getattr(element, 'HasAssociations', None) or ():
+            if association.is_a('IfcRelAssociatesMaterial'):
+                parts.append(self._value_digest(association.RelatingMaterial))
+        
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+    
+    def _entity_digest(self, entity) -> str:
+        """
+        Hash of an entity's type and attributes, referenced entities by their hash
+        
+        Digests are kept for the run, so shared entities (representation
+        maps, contexts, property sets, materials) are hashed once per file.
+        """
+        step_id = entity.id()
+        digest = self._digests.get(step_id)
+        if digest is None:
+            attributes = tuple(
+                None if entity.attribute_name(index) == 'OwnerHistory' else self._value_digest(entity[index])
+                for index in range(len(entity))
+            )
+            digest = self._digests[step_id] = hashlib.sha1(repr((entity.is_a(), attributes)).encode()).hexdigest()
+        return digest
+    
+    def _value_digest(self, value):
+        """Attribute value with entity references replaced by their digests"""
+        if isinstance(value, ifcopenshell.entity_instance):
+            if value.id():
+                return self._entity_digest(value)
+            # Typed values inside selects (e.g. IfcLabel) have no step id
+            return value.is_a(), tuple(self._value_digest(value[index]) for index in range(len(value)))
+        if isinstance(value, tuple):
+            return tuple(self._value_digest(item) for item in value)
+        return value
+    
+    @timed_stage('cache_lookup')
+    def get_cached_model(self, file_path: str) -> Optional[BIMModel]:
+        """Return the cached model for file_path, if the cache has one"""
+        if self.cache is None or not os.path.exists(file_path):
+            return None
+        return self.cache.get(self.cache.key(file_path, self.settings_fingerprint()))
+    
+    def _create_model(self, metadata: Dict[str, Any], elements: List[BIMElement],
+                      structure: Optional[SpatialStructure] = None) -> BIMModel:
+        """Assemble a BIMModel from metadata and processed elements"""
+        with self.metrics.stage('element_table'):
+            table = ElementTable.from_elements(elements)
+        
+        meshes = {}
+        for geometry, lods in zip(table.geometries, table.lods or repeat(None)):
+            for mesh_geometry in [geometry, *(lods or ())]:
+                if isinstance(mesh_geometry, MeshInstance):
+                    meshes[mesh_geometry.mesh_id] = mesh_geometry.mesh
+        
+        with self.metrics.stage('bounding_box'):
+            bounding_box = table.bounding_box()
+        
+        model = BIMModel(
+            id=metadata.get('project_name', 'unknown'),
+            name=metadata.get('project_name', 'Unknown Project'),
+            version=metadata.get('schema_version', 'unknown'),
+            elements=table,
+            metadata=metadata,
+            bounding_box=bounding_box,
+            meshes=meshes,
+            spatial_structure=structure
+        )
+        
+        if self.spatial_index:
+            self.build_spatial_index(model)
+        
+        return model
+    
+    @timed_stage('spatial_index')
+    def build_spatial_index(self, model: BIMModel) -> SpatialIndex:
+        """
+        Build a spatial index over the model's element bounding boxes
+        
+        The index is stored on the model (and therefore in the processed
+        model cache) and can be saved next to the export with
+        SpatialIndex.save() for other services to load.
+        """
+        model.spatial_index = SpatialIndex.from_model(model)
+        logger.info(f"Built spatial index over {len(model.spatial_index)} elements")
+        return model.spatial_index
+    
+    @timed_stage('spatial_structure')
+    def _build_spatial_structure(self, ifc_file) -> SpatialStructure:
+        return SpatialStructure.from_ifc(ifc_file)
+    
+    @timed_stage('relations')
+    def _start_run(self, ifc_file) -> None:
+        """Reset per-file processing state"""
+        self._instances = InstanceRegistry(ifc_file) if self.instancing else None
+        self._relations = RelationshipIndex(ifc_file)
+        self._digests = {}
+        self._lod = LodGenerator(self.lod_levels, self.vertex_dtype) if self.lod_levels else None
+    
+    @timed_stage('metadata')
     def _extract_metadata(self, ifc_file) -> Dict[str, Any]:
         """Extract metadata from IFC file"""
         metadata = {
@@ -123,48 +706,154 @@ class BIMProcessor:
                     metadata['building_name'] = getattr(building, 'Name', 'Unknown Building')
                     metadata['building_description'] = getattr(building, 'Description', '')
                     
-                    # Count floors
+                    # Count floors; areas are filled in from slab geometry
+                    # once elements are extracted (_apply_floor_areas)
                     floors = ifc_file.by_type('IfcBuildingStorey')
                     metadata['floor_count'] = len(floors)
                     
-                    # Calculate total area
-                    total_area = 0
-                    for floor in floors:
-                        area = self._calculate_floor_area(floor)
-                        total_area += area
-                    metadata['total_area'] = total_area
-                    
         except Exception as e:
             logger.warning(f"Error extracting metadata: {str(e)}")
         
         return metadata
     
-    def _extract_elements(self, ifc_file) -> List[BIMElement]:
-        """Extract all elements from IFC file"""
-        elements = []
+    def _extract_elements(self, ifc_file, scope: Optional[Dict[str, List[str]]] = None) -> List[BIMElement]:
+        """Extract all elements (or those in scope) from IFC file"""
+        return list(self._iter_elements(ifc_file, scope))
+    
+    def _iter_elements(self, ifc_file, scope: Optional[Dict[str, List[str]]] = None) -> Iterator[BIMElement]:
+        """Yield processed elements one at a time, in extraction order"""
+        self._start_run(ifc_file)
+        ifc_elements = self._collect_ifc_elements(ifc_file)
+        if scope is not None:
+            ifc_elements = self._scope_elements(ifc_elements, scope)
+        
+        if self.num_workers > 1:
+            yield from self._iter_elements_parallel(ifc_elements, ifc_file)
+            return
         
-        # Define element types to extract
-        element_types = [
-            'IfcWall', 'IfcSlab', 'IfcBeam', 'IfcColumn', 'IfcDoor', 'IfcWindow',
-            'IfcRoof', 'IfcStair', 'IfcRamp', 'IfcFurnishingElement', 'IfcSanitaryTerminal',
-            'IfcFlowTerminal', 'IfcDistributionElement', 'IfcElectricalElement'
-        ]
+        for element in ifc_elements:
+            bim_element = self._process_element(element)
+            if bim_element:
+                yield bim_element
+    
+    @timed_stage('collect')
+    def _collect_ifc_elements(self, ifc_file) -> list:
+        """
+        Collect the IFC entities to extract, in extraction order
+        
+        ELEMENT_TYPES overlap (by_type includes subtypes, e.g. an
+        IfcSanitaryTerminal is also an IfcFlowTerminal and an
+        IfcDistributionElement), so each entity is kept once, at its first type.
+        """
+        ifc_elements = []
+        seen = set()
         
-        for element_type in element_types:
+        for element_type in self.ELEMENT_TYPES:
             try:
-                type_elements = ifc_file.by_type(element_type)
-                for element in type_elements:
-                    bim_element = self._process_element(element)
-                    if bim_element:
-                        elements.append(bim_element)
+                for element in ifc_file.by_type(element_type):
+                    if element.id() not in seen:
+                        seen.add(element.id())
+                        ifc_elements.append(element)
             except Exception as e:
                 logger.warning(f"Error processing {element_type}: {str(e)}")
         
-        return elements
+        return ifc_elements
+    
+    @staticmethod
+    def _scope(storeys: Optional[Sequence[str]], spaces: Optional[Sequence[str]],
+               types: Optional[Sequence[str]]) -> Optional[Dict[str, List[str]]]:
+        """Filters of a scoped run, None when every element is processed"""
+        scope = {}
+        for name, values in (('storeys', storeys), ('spaces', spaces), ('types', types)):
+            if values is not None:
+                scope[name] = [values] if isinstance(values, str) else list(values)
+        return scope or None
+    
+    @timed_stage('scope')
+    def _scope_elements(self, ifc_elements: list, scope: Dict[str, List[str]]) -> list:
+        """Collected elements in the scope's storeys and spaces and of its types"""
+        if 'storeys' in scope or 'spaces' in scope:
+            wanted = self._relations.structure.element_ids(scope.get('storeys'), scope.get('spaces'))
+            ifc_elements = [element for element in ifc_elements if str(element.id()) in wanted]
+        if 'types' in scope:
+            types = scope['types']
+            ifc_elements = [element for element in ifc_elements
+                            if any(element.is_a(ifc_type) for ifc_type in types)]
+        logger.info(f"Scoped run to {len(ifc_elements)} elements: {scope}")
+        return ifc_elements
+    
+    def _iter_elements_parallel(self, ifc_elements: list, ifc_file) -> Iterator[BIMElement]:
+        """
+        Extract elements using the multi-threaded geometry iterator
+        
+        Elements are tessellated in batches so only one batch of shapes is
+        held in memory at a time. Elements are yielded in the same order and
+        with the same content as the serial path.
+        """
+        batch_size = self.tessellation_batch_size
+        
+        for start in range(0, len(ifc_elements), batch_size):
+            batch = ifc_elements[start:start + batch_size]
+            shapes = self._tessellate_batch(ifc_file, batch)
+            
+            for element in batch:
+                bim_element = self._process_element(element, shapes.get(element.id()))
+                if bim_element:
+                    yield bim_element
+    
+    @timed_stage('tessellation')
+    def _tessellate_batch(self, ifc_file, batch: list) -> Dict[int, Any]:
+        """Tessellate a batch of elements with the geometry iterator, keyed by element id"""
+        shapes = {}
+        unique_elements = list({element.id(): element for element in batch}.values())
+        settings = self.settings
+        
+        if self._instances is not None:
+            # Only the first element of each shared representation needs a shape
+            settings = self.local_settings
+            keys = set(self._instances.by_key)
+            first_elements = []
+            for element in unique_elements:
+                key = representation_key(element)
+                if key is None or key not in keys:
+                    first_elements.append(element)
+                    if key is not None:
+                        keys.add(key)
+            unique_elements = first_elements
+        
+        if not unique_elements:
+            return shapes
+        
+        try:
+            iterator = ifcopenshell.geom.iterator(
+                settings, ifc_file, self.num_workers, include=unique_elements
+            )
+            if iterator.initialize():
+                while True:
+                    shape = iterator.get()
+                    shapes[shape.id] = shape
+                    if not iterator.next():
+                        break
+        except Exception as e:
+            logger.warning(f"Error in parallel tessellation, falling back to serial: {str(e)}")
+        
+        return shapes
     
-    def _process_element(self, element) -> Optional[BIMElement]:
-        """Process individual IFC element"""
+    def _process_element(self, element, shape=None, fingerprint: Optional[str] = None) -> Optional[BIMElement]:
+        """
+        Process individual IFC element
+        
+        Every processed element carries its fingerprint, so any processed
+        model can be the previous revision of an incremental run.
+        
+        Args:
+            element: IFC entity to process
+            shape: Pre-computed shape from the geometry iterator, if any
+            fingerprint: The element's fingerprint, if already computed
+        """
         try:
+            started = time.perf_counter()
+            
             # Extract basic properties
             element_id = str(element.id())
             name = getattr(element, 'Name', f'{element.is_a()}_{element_id}')
@@ -172,7 +861,16 @@ class BIMProcessor:
             global_id = getattr(element, 'GlobalId', '')
             
             # Extract geometry
-            geometry = self._extract_geometry(element)
+            geometry = self._extract_geometry(element, shape)
+            
+            # Per-element bounding box
+            bounding_box = element_bounds(geometry)
+            
+            # Generate coarse levels of detail
+            lods = None
+            if self._lod is not None:
+                with self.metrics.stage('lod'):
+                    lods = self._lod.generate(geometry, bounding_box)
             
             # Extract properties
             properties = self._extract_properties(element)
@@ -183,7 +881,7 @@ class BIMProcessor:
             # Extract location
             location = self._extract_location(element)
             
-            return BIMElement(
+            bim_element = BIMElement(
                 id=element_id,
                 name=name,
                 type=element_type,
@@ -191,94 +889,118 @@ class BIMProcessor:
                 geometry=geometry,
                 properties=properties,
                 material=material,
-                location=location
+                location=location,
+                bounding_box=bounding_box,
+                lods=lods,
+                storey=self._relations.element_storey(element),
+                space=self._relations.element_space(element),
+                fingerprint=fingerprint or self._fingerprint_element(element)
             )
+            self.metrics.element(element_type, time.perf_counter() - started,
+                                 getattr(geometry, 'triangle_count', 0))
+            return bim_element
             
         except Exception as e:
             logger.warning(f"Error processing element {element.id()}: {str(e)}")
             return None
     
-    def _extract_geometry(self, element) -> Dict[str, Any]:
-        """Extract geometry from IFC element"""
-        geometry_data = {
-            'vertices': [],
-            'faces': [],
-            'edges': [],
-            'type': 'unknown'
-        }
+    @timed_stage('geometry')
+    def _extract_geometry(self, element, shape=None):
+        """
+        Extract geometry from IFC element
+        
+        Args:
+            element: IFC entity to tessellate
+            shape: Pre-computed shape from the geometry iterator. When omitted
+                (or the iterator produced none) the element is tessellated here.
+        """
+        if self._instances is not None:
+            return self._extract_instance(element, shape)
         
         try:
             # Create shape representation
-            shape = ifcopenshell.geom.create_shape(self.settings, element)
+            if shape is None:
+                shape = ifcopenshell.geom.create_shape(self.settings, element)
             
             if shape:
-                # Extract vertices
-                vertices = shape.verts
-                geometry_data['vertices'] = [
-                    [vertices[i], vertices[i+1], vertices[i+2]] 
-                    for i in range(0, len(vertices), 3)
-                ]
-                
-                # Extract faces
-                faces = shape.faces
-                geometry_data['faces'] = [
-                    [faces[i], faces[i+1], faces[i+2]] 
-                    for i in range(0, len(faces), 3)
-                ]
-                
-                # Extract edges
-                edges = shape.edges
-                geometry_data['edges'] = [
-                    [edges[i], edges[i+1]] 
-                    for i in range(0, len(edges), 2)
-                ]
+                # Triangulation data lives on the shape's geometry
+                mesh = getattr(shape, 'geometry', shape)
+                return MeshGeometry.from_triangulation(mesh, self.vertex_dtype)
                 
-                geometry_data['type'] = 'mesh'
+        except Exception as e:
+            logger.warning(f"Error extracting geometry: {str(e)}")
+        
+        return MeshGeometry(vertex_dtype=self.vertex_dtype)
+    
+    def _extract_instance(self, element, shape=None):
+        """
+        Extract geometry as a MeshInstance, tessellating only unseen meshes
+        
+        Elements sharing a mapped representation reuse the first element's
+        local mesh with their own placement; other meshes are tessellated
+        locally and deduplicated by content.
+        """
+        try:
+            key = representation_key(element)
+            instance = self._instances.lookup(key)
+            if instance is not None:
+                instance.transform = self._instances.placement_matrix(element)
+                return instance
+            
+            if shape is None:
+                shape = ifcopenshell.geom.create_shape(self.local_settings, element)
+            
+            if shape:
+                mesh = MeshGeometry.from_triangulation(getattr(shape, 'geometry', shape), self.vertex_dtype)
+                instance = self._instances.register(mesh, key)
+                instance.transform = shape_matrix(shape)
+                return instance
                 
         except Exception as e:
             logger.warning(f"Error extracting geometry: {str(e)}")
         
-        return geometry_data
+        return MeshGeometry(vertex_dtype=self.vertex_dtype)
     
+    @timed_stage('properties')
     def _extract_properties(self, element) -> Dict[str, Any]:
         """Extract properties from IFC element"""
         properties = {}
         
         try:
             # Extract basic attributes
-            for attr in element.get_info():
-                if attr not in ['id', 'type']:
-                    value = getattr(element, attr, None)
-                    if value is not None:
-                        properties[attr] = str(value)
-            
-            # Extract property sets
-            if hasattr(element, 'IsDefinedBy'):
+            for attr, value in element.get_info(recursive=False).items():
+                if attr not in ['id', 'type'] and value is not None:
+                    properties[attr] = convert_attribute(value)
+            
+            # Extract property and quantity sets
+            if self._relations is not None:
+                properties.update(self._relations.element_properties(element))
+            elif hasattr(element, 'IsDefinedBy'):
                 for definition in element.IsDefinedBy:
                     if definition.is_a('IfcRelDefinesByProperties'):
-                        property_set = definition.RelatingPropertyDefinition
-                        if property_set.is_a('IfcPropertySet'):
-                            for prop in property_set.HasProperties:
-                                properties[prop.Name] = prop.NominalValue.wrappedValue
+                        property_definitions = definition.RelatingPropertyDefinition
+                        if not isinstance(property_definitions, tuple):
+                            property_definitions = (property_definitions,)
+                        for property_definition in property_definitions:
+                            properties.update(convert_property_definition(property_definition))
                                 
         except Exception as e:
             logger.warning(f"Error extracting properties: {str(e)}")
         
         return properties
     
+    @timed_stage('materials')
     def _extract_material(self, element) -> Optional[Dict[str, Any]]:
         """Extract material information from IFC element"""
         try:
+            if self._relations is not None:
+                return self._relations.element_material(element)
             if hasattr(element, 'HasAssociations'):
                 for association in element.HasAssociations:
                     if association.is_a('IfcRelAssociatesMaterial'):
-                        material_select = association.RelatingMaterial
-                        if material_select.is_a('IfcMaterial'):
-                            return {
-                                'name': material_select.Name,
-                                'description': getattr(material_select, 'Description', ''),
-                                'category': getattr(material_select, 'Category', '')
-                            }
+                        material = convert_material(association.RelatingMaterial)
+                        if material is not None:
+                            return material
         except Exception as e:
             logger.warning(f"Error extracting material: {str(e)}")
         
@@ -302,82 +1024,275 @@ class BIMProcessor:
         
         return None
     
-    def _calculate_floor_area(self, floor) -> float:
-        """Calculate floor area"""
+    @timed_stage('floor_areas')
+    def _apply_floor_areas(self, metadata: Dict[str, Any], ifc_file,
+                           slab_areas: Dict[str, float]) -> None:
+        """
+        Set per-storey and total floor area in metadata
+        
+        Args:
+            metadata: Model metadata to update
+            ifc_file: Open IFC file, for storey containment
+            slab_areas: Footprint area of each extracted slab, by element id
+        """
+        floor_areas = []
+        try:
+            for floor in ifc_file.by_type('IfcBuildingStorey'):
+                floor_areas.append({
+                    'name': getattr(floor, 'Name', None),
+                    'global_id': getattr(floor, 'GlobalId', ''),
+                    'area': self._calculate_floor_area(floor, slab_areas)
+                })
+        except Exception as e:
+            logger.warning(f"Error calculating floor areas: {str(e)}")
+        
+        metadata['floor_areas'] = floor_areas
+        metadata['total_area'] = sum(floor['area'] for floor in floor_areas)
+    
+    def _slab_areas(self, ifc_file, elements) -> Dict[str, float]:
+        """Footprint area of every slab, by element id, from already extracted geometry"""
+        slab_ids = self._slab_ids(ifc_file)
+        return {
+            element.id: footprint_area(element.geometry)
+            for element in elements if element.id in slab_ids
+        }
+    
+    def _slab_ids(self, ifc_file) -> Set[str]:
+        """Element ids of IfcSlab and its subtypes, as _calculate_floor_area counts them"""
         try:
-            area = 0
+            return {str(slab.id()) for slab in ifc_file.by_type('IfcSlab')}
+        except Exception as e:
+            logger.warning(f"Error reading slabs: {str(e)}")
+            return set()
+    
+    def _calculate_floor_area(self, floor, slab_areas: Dict[str, float]) -> float:
+        """Calculate floor area as the summed footprint of the slabs the storey contains"""
+        try:
+            area = 0.0
             if hasattr(floor, 'ContainsElements'):
                 for rel in floor.ContainsElements:
                     for element in rel.RelatedElements:
                         if element.is_a('IfcSlab'):
-                            # Calculate slab area
-                            shape = ifcopenshell.geom.create_shape(self.settings, element)
-                            if shape:
-                                # Simple area calculation (can be improved)
-                                area += 100  # Placeholder
+                            area += slab_areas.get(str(element.id()), 0.0)
             return area
         except Exception as e:
             logger.warning(f"Error calculating floor area: {str(e)}")
             return 0
     
-    def _calculate_bounding_box(self, elements: List[BIMElement]) -> Dict[str, Any]:
-        """Calculate bounding box for all elements"""
-        if not elements:
-            return {'min': [0, 0, 0], 'max': [0, 0, 0]}
+    @timed_stage('export')
+    def export_to_json(self, model: BIMModel, output_path: str, indent: Optional[int] = 2,
+                       compression: Optional[str] = None) -> None:
+        """
+        Export BIM model to JSON format
         
-        all_vertices = []
-        for element in elements:
-            if element.geometry.get('vertices'):
-                all_vertices.extend(element.geometry['vertices'])
+        Elements are written one at a time rather than converting the whole
+        model to a dictionary first.
         
-        if not all_vertices:
-            return {'min': [0, 0, 0], 'max': [0, 0, 0]}
+        Args:
+            model: Model to export
+            output_path: Destination file path
+            indent: JSON indentation, None for compact output
+            compression: None, 'gzip' or 'zstd'
+        """
+        try:
+            with StreamingModelWriter(output_path, format='json', compression=compression,
+                                      indent=indent) as writer:
+                writer.write_header(self._model_header(model.id, model.name, model.version,
+                                                       model.metadata))
+                for element in model.elements:
+                    writer.write_element(element)
+                footer = {'bounding_box': model.bounding_box}
+                structure = getattr(model, 'spatial_structure', None)
+                if structure is not None:
+                    footer['spatial_structure'] = structure.to_dict()
+                writer.write_footer(footer)
+            self.metrics.count('bytes_written', writer.bytes_written)
+            
+            logger.info(f"Model exported to: {output_path}")
+            
+        except Exception as e:
+            logger.error(f"Error exporting model to JSON: {str(e)}")
+            raise
+    
+    @timed_stage('export')
+    def export_to_glb(self, model: BIMModel, output_path: str,
+                      sidecar_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Export BIM model geometry to binary glTF with a JSON properties sidecar
         
-        vertices_array = np.array(all_vertices)
-        min_coords = vertices_array.min(axis=0).tolist()
-        max_coords = vertices_array.max(axis=0).tolist()
+        Args:
+            model: Model to export
+            output_path: Destination .glb path
+            sidecar_path: Destination of the properties/metadata JSON, defaults
+                to '<name>.meta.json' next to the GLB
+            
+        Returns:
+            Summary with output paths, sizes and mesh/triangle counts
+        """
+        try:
+            summary = export_to_glb(model, output_path, sidecar_path)
+            self.metrics.count('bytes_written', summary['glb_bytes'] + summary['sidecar_bytes'])
+            return summary
+        except Exception as e:
+            logger.error(f"Error exporting model to GLB: {str(e)}")
+            raise
+    
+    @timed_stage('export')
+    def export_to_store(self, model: BIMModel, output_path: str) -> int:
+        """
+        Export BIM model to a memory-mapped model store (see model_store)
         
-        return {
-            'min': min_coords,
-            'max': max_coords,
-            'size': [max_coords[i] - min_coords[i] for i in range(3)]
-        }
+        Args:
+            model: Model to export
+            output_path: Destination .bims path
+            
+        Returns:
+            Bytes written
+        """
+        try:
+            size = write_model_store(model, output_path)
+            self.metrics.count('bytes_written', size)
+            return size
+        except Exception as e:
+            logger.error(f"Error exporting model store: {str(e)}")
+            raise
     
-    def export_to_json(self, model: BIMModel, output_path: str) -> None:
-        """Export BIM model to JSON format"""
+    def stream_ifc_file(self, file_path: str, output_path: str, format: str = 'ndjson',
+                        compression: Optional[str] = None, storeys: Optional[Sequence[str]] = None,
+                        spaces: Optional[Sequence[str]] = None,
+                        types: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Process an IFC file and write elements to output_path as they are extracted
+        
+        Unlike process_ifc_file followed by export_to_json, no BIMModel is
+        built, so memory use does not grow with the number of elements and
+        readers can consume the NDJSON output while it is being written.
+        
+        Args:
+            file_path: Path to the IFC file
+            output_path: Destination file path
+            format: 'ndjson' (one record per line) or 'json' (model document)
+            compression: None, 'gzip' or 'zstd'
+            storeys, spaces, types: Scope of the run, as in process_ifc_file
+            
+        Returns:
+            Statistics in the get_element_statistics layout, plus the
+            bounding box and number of bytes written
+        """
+        if not IFC_AVAILABLE:
+            raise ImportError("IFC OpenShell is not available. Please install ifcopenshell to process IFC files.")
+        
+        self.metrics = PipelineMetrics()
         try:
-            # Convert model to dictionary
-            model_dict = asdict(model)
+            logger.info(f"Streaming IFC file: {file_path} -> {output_path}")
             
-            # Write to JSON file
-            with open(output_path, 'w') as f:
-                json.dump(model_dict, f, indent=2, default=str)
+            ifc_file = self._open_file(file_path)
+            metadata = self._extract_metadata(ifc_file)
+            scope = self._scope(storeys, spaces, types)
+            if scope is not None:
+                metadata['scope'] = scope
+            bounding_box = BoundingBoxAccumulator()
+            element_types = {}
+            slab_areas = {}
+            slab_ids = self._slab_ids(ifc_file)
+            instances = 0
+            mesh_ids = set()
             
-            logger.info(f"Model exported to: {output_path}")
+            with StreamingModelWriter(output_path, format=format, compression=compression) as writer:
+                writer.write_header(self._model_header(
+                    metadata.get('project_name', 'unknown'),
+                    metadata.get('project_name', 'Unknown Project'),
+                    metadata.get('schema_version', 'unknown'),
+                    metadata
+                ))
+                
+                for element in self._iter_elements(ifc_file, scope):
+                    writer.write_element(element)
+                    bounding_box.update_box(element.bounding_box)
+                    element_types[element.type] = element_types.get(element.type, 0) + 1
+                    if isinstance(element.geometry, MeshInstance):
+                        instances += 1
+                        mesh_ids.add(element.geometry.mesh_id)
+                    if element.id in slab_ids:
+                        slab_areas[element.id] = footprint_area(element.geometry)
+                
+                # The header is already written, so floor areas go in the footer
+                self._apply_floor_areas(metadata, ifc_file, slab_areas)
+                writer.write_footer({
+                    'bounding_box': bounding_box.to_dict(),
+                    'total_area': metadata['total_area'],
+                    'floor_areas': metadata['floor_areas'],
+                    'spatial_structure': self._relations.structure.to_dict()
+                })
+            
+            instancing = None
+            if instances:
+                instancing = {
+                    'instances': instances,
+                    'unique_meshes': len(mesh_ids),
+                    'instancing_ratio': instances / len(mesh_ids)
+                }
+            statistics = self._build_statistics(element_types, bounding_box.to_dict(), instancing)
+            statistics['bounding_box'] = bounding_box.to_dict()
+            statistics['total_area'] = metadata['total_area']
+            statistics['bytes_written'] = writer.bytes_written
+            self.metrics.count('bytes_written', writer.bytes_written)
+            
+            logger.info(f"Successfully streamed IFC file. Wrote {writer.element_count} elements.")
+            return statistics
             
         except Exception as e:
-            logger.error(f"Error exporting model to JSON: {str(e)}")
+            logger.error(f"Error streaming IFC file: {str(e)}")
             raise
     
-    def get_element_statistics(self, model: BIMModel) -> Dict[str, Any]:
-        """Get statistics about the BIM model"""
-        element_types = {}
-        total_elements = len(model.elements)
+    def _model_header(self, model_id: str, name: str, version: str,
+                      metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Model-level fields written before the elements"""
+        return {'id': model_id, 'name': name, 'version': version, 'metadata': metadata}
+    
+    def get_element_statistics(self, model: BIMModel, include_size: bool = True) -> Dict[str, Any]:
+        """
+        Get statistics about the BIM model
+        
+        Args:
+            model: BIMModel or LazyBIMModel
+            include_size: Include 'model_size'. For a LazyBIMModel this
+                processes every element; without it only the element index is read.
+        """
+        if isinstance(model, LazyBIMModel):
+            element_types = model.element_types()
+        else:
+            element_types = type_counts(model.elements)
         
-        for element in model.elements:
-            element_type = element.type
-            element_types[element_type] = element_types.get(element_type, 0) + 1
+        bounding_box = model.bounding_box if include_size else None
+        instancing = instancing_statistics(model.elements) if model.meshes else None
+        statistics = self._build_statistics(element_types, bounding_box, instancing)
         
-        return {
-            'total_elements': total_elements,
+        if self.lod_levels and not isinstance(model, LazyBIMModel):
+            statistics['lod'] = lod_statistics(model.elements, self.lod_levels)
+        
+        return statistics
+    
+    def _build_statistics(self, element_types: Dict[str, int], bounding_box: Optional[Dict[str, Any]],
+                          instancing: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Assemble the statistics dict from per-type counts, bounding box and instancing counts"""
+        statistics = {
+            'total_elements': sum(element_types.values()),
             'element_types': element_types,
-            'unique_types': len(element_types),
-            'model_size': {
-                'width': model.bounding_box['size'][0],
-                'height': model.bounding_box['size'][1],
-                'depth': model.bounding_box['size'][2]
-            }
+            'unique_types': len(element_types)
         }
+        
+        if bounding_box is not None:
+            statistics['model_size'] = {
+                'width': bounding_box['size'][0],
+                'height': bounding_box['size'][1],
+                'depth': bounding_box['size'][2]
+            }
+        
+        if instancing:
+            statistics['instancing'] = instancing
+        
+        return statistics
 
 # Example usage
 if __name__ == "__main__":
@@ -399,4 +1314,5 @@ if __name__ == "__main__":
         except ImportError as e:
             print(f"Error: {e}")
     else:
-        print(f"IFC file not found: {ifc_path}") 
\ No newline at end of file
+        print(f"IFC file not found: {ifc_path} "
+              f"(python -m benchmarks.ifc_generator {ifc_path} writes a synthetic building)") 
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Inverse-relationship index for property set and material extraction
+
+Property sets, quantity sets and materials are usually shared by many
+elements. The index walks every IfcRelDefinesByProperties and
+IfcRelAssociatesMaterial relation once, converts each relating entity once
+and maps element ids to the shared results, so per-element extraction is a
+dictionary lookup instead of a walk over the element's inverse attributes.
+Spatial containment is indexed once as well (SpatialStructure), giving
+every element the GlobalIds of its building storey and space.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from bim_processor.spatial_structure import SpatialStructure, entities_by_type
+
+logger = logging.getLogger(__name__)
+
+# Attribute position of the value in every IfcPhysicalSimpleQuantity
+# (Name, Description, Unit, <Length|Area|Volume|Count|Weight|Time>Value)
+QUANTITY_VALUE_INDEX = 3
+
+
+class RelationshipIndex:
+    """Converted property definitions and materials of one IFC file, by element id"""
+
+    def __init__(self, ifc_file):
+        self.properties: Dict[int, List[Dict[str, Any]]] = {}
+        self.materials: Dict[int, Dict[str, Any]] = {}
+        self._index_properties(ifc_file)
+        self._index_materials(ifc_file)
+        self.structure = SpatialStructure.from_ifc(ifc_file)
+
+    def element_properties(self, element) -> Dict[str, Any]:
+        """Merged property and quantity values of an element"""
+        merged = {}
+        for values in self.properties.get(element.id(), ()):
+            merged.update(values)
+        return merged
+
+    def element_material(self, element) -> Optional[Dict[str, Any]]:
+        """Shared material dict of an element, if it has one"""
+        return self.materials.get(element.id())
+
+    def element_storey(self, element) -> Optional[str]:
+        """GlobalId of the building storey containing an element, if any"""
+        return self.structure.element_storey(element.id())
+
+    def element_space(self, element) -> Optional[str]:
+        """GlobalId of the space containing an element, if any"""
+        return self.structure.element_space(element.id())
+
+    def _index_properties(self, ifc_file) -> None:
+        converted = {}
+        for rel in entities_by_type(ifc_file, 'IfcRelDefinesByProperties'):
+            try:
+                definitions = rel.RelatingPropertyDefinition
+                # IFC4 allows an IfcPropertySetDefinitionSet, read as a tuple
+                if not isinstance(definitions, tuple):
+                    definitions = (definitions,)
+
+                for definition in definitions:
+                    if definition is None:
+                        continue
+                    definition_id = definition.id()
+                    if definition_id not in converted:
+                        converted[definition_id] = convert_property_definition(definition)
+                    values = converted[definition_id]
+                    if not values:
+                        continue
+
+                    for related in rel.RelatedObjects or ():
+                        self.properties.setdefault(related.id(), []).append(values)
+            except Exception as e:
+                logger.warning(f"Error indexing property relation #{rel.id()}: {str(e)}")
+
+    def _index_materials(self, ifc_file) -> None:
+        converted = {}
+        for rel in entities_by_type(ifc_file, 'IfcRelAssociatesMaterial'):
+            material_select = rel.RelatingMaterial
+            if material_select is None:
+                continue
+
+            material_id = material_select.id()
+            if material_id not in converted:
+                converted[material_id] = convert_material(material_select)
+            material = converted[material_id]
+            if material is None:
+                continue
+
+            for related in rel.RelatedObjects or ():
+                # The first association wins, as in the per-element walk
+                self.materials.setdefault(related.id(), material)
+
+
+def convert_property_definition(definition) -> Dict[str, Any]:
+    """Flat {name: value} of an IfcPropertySet or IfcElementQuantity"""
+    values = {}
+    try:
+        if definition.is_a('IfcPropertySet'):
+            for prop in definition.HasProperties:
+                if prop.is_a('IfcPropertySingleValue'):
+                    values[prop.Name] = _unwrap(prop.NominalValue)
+                elif prop.is_a('IfcPropertyEnumeratedValue'):
+                    values[prop.Name] = [_unwrap(value) for value in prop.EnumerationValues or ()]
+                elif prop.is_a('IfcPropertyListValue'):
+                    values[prop.Name] = [_unwrap(value) for value in prop.ListValues or ()]
+        elif definition.is_a('IfcElementQuantity'):
+            for quantity in definition.Quantities:
+                if quantity.is_a('IfcPhysicalSimpleQuantity'):
+                    values[quantity.Name] = quantity[QUANTITY_VALUE_INDEX]
+    except Exception as e:
+        logger.warning(f"Error converting property definition {definition.id()}: {str(e)}")
+    return values
+
+
+def convert_attribute(value):
+    """
+    JSON-friendly value of a direct entity attribute
+
+    Simple values are kept as they are; referenced entities become their
+    step reference ('#42') instead of their whole serialized instance.
+    """
+    if isinstance(value, (tuple, list)):
+        return [convert_attribute(item) for item in value]
+    if hasattr(value, 'is_a') and hasattr(value, 'id'):
+        step_id = value.id()
+        return f"#{step_id}" if step_id else str(value)
+    return value
+
+
+def convert_material(material_select) -> Optional[Dict[str, Any]]:
+    """Material dict of an IfcMaterial, IfcMaterialLayerSet or IfcMaterialLayerSetUsage"""
+    try:
+        if material_select.is_a('IfcMaterial'):
+            return _material_dict(material_select)
+
+        layer_set = None
+        if material_select.is_a('IfcMaterialLayerSetUsage'):
+            layer_set = material_select.ForLayerSet
+        elif material_select.is_a('IfcMaterialLayerSet'):
+            layer_set = material_select
+
+        if layer_set is not None:
+            layers = [
+                {
+                    'material': layer.Material.Name if layer.Material else None,
+                    'thickness': layer.LayerThickness
+                }
+                for layer in layer_set.MaterialLayers
+            ]
+            return {
+                'name': layer_set.LayerSetName or (layers[0]['material'] if layers else None),
+                'description': getattr(layer_set, 'Description', ''),
+                'category': '',
+                'layers': layers
+            }
+    except Exception as e:
+        logger.warning(f"Error converting material {material_select.id()}: {str(e)}")
+    return None
+
+
+def _material_dict(material) -> Dict[str, Any]:
+    return {
+        'name': material.Name,
+        'description': getattr(material, 'Description', ''),
+        'category': getattr(material, 'Category', '')
+    }
+
+
+def _unwrap(value):
+    return getattr(value, 'wrappedValue', value)
@@ -0,0 +1,367 @@
+"""
+Spatial join of sensors to processed model elements
+
+Every element contributes sample points (its bounding box centre plus up
+to points_per_element of its world-space vertices) to a KD-tree. A sensor
+is mapped by taking the elements owning its k nearest sample points and
+picking the one whose bounding box is closest to the sensor (distance 0
+when the sensor is inside it), ties broken by point distance. The
+mapping is computed once when sensors are placed or the model changes;
+ingestion looks up element, storey and space GlobalIds for a whole batch
+of sensor ids with one hash-index lookup.
+
+When a reprocessed model comes with a ChangeSet, only the sample points of
+added and modified elements are recomputed and only sensors whose
+candidate elements changed, or that are now near new geometry, are
+remapped.
+"""
+
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bim_processor.geometry import as_vertex_array
+
+try:
+    from scipy.spatial import cKDTree
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+DEFAULT_POINTS_PER_ELEMENT = 32
+DEFAULT_CANDIDATES = 32
+# Sensors further than this (model units) from every element stay unmapped
+DEFAULT_MAX_DISTANCE = 5.0
+
+UNMAPPED = -1
+DROPPED = -2
+
+
+class SensorElementMap:
+    """Sensor id -> nearest model element and its storey and space"""
+
+    def __init__(self, points_per_element: int = DEFAULT_POINTS_PER_ELEMENT,
+                 candidates: int = DEFAULT_CANDIDATES, max_distance: float = DEFAULT_MAX_DISTANCE):
+        """
+        Args:
+            points_per_element: Vertices sampled per element, besides its box centre
+            candidates: Nearest sample points whose elements are compared per sensor
+            max_distance: Sensors further from every element are left unmapped
+        """
+        if not SCIPY_AVAILABLE:
+            raise ImportError("scipy is not available. Please install scipy to map sensors to model elements.")
+
+        self.points_per_element = max(0, int(points_per_element))
+        self.candidates = max(1, int(candidates))
+        self.max_distance = float(max_distance)
+        # Path of the model file the element side was last built from
+        self.source: Optional[str] = None
+
+        # Elements
+        self.element_ids = np.empty(0, dtype=object)
+        self.storey_ids = np.empty(0, dtype=object)
+        self.space_ids = np.empty(0, dtype=object)
+        self.mins = np.empty((0, 3))
+        self.maxs = np.empty((0, 3))
+        self.points = np.empty((0, 3))
+        self.point_elements = np.empty(0, dtype=np.int64)
+
+        # Sensors
+        self.sensor_ids = np.empty(0, dtype=object)
+        self.positions = np.empty((0, 3))
+        self.sensor_elements = np.empty(0, dtype=np.int64)
+        self.distances = np.empty(0)
+        self._candidate_elements = np.empty((0, self.candidates), dtype=np.int64)
+        self._radius = np.empty(0)
+
+        self._tree = None
+        self._sensor_index = pd.Index([], dtype=object)
+        self._element_lookup = np.array([None], dtype=object)
+        self._storey_lookup = np.array([None], dtype=object)
+        self._space_lookup = np.array([None], dtype=object)
+
+    @property
+    def elements(self) -> int:
+        return len(self.element_ids)
+
+    @property
+    def sensors(self) -> int:
+        return len(self.sensor_ids)
+
+    # Model
+
+    def update(self, model, changes=None, source: Optional[str] = None) -> Dict[str, int]:
+        """
+        Rebuild the element side from a processed model and remap sensors
+
+        Args:
+            model: Processed BIMModel (or anything with .elements)
+            changes: ChangeSet of model against the model this map was last
+                built from; None rebuilds everything
+            source: Path of the model's file, kept as self.source
+
+        Returns:
+            Counts of resampled elements and remapped sensors
+        """
+        by_global_id = {element.global_id: element for element in model.elements if element.global_id}
+
+        if changes is None or not self.elements:
+            keep = np.zeros(self.elements, dtype=bool)
+            changed = list(by_global_id)
+        else:
+            dropped = set(changes.removed) | set(changes.modified)
+            keep = np.array([element_id not in dropped for element_id in self.element_ids.tolist()], dtype=bool)
+            changed = [global_id for global_id in (*changes.added, *changes.modified) if global_id in by_global_id]
+
+        # Old element row -> new row, DROPPED for dropped elements; the extra
+        # last entry keeps UNMAPPED (-1) unmapped
+        remap = np.full(self.elements + 1, DROPPED, dtype=np.int64)
+        remap[-1] = UNMAPPED
+        remap[:-1][keep] = np.arange(int(keep.sum()))
+        first_new = int(keep.sum())
+
+        point_keep = keep[self.point_elements]
+        new_ids, new_mins, new_maxs, new_points, new_point_elements = self._sample(
+            [by_global_id[global_id] for global_id in changed], first_new
+        )
+
+        self.element_ids = np.concatenate((self.element_ids[keep], new_ids))
+        self.mins = np.concatenate((self.mins[keep], new_mins))
+        self.maxs = np.concatenate((self.maxs[keep], new_maxs))
+        # Containment is not part of the element fingerprint, so storeys and
+        # spaces are refreshed for all elements
+        elements = [by_global_id.get(element_id) for element_id in self.element_ids.tolist()]
+        self.storey_ids = np.array([element.storey if element is not None else None for element in elements],
+                                   dtype=object)
+        self.space_ids = np.array([element.space if element is not None else None for element in elements],
+                                  dtype=object)
+        self.points = np.concatenate((self.points[point_keep], new_points))
+        self.point_elements = np.concatenate((remap[self.point_elements[point_keep]], new_point_elements))
+        self._tree = cKDTree(self.points) if len(self.points) else None
+
+        # Remap sensors whose candidates were dropped or that are now near new geometry
+        self.sensor_elements = remap[self.sensor_elements]
+        self._candidate_elements = remap[self._candidate_elements]
+        stale = np.any(self._candidate_elements == DROPPED, axis=1)
+        if changes is None:
+            stale[:] = True
+        elif len(new_points) and self.sensors:
+            new_distances, _ = cKDTree(new_points).query(self.positions, k=1)
+            stale |= new_distances <= self._radius
+
+        self._assign(np.flatnonzero(stale))
+        self._refresh_lookups()
+        self.source = source
+        return {'elements': self.elements, 'resampled_elements': len(new_ids),
+                'sensors': self.sensors, 'remapped_sensors': int(stale.sum())}
+
+    def _sample(self, elements: Sequence[Any], first_row: int):
+        """Element ids, boxes and sample points of elements, numbered from first_row"""
+        ids, mins, maxs, points, owners = [], [], [], [], []
+        for element in elements:
+            vertices = as_vertex_array(element.geometry)
+            if len(vertices):
+                box_min, box_max = vertices.min(axis=0), vertices.max(axis=0)
+                step = max(1, -(-len(vertices) // self.points_per_element)) if self.points_per_element else None
+                sample = vertices[::step] if step else vertices[:0]
+            elif element.location:
+                # No geometry: fall back to the placement point
+                box_min = box_max = np.array([element.location['x'], element.location['y'], element.location['z']])
+                sample = box_min[None, :]
+            else:
+                continue
+
+            row = first_row + len(ids)
+            ids.append(element.global_id)
+            mins.append(box_min)
+            maxs.append(box_max)
+            element_points = np.vstack(((box_min + box_max) / 2, sample))
+            points.append(element_points)
+            owners.append(np.full(len(element_points), row, dtype=np.int64))
+
+        if not ids:
+            return (np.empty(0, dtype=object), np.empty((0, 3)), np.empty((0, 3)),
+                    np.empty((0, 3)), np.empty(0, dtype=np.int64))
+        return (np.array(ids, dtype=object), np.array(mins, dtype=np.float64), np.array(maxs, dtype=np.float64),
+                np.concatenate(points).astype(np.float64), np.concatenate(owners))
+
+    # Sensors
+
+    def place_sensors(self, positions: Mapping[str, Sequence[float]]) -> int:
+        """Add or move sensors ({sensor_id: (x, y, z)}) and map them; returns the number placed"""
+        if not positions:
+            return 0
+        sensor_ids = np.array([str(sensor_id) for sensor_id in positions], dtype=object)
+        coordinates = np.array([positions[sensor_id] for sensor_id in positions], dtype=np.float64).reshape(-1, 3)
+
+        rows = self._sensor_index.get_indexer(sensor_ids)
+        new = rows == UNMAPPED
+        added = int(new.sum())
+        rows[new] = self.sensors + np.arange(added)
+
+        self.sensor_ids = np.concatenate((self.sensor_ids, sensor_ids[new]))
+        self.positions = np.concatenate((self.positions, np.empty((added, 3))))
+        self.sensor_elements = np.concatenate((self.sensor_elements, np.full(added, UNMAPPED, dtype=np.int64)))
+        self.distances = np.concatenate((self.distances, np.full(added, np.inf)))
+        self._candidate_elements = np.concatenate(
+            (self._candidate_elements, np.full((added, self.candidates), UNMAPPED, dtype=np.int64))
+        )
+        self._radius = np.concatenate((self._radius, np.full(added, self.max_distance)))
+        self.positions[rows] = coordinates
+
+        self._assign(rows)
+        self._refresh_lookups()
+        return len(rows)
+
+    def remove_sensors(self, sensor_ids: Iterable[str]) -> int:
+        """Forget sensors; returns the number removed"""
+        rows = self._sensor_index.get_indexer(np.array([str(sensor_id) for sensor_id in sensor_ids], dtype=object))
+        keep = np.ones(self.sensors, dtype=bool)
+        keep[rows[rows != UNMAPPED]] = False
+
+        for name in ('sensor_ids', 'positions', 'sensor_elements', 'distances', '_candidate_elements', '_radius'):
+            setattr(self, name, getattr(self, name)[keep])
+        self._refresh_lookups()
+        return int((~keep).sum())
+
+    def _assign(self, rows: np.ndarray) -> None:
+        """Map the sensors at rows to their closest element"""
+        if not len(rows):
+            return
+        self.sensor_elements[rows] = UNMAPPED
+        self.distances[rows] = np.inf
+        self._candidate_elements[rows] = UNMAPPED
+        self._radius[rows] = self.max_distance
+        if self._tree is None:
+            return
+
+        k = min(self.candidates, len(self.points))
+        positions = self.positions[rows]
+        point_distances, point_index = self._tree.query(positions, k=k, distance_upper_bound=self.max_distance)
+        point_distances = point_distances.reshape(len(rows), k)
+        point_index = point_index.reshape(len(rows), k)
+
+        # Missing neighbours come back with index len(points) and infinite distance
+        found = point_index < len(self.points)
+        elements = np.where(found, self.point_elements[np.minimum(point_index, len(self.points) - 1)], UNMAPPED)
+
+        delta = (np.maximum(self.mins[elements] - positions[:, None, :], 0)
+                 + np.maximum(positions[:, None, :] - self.maxs[elements], 0))
+        box_distances = np.where(found, np.sqrt(np.einsum('ijk,ijk->ij', delta, delta)), np.inf)
+
+        best = np.lexsort((point_distances, box_distances), axis=-1)[:, 0]
+        picked = np.arange(len(rows))
+        mapped = np.isfinite(box_distances[picked, best]) & (box_distances[picked, best] <= self.max_distance)
+
+        self.sensor_elements[rows] = np.where(mapped, elements[picked, best], UNMAPPED)
+        self.distances[rows] = np.where(mapped, box_distances[picked, best], np.inf)
+        self._candidate_elements[rows, :k] = elements
+        # A new point within this radius could change the sensor's candidates
+        self._radius[rows] = np.where(found.all(axis=1), point_distances[:, -1], self.max_distance)
+
+    def _refresh_lookups(self) -> None:
+        # Index -1 (UNMAPPED) selects the trailing None
+        self._sensor_index = pd.Index(self.sensor_ids, dtype=object)
+        self._element_lookup = np.append(self.element_ids, None).astype(object)
+        self._storey_lookup = np.append(self.storey_ids, None).astype(object)
+        self._space_lookup = np.append(self.space_ids, None).astype(object)
+
+    # Lookups
+
+    def lookup(self, sensor_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Element, storey and space GlobalIds per sensor id (None where unknown, unmapped or not in a space)"""
+        rows = self._sensor_index.get_indexer(np.asarray(sensor_ids, dtype=object))
+        elements = np.where(rows == UNMAPPED, UNMAPPED, self.sensor_elements[rows]) \
+            if self.sensors else np.full(len(rows), UNMAPPED, dtype=np.int64)
+        return self._element_lookup[elements], self._storey_lookup[elements], self._space_lookup[elements]
+
+    def to_dict(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+        """Mapping of one sensor, None if it was never placed"""
+        row = self._sensor_index.get_indexer([str(sensor_id)])[0]
+        if row == UNMAPPED:
+            return None
+        element = self.sensor_elements[row]
+        return {
+            'sensor_id': str(sensor_id),
+            'position': self.positions[row].tolist(),
+            'element_id': self._element_lookup[element],
+            'storey_id': self._storey_lookup[element],
+            'space_id': self._space_lookup[element],
+            'distance': float(self.distances[row]) if element != UNMAPPED else None
+        }
+
+    def statistics(self) -> Dict[str, Any]:
+        mapped = self.sensor_elements != UNMAPPED
+        return {
+            'elements': self.elements,
+            'sample_points': len(self.points),
+            'sensors': self.sensors,
+            'mapped_sensors': int(mapped.sum()),
+            'inside_element': int((self.distances[mapped] == 0).sum())
+        }
+
+    # Serialization
+
+    def save(self, path: str) -> None:
+        """Write the map to a single .npz file, atomically"""
+        arrays = {
+            'settings': np.array([self.points_per_element, self.candidates, self.max_distance]),
+            'source': np.array(self.source or '', dtype=str),
+            'element_ids': self.element_ids.astype(str),
+            'storey_ids': np.array(['' if storey is None else storey for storey in self.storey_ids.tolist()], dtype=str),
+            'space_ids': np.array(['' if space is None else space for space in self.space_ids.tolist()], dtype=str),
+            'mins': self.mins,
+            'maxs': self.maxs,
+            'points': self.points,
+            'point_elements': self.point_elements,
+            'sensor_ids': self.sensor_ids.astype(str),
+            'positions': self.positions,
+            'sensor_elements': self.sensor_elements,
+            'distances': self.distances,
+            'candidate_elements': self._candidate_elements,
+            'radius': self._radius
+        }
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'SensorElementMap':
+        """Read a map written by save(); the KD-tree is rebuilt from the stored points"""
+        with np.load(path, allow_pickle=False) as data:
+            points_per_element, candidates, max_distance = data['settings'].tolist()
+            sensor_map = cls(int(points_per_element), int(candidates), max_distance)
+            sensor_map.source = str(data['source']) or None
+            sensor_map.element_ids = data['element_ids'].astype(object)
+            sensor_map.storey_ids = np.array([storey or None for storey in data['storey_ids'].tolist()], dtype=object)
+            # Maps saved before spaces were mapped have no space column
+            space_ids = data['space_ids'].tolist() if 'space_ids' in data.files else [''] * len(sensor_map.element_ids)
+            sensor_map.space_ids = np.array([space or None for space in space_ids], dtype=object)
+            sensor_map.mins = data['mins']
+            sensor_map.maxs = data['maxs']
+            sensor_map.points = data['points']
+            sensor_map.point_elements = data['point_elements']
+            sensor_map.sensor_ids = data['sensor_ids'].astype(object)
+            sensor_map.positions = data['positions']
+            sensor_map.sensor_elements = data['sensor_elements']
+            sensor_map.distances = data['distances']
+            sensor_map._candidate_elements = data['candidate_elements']
+            sensor_map._radius = data['radius']
+
+        sensor_map._tree = cKDTree(sensor_map.points) if len(sensor_map.points) else None
+        sensor_map._refresh_lookups()
+        return sensor_map
@@ -0,0 +1,395 @@
+"""
+Bounding volume hierarchy over processed model elements
+
+The index is built from per-element axis-aligned bounding boxes and answers
+box, point-radius, ray and nearest-neighbour queries. Node and element
+bounds are stored as flat NumPy arrays so the index can be saved next to a
+processed model and reloaded without rebuilding.
+"""
+
+import heapq
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bim_processor.elements import ElementTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEAF_SIZE = 8
+
+
+class SpatialIndex:
+    """Static BVH over element AABBs"""
+
+    def __init__(self, element_ids: Sequence[str], mins: np.ndarray, maxs: np.ndarray,
+                 leaf_size: int = DEFAULT_LEAF_SIZE, _nodes: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Args:
+            element_ids: Id of each element, aligned with mins/maxs
+            mins: (N, 3) lower corners of the element boxes
+            maxs: (N, 3) upper corners of the element boxes
+            leaf_size: Maximum number of elements per leaf node
+        """
+        self.element_ids = np.asarray(element_ids, dtype=str)
+        self.mins = np.ascontiguousarray(mins, dtype=np.float64).reshape(-1, 3)
+        self.maxs = np.ascontiguousarray(maxs, dtype=np.float64).reshape(-1, 3)
+        self.leaf_size = max(1, int(leaf_size))
+        self._traversal = None
+
+        if _nodes is None:
+            _nodes = self._build()
+        self.order = _nodes['order']
+        self.node_min = _nodes['node_min']
+        self.node_max = _nodes['node_max']
+        self.node_left = _nodes['node_left']
+        self.node_right = _nodes['node_right']
+        self.node_start = _nodes['node_start']
+        self.node_end = _nodes['node_end']
+
+    @classmethod
+    def from_model(cls, model, leaf_size: int = DEFAULT_LEAF_SIZE) -> 'SpatialIndex':
+        """Build an index from the stored bounding boxes of a BIMModel's elements"""
+        if isinstance(model.elements, ElementTable):
+            ids, mins, maxs = model.elements.boxes()
+            return cls(ids, mins, maxs, leaf_size)
+
+        ids, mins, maxs = [], [], []
+        for element in model.elements:
+            if element.bounding_box:
+                ids.append(element.id)
+                mins.append(element.bounding_box['min'])
+                maxs.append(element.bounding_box['max'])
+
+        if not ids:
+            return cls([], np.empty((0, 3)), np.empty((0, 3)), leaf_size)
+        return cls(ids, np.array(mins), np.array(maxs), leaf_size)
+
+    def __len__(self) -> int:
+        return len(self.element_ids)
+
+    # Queries
+
+    def query_box(self, box_min: Sequence[float], box_max: Sequence[float]) -> List[str]:
+        """Ids of elements whose bounding box intersects [box_min, box_max]"""
+        lo = np.asarray(box_min, dtype=np.float64)
+        hi = np.asarray(box_max, dtype=np.float64)
+        lo_t, hi_t = tuple(lo.tolist()), tuple(hi.tolist())
+        return self._collect(
+            lambda n_min, n_max: _boxes_overlap(n_min, n_max, lo_t, hi_t),
+            lambda e_min, e_max: np.all((e_min <= hi) & (e_max >= lo), axis=1)
+        )
+
+    def query_boxes(self, box_mins: np.ndarray, box_maxs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Every (query, element) pair whose boxes intersect, for many query boxes at once
+
+        The tree is descended one level at a time for all queries together,
+        so the work is NumPy operations over the (query, node) frontier.
+
+        Args:
+            box_mins, box_maxs: (Q, 3) corners of the query boxes
+
+        Returns:
+            Query indices and element indices (positions in mins/maxs)
+        """
+        lo = np.asarray(box_mins, dtype=np.float64).reshape(-1, 3)
+        hi = np.asarray(box_maxs, dtype=np.float64).reshape(-1, 3)
+        found_queries, found_elements = [], []
+        queries = np.arange(len(lo) if len(self) else 0, dtype=np.int64)
+        nodes = np.zeros(len(queries), dtype=np.int64)
+
+        while len(queries):
+            hit = np.all((self.node_min[nodes] <= hi[queries]) & (self.node_max[nodes] >= lo[queries]), axis=1)
+            queries, nodes = queries[hit], nodes[hit]
+            leaf = self.node_left[nodes] < 0
+
+            leaf_queries, leaf_nodes = queries[leaf], nodes[leaf]
+            counts = self.node_end[leaf_nodes] - self.node_start[leaf_nodes]
+            query = np.repeat(leaf_queries, counts)
+            offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+            element = self.order[np.repeat(self.node_start[leaf_nodes], counts) + offsets]
+            overlap = np.all((self.mins[element] <= hi[query]) & (self.maxs[element] >= lo[query]), axis=1)
+            found_queries.append(query[overlap])
+            found_elements.append(element[overlap])
+
+            queries = np.repeat(queries[~leaf], 2)
+            nodes = np.stack([self.node_left[nodes[~leaf]], self.node_right[nodes[~leaf]]], axis=1).ravel()
+
+        if not found_queries:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(found_queries), np.concatenate(found_elements)
+
+    def query_radius(self, point: Sequence[float], radius: float) -> List[str]:
+        """Ids of elements whose bounding box lies within radius of point"""
+        p = np.asarray(point, dtype=np.float64)
+        p_t = tuple(p.tolist())
+        radius_sq = float(radius) ** 2
+        return self._collect(
+            lambda n_min, n_max: _box_distance_sq(n_min, n_max, p_t) <= radius_sq,
+            lambda e_min, e_max: _boxes_distance_sq(e_min, e_max, p) <= radius_sq
+        )
+
+    def query_ray(self, origin: Sequence[float], direction: Sequence[float],
+                  max_distance: float = np.inf) -> List[Tuple[str, float]]:
+        """
+        Elements whose bounding box is hit by a ray, nearest first
+
+        Returns:
+            (element id, distance along the normalised ray to the box entry)
+        """
+        o = np.asarray(origin, dtype=np.float64)
+        d = np.asarray(direction, dtype=np.float64)
+        d = d / np.linalg.norm(d)
+        with np.errstate(divide='ignore'):
+            inv = 1.0 / d
+        o_t, inv_t = tuple(o.tolist()), tuple(inv.tolist())
+
+        hits = []
+        self._traverse(
+            lambda n_min, n_max: _ray_box(o_t, inv_t, n_min, n_max, max_distance) is not None,
+            lambda indices: hits.extend(
+                (self.element_ids[i], t) for i, t in _ray_boxes(o, inv, self.mins[indices],
+                                                                 self.maxs[indices], max_distance, indices)
+            )
+        )
+        hits.sort(key=lambda hit: hit[1])
+        return [(str(element_id), float(t)) for element_id, t in hits]
+
+    def nearest(self, point: Sequence[float], k: int = 1) -> List[Tuple[str, float]]:
+        """
+        The k elements whose bounding boxes are closest to point
+
+        Returns:
+            (element id, distance from point to the box; 0 when inside)
+        """
+        if not len(self):
+            return []
+
+        p = np.asarray(point, dtype=np.float64)
+        p_t = tuple(p.tolist())
+        nodes = self._nodes()
+        best: List[Tuple[float, int]] = []  # max-heap of (-distance_sq, element index)
+        queue = [(0.0, 0)]
+
+        while queue:
+            distance_sq, node = heapq.heappop(queue)
+            if len(best) == k and distance_sq > -best[0][0]:
+                break
+
+            left, right, start, end = nodes['children'][node]
+            if left < 0:
+                indices = self.order[start:end]
+                distances = _boxes_distance_sq(self.mins[indices], self.maxs[indices], p)
+                for index, d in zip(indices.tolist(), distances.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, index))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, index))
+                continue
+
+            for child in (left, right):
+                child_min, child_max = nodes['bounds'][child]
+                heapq.heappush(queue, (_box_distance_sq(child_min, child_max, p_t), child))
+
+        return [(str(self.element_ids[index]), float(np.sqrt(-d)))
+                for d, index in sorted(best, key=lambda item: -item[0])]
+
+    # Serialization
+
+    def save(self, path: str) -> None:
+        """Write the index to a .npz file"""
+        np.savez(
+            path,
+            element_ids=self.element_ids,
+            mins=self.mins,
+            maxs=self.maxs,
+            leaf_size=np.array(self.leaf_size),
+            order=self.order,
+            node_min=self.node_min,
+            node_max=self.node_max,
+            node_left=self.node_left,
+            node_right=self.node_right,
+            node_start=self.node_start,
+            node_end=self.node_end
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'SpatialIndex':
+        """Read an index written by save() without rebuilding it"""
+        with np.load(path) as data:
+            nodes = {key: data[key] for key in (
+                'order', 'node_min', 'node_max', 'node_left', 'node_right', 'node_start', 'node_end'
+            )}
+            return cls(data['element_ids'], data['mins'], data['maxs'], int(data['leaf_size']), _nodes=nodes)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_traversal'] = None
+        return state
+
+    # Internals
+
+    def _build(self) -> Dict[str, np.ndarray]:
+        """Top-down median split along the longest centroid axis"""
+        count = len(self.mins)
+        order = np.arange(count, dtype=np.int64)
+        centers = (self.mins + self.maxs) * 0.5
+        capacity = max(1, 2 * (count // self.leaf_size + 1))
+
+        node_min = np.empty((capacity, 3))
+        node_max = np.empty((capacity, 3))
+        node_left = np.full(capacity, -1, dtype=np.int64)
+        node_right = np.full(capacity, -1, dtype=np.int64)
+        node_start = np.zeros(capacity, dtype=np.int64)
+        node_end = np.zeros(capacity, dtype=np.int64)
+
+        node_count = 1
+        stack = [(0, 0, count)]
+        while stack:
+            node, start, end = stack.pop()
+            indices = order[start:end]
+            node_start[node], node_end[node] = start, end
+
+            if end > start:
+                node_min[node] = self.mins[indices].min(axis=0)
+                node_max[node] = self.maxs[indices].max(axis=0)
+            else:
+                node_min[node] = np.inf
+                node_max[node] = -np.inf
+
+            if end - start <= self.leaf_size:
+                continue
+
+            node_centers = centers[indices]
+            axis = int(np.argmax(node_centers.max(axis=0) - node_centers.min(axis=0)))
+            mid = (end - start) // 2
+            partition = np.argpartition(node_centers[:, axis], mid)
+            order[start:end] = indices[partition]
+
+            if node_count + 2 > capacity:
+                grow = capacity
+                node_min = np.concatenate([node_min, np.empty((grow, 3))])
+                node_max = np.concatenate([node_max, np.empty((grow, 3))])
+                node_left = np.concatenate([node_left, np.full(grow, -1, dtype=np.int64)])
+                node_right = np.concatenate([node_right, np.full(grow, -1, dtype=np.int64)])
+                node_start = np.concatenate([node_start, np.zeros(grow, dtype=np.int64)])
+                node_end = np.concatenate([node_end, np.zeros(grow, dtype=np.int64)])
+                capacity += grow
+
+            left, right = node_count, node_count + 1
+            node_count += 2
+            node_left[node], node_right[node] = left, right
+            stack.append((right, start + mid, end))
+            stack.append((left, start, start + mid))
+
+        return {
+            'order': order,
+            'node_min': node_min[:node_count],
+            'node_max': node_max[:node_count],
+            'node_left': node_left[:node_count],
+            'node_right': node_right[:node_count],
+            'node_start': node_start[:node_count],
+            'node_end': node_end[:node_count]
+        }
+
+    def _nodes(self) -> Dict[str, list]:
+        """Node arrays as Python tuples, which are much faster to traverse than NumPy scalars"""
+        if self._traversal is None:
+            self._traversal = {
+                'bounds': list(zip(map(tuple, self.node_min.tolist()), map(tuple, self.node_max.tolist()))),
+                'children': list(zip(self.node_left.tolist(), self.node_right.tolist(),
+                                     self.node_start.tolist(), self.node_end.tolist()))
+            }
+        return self._traversal
+
+    def _traverse(self, node_test, visit_leaf) -> None:
+        """Depth-first traversal calling visit_leaf(element indices) for leaves passing node_test"""
+        if not len(self):
+            return
+        nodes = self._nodes()
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            node_min, node_max = nodes['bounds'][node]
+            if not node_test(node_min, node_max):
+                continue
+            left, right, start, end = nodes['children'][node]
+            if left < 0:
+                visit_leaf(self.order[start:end])
+            else:
+                stack.append(right)
+                stack.append(left)
+
+    def _collect(self, node_test, element_test) -> List[str]:
+        """Element ids of leaves' elements passing element_test"""
+        matches = []
+        self._traverse(
+            node_test,
+            lambda indices: matches.extend(
+                indices[element_test(self.mins[indices], self.maxs[indices])].tolist()
+            )
+        )
+        return self.element_ids[matches].tolist() if matches else []
+
+
+def _boxes_overlap(a_min, a_max, b_min, b_max) -> bool:
+    return (a_min[0] <= b_max[0] and a_max[0] >= b_min[0] and
+            a_min[1] <= b_max[1] and a_max[1] >= b_min[1] and
+            a_min[2] <= b_max[2] and a_max[2] >= b_min[2])
+
+
+def _box_distance_sq(box_min, box_max, p) -> float:
+    """Squared distance from point p to a single box (Python scalars)"""
+    total = 0.0
+    for axis in range(3):
+        value = p[axis]
+        if value < box_min[axis]:
+            total += (box_min[axis] - value) ** 2
+        elif value > box_max[axis]:
+            total += (value - box_max[axis]) ** 2
+    return total
+
+
+def _boxes_distance_sq(mins: np.ndarray, maxs: np.ndarray, p: np.ndarray) -> np.ndarray:
+    """Squared distance from point p to each of an array of boxes"""
+    delta = np.maximum(mins - p, 0.0) + np.maximum(p - maxs, 0.0)
+    return np.einsum('ij,ij->i', delta, delta)
+
+
+def _ray_box(origin, inv_direction, box_min, box_max, max_distance) -> Optional[float]:
+    """Slab test for a single box; entry distance or None"""
+    t_near, t_far = 0.0, max_distance
+    for axis in range(3):
+        inv = inv_direction[axis]
+        if math.isinf(inv):
+            if origin[axis] < box_min[axis] or origin[axis] > box_max[axis]:
+                return None
+            continue
+        t1 = (box_min[axis] - origin[axis]) * inv
+        t2 = (box_max[axis] - origin[axis]) * inv
+        if t1 > t2:
+            t1, t2 = t2, t1
+        t_near = max(t_near, t1)
+        t_far = min(t_far, t2)
+        if t_near > t_far:
+            return None
+    return t_near
+
+
+def _ray_boxes(origin, inv_direction, mins, maxs, max_distance, indices):
+    """Vectorized slab test; yields (element index, entry distance) for hit boxes"""
+    with np.errstate(invalid='ignore'):
+        t1 = (mins - origin) * inv_direction
+        t2 = (maxs - origin) * inv_direction
+    # Rays parallel to an axis produce nan (0 * inf) when the origin lies on a slab plane
+    parallel = np.isinf(inv_direction)
+    inside = (origin >= mins) & (origin <= maxs)
+    t_low = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    t_high = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+    t_near = np.maximum(t_low.max(axis=1), 0.0)
+    t_far = np.minimum(t_high.min(axis=1), max_distance)
+    hit = t_near <= t_far
+    return zip(indices[hit].tolist(), t_near[hit].tolist())
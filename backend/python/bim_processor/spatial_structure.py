@@ -0,0 +1,201 @@
+"""
+Spatial structure of an IFC model
+
+SpatialStructure is the site -> building -> storey -> space tree of a model
+with the elements each node contains. It is built in one pass over the
+spatial elements, their IfcRelAggregates decompositions and the
+IfcRelContainedInSpatialStructure relations, and answers which storey and
+space an element belongs to and which elements a subtree contains. The
+processor uses it to assign elements their storey and space and to scope a
+run to a few storeys or spaces before anything is tessellated.
+"""
+
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+STOREY = 'IfcBuildingStorey'
+SPACE = 'IfcSpace'
+
+
+@dataclass
+class SpatialNode:
+    """A site, building, storey, space or other spatial element"""
+    global_id: str
+    type: str
+    name: Optional[str] = None
+    elevation: Optional[float] = None
+    parent: Optional[str] = None  # GlobalId of the decomposed spatial element
+    children: List[str] = field(default_factory=list)
+    elements: List[str] = field(default_factory=list)  # Step ids of directly contained elements
+
+
+class SpatialStructure:
+    """Spatial hierarchy of one model, keyed by GlobalId"""
+
+    def __init__(self, nodes: Optional[Iterable[SpatialNode]] = None):
+        self.nodes: Dict[str, SpatialNode] = {node.global_id: node for node in nodes or ()}
+        self._element_nodes: Optional[Dict[str, str]] = None
+        self._ancestors: Dict[tuple, Optional[str]] = {}
+
+    @classmethod
+    def from_ifc(cls, ifc_file) -> 'SpatialStructure':
+        """Build the hierarchy of an open IFC file"""
+        structure = cls()
+        nodes = structure.nodes
+        spatial_class = 'IfcSpatialStructureElement' if ifc_file.schema == 'IFC2X3' else 'IfcSpatialElement'
+
+        for spatial in entities_by_type(ifc_file, spatial_class):
+            elevation = getattr(spatial, 'Elevation', None) if spatial.is_a(STOREY) else None
+            nodes[spatial.GlobalId] = SpatialNode(
+                global_id=spatial.GlobalId,
+                type=spatial.is_a(),
+                name=getattr(spatial, 'Name', None),
+                elevation=float(elevation) if elevation is not None else None
+            )
+
+        for rel in entities_by_type(ifc_file, 'IfcRelAggregates'):
+            parent = nodes.get(getattr(rel.RelatingObject, 'GlobalId', None))
+            if parent is None:
+                continue
+            for related in rel.RelatedObjects or ():
+                child = nodes.get(getattr(related, 'GlobalId', None))
+                if child is not None and child.parent is None:
+                    child.parent = parent.global_id
+                    parent.children.append(child.global_id)
+
+        element_nodes = structure._element_nodes = {}
+        for rel in entities_by_type(ifc_file, 'IfcRelContainedInSpatialStructure'):
+            node = nodes.get(getattr(rel.RelatingStructure, 'GlobalId', None))
+            if node is None:
+                continue
+            for related in rel.RelatedElements or ():
+                element_id = str(related.id())
+                # An element is contained in one structure; the first relation wins
+                if element_id not in element_nodes:
+                    element_nodes[element_id] = node.global_id
+                    node.elements.append(element_id)
+
+        return structure
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def roots(self) -> List[SpatialNode]:
+        """Nodes without a spatial parent (usually the sites)"""
+        return [node for node in self.nodes.values() if node.parent is None]
+
+    def of_type(self, ifc_type: str) -> List[SpatialNode]:
+        """Nodes of one IFC type, in file order"""
+        return [node for node in self.nodes.values() if node.type == ifc_type]
+
+    def element_node(self, element_id: str) -> Optional[SpatialNode]:
+        """Spatial element directly containing an element, by step id"""
+        if self._element_nodes is None:
+            self._element_nodes = {element: node.global_id for node in self.nodes.values()
+                                   for element in node.elements}
+        global_id = self._element_nodes.get(str(element_id))
+        return self.nodes[global_id] if global_id is not None else None
+
+    def element_storey(self, element_id: str) -> Optional[str]:
+        """GlobalId of the storey containing an element (directly or through a space)"""
+        node = self.element_node(element_id)
+        return self.ancestor(node.global_id, STOREY) if node is not None else None
+
+    def element_space(self, element_id: str) -> Optional[str]:
+        """GlobalId of the space containing an element, if it is in one"""
+        node = self.element_node(element_id)
+        return self.ancestor(node.global_id, SPACE) if node is not None else None
+
+    def ancestor(self, global_id: str, ifc_type: str) -> Optional[str]:
+        """The node itself or its nearest ancestor of ifc_type"""
+        key = (global_id, ifc_type)
+        if key not in self._ancestors:
+            found = None
+            seen = set()
+            node = self.nodes.get(global_id)
+            while node is not None and node.global_id not in seen:
+                if node.type == ifc_type:
+                    found = node.global_id
+                    break
+                seen.add(node.global_id)
+                node = self.nodes.get(node.parent) if node.parent is not None else None
+            self._ancestors[key] = found
+        return self._ancestors[key]
+
+    def subtree(self, global_id: str) -> Iterator[SpatialNode]:
+        """A node and every node below it"""
+        pending = [global_id]
+        seen = set()
+        while pending:
+            node = self.nodes.get(pending.pop())
+            if node is None or node.global_id in seen:
+                continue
+            seen.add(node.global_id)
+            yield node
+            pending.extend(reversed(node.children))
+
+    def resolve(self, identifiers: Iterable[str], ifc_type: str) -> List[str]:
+        """
+        GlobalIds of the ifc_type nodes named by GlobalId or by name
+
+        Raises:
+            ValueError: If an identifier matches no node of that type
+        """
+        candidates = self.of_type(ifc_type)
+        resolved = []
+        for identifier in identifiers:
+            matches = [node.global_id for node in candidates if identifier in (node.global_id, node.name)]
+            if not matches:
+                raise ValueError(f"No {ifc_type} with GlobalId or name {identifier!r}")
+            resolved.extend(global_id for global_id in matches if global_id not in resolved)
+        return resolved
+
+    def element_ids(self, storeys: Optional[Iterable[str]] = None,
+                    spaces: Optional[Iterable[str]] = None) -> Set[str]:
+        """
+        Step ids of the elements in the given storeys and spaces
+
+        Storeys and spaces are GlobalIds or names. An element is in a storey
+        or space when a node of its subtree contains it; with both given,
+        elements must be in one of the storeys and one of the spaces.
+        """
+        selected = None
+        for identifiers, ifc_type in ((storeys, STOREY), (spaces, SPACE)):
+            if identifiers is None:
+                continue
+            element_ids = {element_id for global_id in self.resolve(identifiers, ifc_type)
+                           for node in self.subtree(global_id) for element_id in node.elements}
+            selected = element_ids if selected is None else selected & element_ids
+        return selected if selected is not None else set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly tree: nodes in file order with parent and child GlobalIds"""
+        return {
+            'roots': [node.global_id for node in self.roots],
+            'nodes': [asdict(node) for node in self.nodes.values()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SpatialStructure':
+        return cls(SpatialNode(**node) for node in data.get('nodes', ()))
+
+    def __getstate__(self):
+        return {'nodes': self.nodes}
+
+    def __setstate__(self, state) -> None:
+        self.nodes = state['nodes']
+        self._element_nodes = None
+        self._ancestors = {}
+
+
+def entities_by_type(ifc_file, ifc_class: str) -> list:
+    """ifc_file.by_type(ifc_class), empty (with a warning) if the schema lacks the class"""
+    try:
+        return ifc_file.by_type(ifc_class)
+    except Exception as e:
+        logger.warning(f"Error reading {ifc_class} entities: {str(e)}")
+        return []
@@ -5,6 +5,7 @@ Celery configuration for Digital Twin Management System
 import os
 from celery import Celery
 from dotenv import load_dotenv
+from celery_tasks.instrumentation import InstrumentedTask
 
 # Load environment variables
 load_dotenv()
@@ -14,7 +15,9 @@ celery_app = Celery(
     'digital_twin_management',
     broker=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
     backend=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
-    include=['celery_tasks.tasks']
+    include=['celery_tasks.tasks'],
+    # Times every task and adds its metrics to dict results
+    task_cls=InstrumentedTask
 )
 
 # Celery configuration
@@ -35,7 +38,13 @@ celery_app.conf.update(
 # Optional: Configure task routes
 celery_app.conf.task_routes = {
     'celery_tasks.tasks.process_bim_file': {'queue': 'bim_processing'},
+    'celery_tasks.tasks.process_bim_chunk': {'queue': 'bim_processing'},
+    'celery_tasks.tasks.merge_bim_chunks': {'queue': 'bim_processing'},
+    'celery_tasks.tasks.map_sensors': {'queue': 'bim_processing'},
+    'celery_tasks.tasks.detect_clashes': {'queue': 'bim_processing'},
     'celery_tasks.tasks.process_sensor_data': {'queue': 'sensor_data'},
+    'celery_tasks.tasks.ingest_sensor_batch': {'queue': 'sensor_data'},
+    'celery_tasks.tasks.query_sensor_rollups': {'queue': 'sensor_data'},
     'celery_tasks.tasks.generate_reports': {'queue': 'reports'},
 }
 
@@ -0,0 +1,80 @@
+"""
+Timing and Prometheus metrics for every Celery task
+
+InstrumentedTask is the app's task base class. It times each task run,
+adds 'task_seconds' and 'peak_rss_bytes' to the 'metrics' of dict results
+(BIM tasks put their pipeline metrics there as well) and records the run
+in the celery_task_seconds histogram by task name and result status.
+
+Workers serve their metrics on CELERY_METRICS_PORT when it is set. Prefork
+pool processes each write their metrics to PROMETHEUS_MULTIPROC_DIR, which
+has to be set in the environment before the worker starts; the server in
+the main worker process aggregates them.
+"""
+
+import glob
+import logging
+import os
+import time
+
+from celery import Task
+from celery.exceptions import Retry
+from celery.signals import worker_init
+
+from bim_processor.metrics import (
+    PROMETHEUS_AVAILABLE, STAGE_BUCKETS, peak_rss_bytes, publish_peak_rss, start_metrics_server
+)
+
+if PROMETHEUS_AVAILABLE:
+    from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+if PROMETHEUS_AVAILABLE:
+    TASK_SECONDS = Histogram('celery_task_seconds', 'Wall-clock seconds per Celery task run',
+                             ['task', 'status'], buckets=STAGE_BUCKETS)
+
+
+class InstrumentedTask(Task):
+    """Task base class recording run time, status and peak memory"""
+
+    def __call__(self, *args, **kwargs):
+        started = time.perf_counter()
+        status = 'EXCEPTION'
+        try:
+            result = super().__call__(*args, **kwargs)
+            if isinstance(result, dict):
+                status = str(result.get('status', 'SUCCESS'))
+                metrics = result.setdefault('metrics', {})
+                metrics['task_seconds'] = round(time.perf_counter() - started, 4)
+                metrics['peak_rss_bytes'] = peak_rss_bytes()
+            else:
+                status = 'SUCCESS'
+            return result
+        except Retry:
+            status = 'RETRY'
+            raise
+        finally:
+            if PROMETHEUS_AVAILABLE:
+                TASK_SECONDS.labels(task=self.name, status=status).observe(time.perf_counter() - started)
+            publish_peak_rss()
+
+
+@worker_init.connect
+def _serve_worker_metrics(**kwargs):
+    """Start the metrics server in the main worker process, before the pool forks"""
+    port = os.getenv('CELERY_METRICS_PORT')
+    if not port:
+        return
+    multiprocess_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiprocess_dir:
+        # Metrics of a previous worker's processes would be aggregated forever
+        os.makedirs(multiprocess_dir, exist_ok=True)
+        own_suffix = f"_{os.getpid()}.db"
+        for path in glob.glob(os.path.join(multiprocess_dir, '*.db')):
+            if not path.endswith(own_suffix):
+                os.remove(path)
+    if start_metrics_server(int(port)):
+        logger.info(f"Serving worker metrics on port {port}")
+    else:
+        logger.warning("prometheus-client is not available; worker metrics are not served")
@@ -3,113 +3,589 @@ Background tasks for Digital Twin Management System
 """
 
 import os
+import hashlib
+import json
 import logging
-from celery import current_task
+import time
+from celery import chord, current_task
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.signals import worker_process_shutdown
 from celery_app import celery_app
+from bim_processor.cache import DEFAULT_MAX_BYTES, ProcessedModelCache
+from bim_processor.checkpoint import DEFAULT_CHUNK_SIZE, ChunkCheckpoints
+from bim_processor.clash import ClashDetector
+from bim_processor.metrics import SamplingProfiler
+from bim_processor.model_store import STORE_SUFFIX
 from bim_processor.processor import BIMProcessor
+from bim_processor.sensor_mapping import SensorElementMap
+from iot_processor.aggregation import SensorAggregator, rollup_to_dict
+from iot_processor.anomaly import DEFAULT_THRESHOLD, AnomalyDetector
+from iot_processor.ingestion import DEFAULT_WINDOW_SECONDS, MongoSensorStore, SensorBatchIngestor
+from report_processor.engine import ReportEngine
+from report_processor.sources import MongoReadingSource
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@celery_app.task(bind=True)
-def process_bim_file(self, file_path: str, user_id: str = None):
+# Default number of tessellation threads per BIM processing task
+BIM_TESSELLATION_WORKERS = int(os.getenv('BIM_TESSELLATION_WORKERS', os.cpu_count() or 1))
+
+# Processed model cache, disabled unless BIM_CACHE_DIR is set
+BIM_CACHE_DIR = os.getenv('BIM_CACHE_DIR')
+BIM_CACHE_MAX_BYTES = int(os.getenv('BIM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+_bim_cache = None
+
+def get_bim_cache():
+    """Return the worker's processed model cache, created on first use"""
+    global _bim_cache
+    if _bim_cache is None and BIM_CACHE_DIR:
+        _bim_cache = ProcessedModelCache(BIM_CACHE_DIR, BIM_CACHE_MAX_BYTES)
+    return _bim_cache
+
+# Sensor readings are stored in MongoDB buckets, one per sensor and window
+MONGODB_URI = os.getenv('MONGODB_URI')
+MONGODB_DB = os.getenv('MONGODB_DB', 'digital_twin')
+IOT_READINGS_COLLECTION = os.getenv('IOT_READINGS_COLLECTION', 'sensor_readings')
+IOT_BUCKET_SECONDS = int(os.getenv('IOT_BUCKET_SECONDS', DEFAULT_WINDOW_SECONDS))
+
+# Rolling 1 min / 15 min / 1 h rollups and anomaly detector state are kept
+# in the sensor_data worker's memory. Exactly one worker process may consume
+# that queue (celery-sensor-worker in docker-compose.yml runs
+# -Q sensor_data --concurrency 1) so every reading reaches the same state;
+# the snapshots at IOT_ROLLUP_PATH and IOT_ANOMALY_STATE_PATH carry it
+# across worker restarts.
+IOT_ROLLUP_PATH = os.getenv('IOT_ROLLUP_PATH')
+IOT_ANOMALY_STATE_PATH = os.getenv('IOT_ANOMALY_STATE_PATH')
+IOT_STATE_SAVE_SECONDS = float(os.getenv('IOT_STATE_SAVE_SECONDS', 60))
+
+IOT_ANOMALY_DETECTION = os.getenv('IOT_ANOMALY_DETECTION', 'true').lower() == 'true'
+IOT_ANOMALY_THRESHOLD = float(os.getenv('IOT_ANOMALY_THRESHOLD', DEFAULT_THRESHOLD))
+IOT_ANOMALY_FOREST = os.getenv('IOT_ANOMALY_FOREST', 'false').lower() == 'true'
+IOT_ANOMALY_COLLECTION = os.getenv('IOT_ANOMALY_COLLECTION', 'sensor_anomalies')
+
+# Sensor -> model element/storey map. The bim_processing worker updates the
+# snapshot at IOT_SENSOR_MAP_PATH when the mapped model is reprocessed;
+# sensor_data workers reload it whenever the file changes.
+IOT_SENSOR_MAP_PATH = os.getenv('IOT_SENSOR_MAP_PATH')
+
+_sensor_ingestor = None
+_sensor_aggregator = None
+_anomaly_detector = None
+_sensor_map = None
+_sensor_map_mtime = None
+_sensor_state_saved_at = 0.0
+
+def _restore(path: str, load, description: str):
+    """Load worker state from path if a snapshot exists, None otherwise"""
+    if path and os.path.exists(path):
+        try:
+            return load(path)
+        except Exception as e:
+            logger.warning(f"Could not restore {description} from {path}: {str(e)}")
+    return None
+
+def get_sensor_aggregator():
+    """Return the worker's sensor aggregator, restored from IOT_ROLLUP_PATH on first use"""
+    global _sensor_aggregator, _sensor_state_saved_at
+    if _sensor_aggregator is None:
+        _sensor_aggregator = _restore(IOT_ROLLUP_PATH, SensorAggregator.load, 'sensor rollups') or SensorAggregator()
+        _sensor_state_saved_at = time.time()
+    return _sensor_aggregator
+
+def get_anomaly_detector():
+    """Return the worker's anomaly detector, restored from IOT_ANOMALY_STATE_PATH on first use"""
+    global _anomaly_detector, _sensor_state_saved_at
+    if _anomaly_detector is None and IOT_ANOMALY_DETECTION:
+        _anomaly_detector = _restore(IOT_ANOMALY_STATE_PATH, AnomalyDetector.load, 'anomaly detector') \
+            or AnomalyDetector(threshold=IOT_ANOMALY_THRESHOLD, forest=IOT_ANOMALY_FOREST)
+        _sensor_state_saved_at = time.time()
+    return _anomaly_detector
+
+def get_sensor_map():
+    """Return the sensor map at IOT_SENSOR_MAP_PATH, reloaded when the file has changed"""
+    global _sensor_map, _sensor_map_mtime
+    if not IOT_SENSOR_MAP_PATH or not os.path.exists(IOT_SENSOR_MAP_PATH):
+        return _sensor_map
+    mtime = os.path.getmtime(IOT_SENSOR_MAP_PATH)
+    if mtime != _sensor_map_mtime:
+        _sensor_map = _restore(IOT_SENSOR_MAP_PATH, SensorElementMap.load, 'sensor map') or _sensor_map
+        _sensor_map_mtime = mtime
+    return _sensor_map
+
+def update_sensor_map(model, file_path: str, changes=None, previous_file_path: str = None):
+    """
+    Rebuild the saved sensor map for a reprocessed model, if it maps this model
+    
+    The map is updated incrementally when it was built from
+    previous_file_path and changes are known, and rebuilt otherwise.
+    Returns the update counts, or None when there is no map for this model.
+    """
+    sensor_map = get_sensor_map()
+    if sensor_map is None or sensor_map.source not in (file_path, previous_file_path):
+        return None
+    
+    incremental = changes is not None and previous_file_path and sensor_map.source == previous_file_path
+    counts = sensor_map.update(model, changes if incremental else None, source=file_path)
+    sensor_map.save(IOT_SENSOR_MAP_PATH)
+    return counts
+
+def save_sensor_state(force: bool = False):
+    """Snapshot rollups and detector state at most every IOT_STATE_SAVE_SECONDS"""
+    global _sensor_state_saved_at
+    if not force and time.time() - _sensor_state_saved_at < IOT_STATE_SAVE_SECONDS:
+        return
+    for state, path, description in ((_sensor_aggregator, IOT_ROLLUP_PATH, 'sensor rollups'),
+                                     (_anomaly_detector, IOT_ANOMALY_STATE_PATH, 'anomaly detector')):
+        if state is None or not path:
+            continue
+        try:
+            state.save(path)
+        except Exception as e:
+            logger.warning(f"Could not save {description} to {path}: {str(e)}")
+    _sensor_state_saved_at = time.time()
+
+@worker_process_shutdown.connect
+def _save_sensor_state_on_shutdown(**kwargs):
+    save_sensor_state(force=True)
+
+def get_sensor_ingestor():
+    """Return the worker's sensor batch ingestor, created on first use"""
+    global _sensor_ingestor
+    if _sensor_ingestor is None:
+        store = None
+        if MONGODB_URI:
+            store = MongoSensorStore.from_uri(MONGODB_URI, MONGODB_DB, IOT_READINGS_COLLECTION,
+                                              IOT_ANOMALY_COLLECTION)
+        else:
+            logger.warning("MONGODB_URI not set: sensor readings are validated but not stored")
+        _sensor_ingestor = SensorBatchIngestor(store, window_seconds=IOT_BUCKET_SECONDS,
+                                               aggregator=get_sensor_aggregator(),
+                                               detector=get_anomaly_detector())
+    _sensor_ingestor.sensor_map = get_sensor_map()
+    return _sensor_ingestor
+
+# Reports are written to REPORTS_DIR; per-bucket partial aggregates are cached
+# in REPORT_CACHE_DIR so recurring reports only compute new buckets
+REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR')
+REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+_report_engine = None
+
+def get_report_engine():
+    """Return the worker's report engine over the MongoDB sensor store, created on first use"""
+    global _report_engine
+    if _report_engine is None:
+        if not MONGODB_URI:
+            raise RuntimeError("MONGODB_URI is not set: reports need the stored sensor readings")
+        store = MongoSensorStore.from_uri(MONGODB_URI, MONGODB_DB, IOT_READINGS_COLLECTION,
+                                          IOT_ANOMALY_COLLECTION)
+        cache = ProcessedModelCache(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES) if REPORT_CACHE_DIR else None
+        _report_engine = ReportEngine(MongoReadingSource(store), cache,
+                                      namespace=f"{MONGODB_DB}.{IOT_READINGS_COLLECTION}")
+    return _report_engine
+
+# File suffixes for compressed exports
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+# BIM files are processed in chunks of BIM_CHUNK_SIZE elements. With
+# BIM_CHECKPOINT_DIR set, every finished chunk is checkpointed there, so a
+# task stopped by the soft time limit retries from the last checkpoint and
+# a task lost with its worker is redelivered and resumes the same way.
+# Fanning chunks out across workers needs the directory on shared storage.
+BIM_CHUNK_SIZE = int(os.getenv('BIM_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+BIM_CHECKPOINT_DIR = os.getenv('BIM_CHECKPOINT_DIR')
+BIM_MAX_RETRIES = int(os.getenv('BIM_MAX_RETRIES', 3))
+
+# Folded-stack profiles of process_bim_file runs started with profile=True
+BIM_PROFILE_DIR = os.getenv('BIM_PROFILE_DIR', 'profiles')
+
+# Memory-mapped model stores served by the query service (main.py), written
+# for every processed model when BIM_MODEL_STORE_DIR is set
+BIM_MODEL_STORE_DIR = os.getenv('BIM_MODEL_STORE_DIR')
+
+# Clashes listed in detect_clashes results; all of them go to its output file
+CLASH_RESULT_LIMIT = 100
+
+def get_bim_processor(num_workers: int = None) -> BIMProcessor:
+    """BIM processor with the worker's cache and a spatial index"""
+    return BIMProcessor(
+        num_workers=num_workers or BIM_TESSELLATION_WORKERS,
+        cache=get_bim_cache(),
+        spatial_index=True
+    )
+
+def get_checkpoints(processor: BIMProcessor, file_path: str, chunk_size: int = None):
+    """Checkpoints of file_path under BIM_CHECKPOINT_DIR, None when checkpointing is disabled"""
+    if not BIM_CHECKPOINT_DIR:
+        return None
+    return ChunkCheckpoints.for_file(BIM_CHECKPOINT_DIR, file_path, processor.settings_fingerprint(),
+                                     chunk_size or BIM_CHUNK_SIZE)
+
+def _report_progress(task, status: str):
+    """Progress callback publishing (elements done, elements total) as task state"""
+    def report(done: int, total: int):
+        task.update_state(state='PROGRESS', meta={'current': done, 'total': total, 'status': status})
+    return report
+
+def _retry_after_time_limit(task, file_path: str, user_id: str = None):
+    """Retry a BIM task stopped by the soft time limit; finished chunks are kept"""
+    if BIM_CHECKPOINT_DIR and task.request.retries < task.max_retries:
+        logger.warning(f"Soft time limit reached processing {file_path}; retrying from the last checkpoint")
+        raise task.retry(countdown=0)
+    logger.error(f"Soft time limit reached processing {file_path}")
+    return {
+        'status': 'ERROR',
+        'file_path': file_path,
+        'error': 'Processing exceeded the task time limit',
+        'user_id': user_id
+    }
+
+def _bim_output_name(file_path: str, scope: dict = None) -> str:
+    """Base name of a file's outputs; scoped runs get a tag so they don't replace the full model's"""
+    name = os.path.basename(file_path)
+    if scope:
+        digest = hashlib.sha1(json.dumps(scope, sort_keys=True).encode('utf-8')).hexdigest()
+        name += f".scope-{digest[:10]}"
+    return name
+
+def _bim_output_path(file_path: str, output_format: str, compression: str = None, scope: dict = None) -> str:
+    output_path = f"processed_{_bim_output_name(file_path, scope)}.{output_format}"
+    if output_format != 'glb':
+        output_path += COMPRESSION_SUFFIXES.get(compression, '')
+    return output_path
+
+def _finish_bim_file(processor: BIMProcessor, model, file_path: str, user_id: str = None,
+                     output_format: str = 'json', compression: str = None,
+                     changes=None, previous_file_path: str = None, scope: dict = None) -> dict:
+    """Save the spatial index, update the sensor map and export a processed model"""
+    output_name = _bim_output_name(file_path, scope)
+    output_path = _bim_output_path(file_path, output_format, compression, scope)
+    
+    # Get statistics
+    with processor.metrics.stage('statistics'):
+        stats = processor.get_element_statistics(model)
+    
+    result = {
+        'status': 'SUCCESS',
+        'file_path': file_path,
+        'output_path': output_path,
+        'statistics': stats,
+        'user_id': user_id
+    }
+    
+    if model.spatial_index is not None:
+        # Saved next to the export so other services can query without reprocessing
+        index_path = f"processed_{output_name}.sidx.npz"
+        model.spatial_index.save(index_path)
+        result['spatial_index_path'] = index_path
+    
+    if changes is not None:
+        result['changes'] = changes.to_dict()
+    
+    if scope:
+        # Sensors stay mapped against the full model
+        result['scope'] = scope
+    else:
+        sensor_map_update = update_sensor_map(model, file_path, changes, previous_file_path)
+        if sensor_map_update is not None:
+            result['sensor_map'] = sensor_map_update
+    
+    if processor.cache is not None:
+        result['cache'] = processor.cache.stats()
+    
+    if output_format == 'glb':
+        # Export binary geometry and properties sidecar
+        export = processor.export_to_glb(model, output_path)
+        result['sidecar_path'] = export['sidecar_path']
+    else:
+        # Export to JSON
+        processor.export_to_json(model, output_path, compression=compression)
+    
+    if BIM_MODEL_STORE_DIR:
+        store_path = os.path.join(BIM_MODEL_STORE_DIR, f"{output_name}{STORE_SUFFIX}")
+        processor.export_to_store(model, store_path)
+        result['store_path'] = store_path
+    
+    processor.metrics.publish()
+    result['metrics'] = processor.metrics.to_dict()
+    
+    logger.info(f"BIM file processing completed: {file_path}")
+    
+    return result
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=BIM_MAX_RETRIES)
+def process_bim_file(self, file_path: str, user_id: str = None, num_workers: int = None,
+                     output_format: str = 'json', compression: str = None,
+                     previous_file_path: str = None, fan_out: bool = False, profile: bool = False,
+                     storeys: list = None, spaces: list = None, types: list = None):
     """
     Process BIM file in background
     
+    Progress is reported as elements processed out of the file's total.
+    
     Args:
         file_path: Path to the BIM file
         user_id: ID of the user who uploaded the file
+        num_workers: Number of tessellation threads (defaults to BIM_TESSELLATION_WORKERS)
+        output_format: 'json' for a single model document, 'ndjson' to stream
+            elements to the output as they are extracted, 'glb' for binary
+            geometry plus a '.meta.json' properties sidecar
+        compression: None, 'gzip' or 'zstd' (not applied to 'glb')
+        previous_file_path: Path of the previous revision of this model. When
+            its processed model is cached, only changed elements are reprocessed.
+        fan_out: Process chunks as a chord of process_bim_chunk tasks across
+            bim_processing workers; this task then returns 'DISPATCHED' and
+            merge_bim_chunks produces the result (needs BIM_CHECKPOINT_DIR)
+        profile: Sample the run's stacks and write them to BIM_PROFILE_DIR
+            as a flamegraph-compatible '.folded' file (result 'profile_path')
+        storeys: Only process elements in these storeys (GlobalIds or names)
+        spaces: Only process elements in these spaces (GlobalIds or names)
+        types: Only process elements of these IFC types or their subtypes.
+            Scoped runs are processed in one pass (no incremental, chunked or
+            fan-out processing), are exported under a '.scope-<hash>' name
+            and leave the sensor map alone.
     """
+    scope = {name: values for name, values in (('storeys', storeys), ('spaces', spaces), ('types', types))
+             if values is not None} or None
+    args = (self, file_path, user_id, num_workers, output_format, compression, previous_file_path, fan_out,
+            scope)
+    if not profile:
+        return _process_bim_file(*args)
+    
+    with SamplingProfiler() as profiler:
+        result = _process_bim_file(*args)
+    
+    profile_path = os.path.join(BIM_PROFILE_DIR, f"{os.path.basename(file_path)}.{self.request.id}.folded")
+    result['profile_path'] = profiler.write(profile_path)
+    logger.info(f"Wrote profile of {profiler.samples} samples to {profile_path}")
+    return result
+
+def _process_bim_file(task, file_path: str, user_id: str, num_workers: int, output_format: str,
+                      compression: str, previous_file_path: str, fan_out: bool, scope: dict = None) -> dict:
+    """Body of process_bim_file"""
     try:
         logger.info(f"Starting BIM file processing: {file_path}")
         
         # Update task state
-        self.update_state(
+        task.update_state(
             state='PROGRESS',
-            meta={'current': 0, 'total': 100, 'status': 'Loading BIM file...'}
+            meta={'current': 0, 'total': 0, 'status': 'Loading BIM file...'}
         )
         
         # Initialize BIM processor
-        processor = BIMProcessor()
+        processor = get_bim_processor(num_workers)
+        output_path = _bim_output_path(file_path, output_format, compression, scope)
         
-        # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={'current': 25, 'total': 100, 'status': 'Processing BIM elements...'}
-        )
+        if output_format == 'ndjson':
+            # Stream elements straight to disk without building the model
+            stats = processor.stream_ifc_file(file_path, output_path, format='ndjson',
+                                              compression=compression, **(scope or {}))
+            processor.metrics.publish()
+            
+            logger.info(f"BIM file processing completed: {file_path}")
+            
+            return {
+                'status': 'SUCCESS',
+                'file_path': file_path,
+                'output_path': output_path,
+                'statistics': stats,
+                'metrics': processor.metrics.to_dict(),
+                'user_id': user_id
+            }
+        
+        progress = _report_progress(task, 'Processing BIM elements...')
         
-        # Process the file
-        model = processor.process_ifc_file(file_path)
+        # Process the file, incrementally if the previous revision is cached
+        changes = None
+        previous_model = None
+        if previous_file_path and not scope:
+            previous_model = processor.get_cached_model(previous_file_path)
+        if previous_model is not None and previous_model.elements.fingerprints is None:
+            # Nothing to compare against: every element would count as modified
+            logger.info(f"Cached model of {previous_file_path} has no fingerprints; processing in full")
+            previous_model = None
+        if scope:
+            # Only the scoped elements are tessellated
+            model = processor.process_ifc_file(file_path, **scope)
+        elif previous_model is not None:
+            model, changes = processor.process_ifc_file_incremental(file_path, previous_model, progress=progress)
+        elif fan_out:
+            return _dispatch_bim_chunks(processor, file_path, user_id, num_workers, output_format, compression)
+        else:
+            model = processor.process_ifc_file_chunked(file_path, get_checkpoints(processor, file_path),
+                                                       BIM_CHUNK_SIZE, progress=progress)
         
         # Update progress
-        self.update_state(
+        task.update_state(
             state='PROGRESS',
-            meta={'current': 75, 'total': 100, 'status': 'Generating statistics...'}
+            meta={'current': len(model.elements), 'total': len(model.elements),
+                  'status': 'Generating statistics...'}
         )
         
-        # Get statistics
-        stats = processor.get_element_statistics(model)
+        return _finish_bim_file(processor, model, file_path, user_id, output_format, compression,
+                                changes, previous_file_path, scope)
         
-        # Export to JSON
-        output_path = f"processed_{os.path.basename(file_path)}.json"
-        processor.export_to_json(model, output_path)
+    except SoftTimeLimitExceeded:
+        return _retry_after_time_limit(task, file_path, user_id)
+        
+    except Exception as e:
+        logger.error(f"Error processing BIM file {file_path}: {str(e)}")
+        return {
+            'status': 'ERROR',
+            'file_path': file_path,
+            'error': str(e),
+            'user_id': user_id
+        }
+
+def _dispatch_bim_chunks(processor: BIMProcessor, file_path: str, user_id: str, num_workers: int,
+                         output_format: str, compression: str) -> dict:
+    """Fan a file's chunks out as a chord whose callback merges and exports the model"""
+    checkpoints = get_checkpoints(processor, file_path)
+    if checkpoints is None:
+        raise RuntimeError("BIM_CHECKPOINT_DIR is not set: fanned-out chunks are merged from shared checkpoints")
+    
+    manifest = processor.plan_chunks(file_path, checkpoints)
+    merge = chord(
+        process_bim_chunk.s(file_path, index, checkpoints.chunk_size, num_workers)
+        for index in range(manifest['chunks'])
+    )(merge_bim_chunks.s(file_path, user_id, num_workers, output_format, compression, checkpoints.chunk_size))
+    
+    logger.info(f"Dispatched {manifest['chunks']} chunks of {file_path} ({manifest['elements']} elements)")
+    
+    return {
+        'status': 'DISPATCHED',
+        'file_path': file_path,
+        'output_path': _bim_output_path(file_path, output_format, compression),
+        'elements': manifest['elements'],
+        'chunks': manifest['chunks'],
+        'merge_task_id': merge.id,
+        'user_id': user_id
+    }
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=BIM_MAX_RETRIES)
+def process_bim_chunk(self, file_path: str, chunk_index: int, chunk_size: int, num_workers: int = None):
+    """
+    Process one chunk of a fanned-out process_bim_file run
+    
+    The chunk's elements are checkpointed for merge_bim_chunks; a chunk
+    that is already checkpointed is not processed again.
+    """
+    try:
+        processor = get_bim_processor(num_workers)
+        checkpoints = get_checkpoints(processor, file_path, chunk_size)
+        if checkpoints is None:
+            raise RuntimeError("BIM_CHECKPOINT_DIR is not set: chunks have nowhere to be checkpointed")
         
-        logger.info(f"BIM file processing completed: {file_path}")
+        elements = processor.process_chunk(file_path, checkpoints, chunk_index)
+        processor.metrics.publish()
         
         return {
             'status': 'SUCCESS',
             'file_path': file_path,
-            'output_path': output_path,
-            'statistics': stats,
-            'user_id': user_id
+            'chunk': chunk_index,
+            'elements': elements,
+            'metrics': processor.metrics.to_dict()
         }
         
+    except SoftTimeLimitExceeded:
+        return _retry_after_time_limit(self, file_path)
+        
     except Exception as e:
-        logger.error(f"Error processing BIM file {file_path}: {str(e)}")
+        logger.error(f"Error processing chunk {chunk_index} of BIM file {file_path}: {str(e)}")
         return {
             'status': 'ERROR',
             'file_path': file_path,
-            'error': str(e),
-            'user_id': user_id
+            'chunk': chunk_index,
+            'error': str(e)
         }
 
-@celery_app.task(bind=True)
-def process_sensor_data(self, sensor_id: str, data: dict):
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def merge_bim_chunks(self, chunk_results: list, file_path: str, user_id: str = None,
+                     num_workers: int = None, output_format: str = 'json', compression: str = None,
+                     chunk_size: int = None):
     """
-    Process sensor data in background
+    Assemble and export the model of a fanned-out process_bim_file run
     
     Args:
-        sensor_id: ID of the sensor
-        data: Sensor data dictionary
+        chunk_results: Results of the run's process_bim_chunk tasks (chord header)
     """
     try:
-        logger.info(f"Processing sensor data for sensor {sensor_id}")
+        failed = [result for result in chunk_results if result.get('status') != 'SUCCESS']
+        if failed:
+            raise RuntimeError(f"{len(failed)} of {len(chunk_results)} chunks failed: {failed[0].get('error')}")
         
-        # Update task state
         self.update_state(
             state='PROGRESS',
-            meta={'current': 0, 'total': 100, 'status': 'Processing sensor data...'}
+            meta={'current': len(chunk_results), 'total': len(chunk_results), 'status': 'Merging chunks...'}
         )
         
-        # Simulate processing time
-        import time
-        time.sleep(1)
+        processor = get_bim_processor(num_workers)
+        model = processor.merge_chunks(file_path, get_checkpoints(processor, file_path, chunk_size))
         
-        # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={'current': 50, 'total': 100, 'status': 'Storing data...'}
-        )
+        return _finish_bim_file(processor, model, file_path, user_id, output_format, compression)
         
-        # Simulate data storage
-        time.sleep(1)
+    except Exception as e:
+        logger.error(f"Error merging chunks of BIM file {file_path}: {str(e)}")
+        return {
+            'status': 'ERROR',
+            'file_path': file_path,
+            'error': str(e),
+            'user_id': user_id
+        }
+
+@celery_app.task(bind=True)
+def ingest_sensor_batch(self, readings):
+    """
+    Validate, unit-convert and store a batch of sensor readings, fold it
+    into the rolling rollups and flag anomalous readings
+    
+    Args:
+        readings: List of {'sensor_id', 'timestamp', 'value', 'unit'} dicts,
+            or a dict with those fields as equally long lists. Timestamps are
+            epoch seconds, epoch milliseconds or ISO 8601 strings.
+    """
+    try:
+        result = get_sensor_ingestor().ingest(readings)
+        save_sensor_state()
         
-        # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={'current': 100, 'total': 100, 'status': 'Completed'}
+        logger.info(
+            f"Ingested {result.accepted} sensor readings into {result.buckets} buckets "
+            f"({sum(result.rejected.values())} rejected)"
         )
+        if result.anomalies:
+            logger.warning(f"Flagged {len(result.anomalies)} anomalous sensor readings")
+        
+        return {'status': 'SUCCESS', **result.to_dict()}
+        
+    except Exception as e:
+        logger.error(f"Error ingesting sensor batch: {str(e)}")
+        return {
+            'status': 'ERROR',
+            'error': str(e)
+        }
+
+@celery_app.task(bind=True)
+def process_sensor_data(self, sensor_id: str, data: dict):
+    """
+    Process a single sensor reading
+    
+    High-rate producers should send batches to ingest_sensor_batch instead;
+    this task runs the same ingestion, rollup and anomaly detection path
+    for one reading.
+    
+    Args:
+        sensor_id: ID of the sensor
+        data: Sensor data dictionary ('value', optional 'timestamp' and 'unit')
+    """
+    try:
+        logger.info(f"Processing sensor data for sensor {sensor_id}")
+        
+        reading = {'timestamp': time.time(), **data, 'sensor_id': sensor_id}
+        result = get_sensor_ingestor().ingest([reading])
+        save_sensor_state()
         
         logger.info(f"Sensor data processing completed for sensor {sensor_id}")
         
@@ -117,6 +593,8 @@ def process_sensor_data(self, sensor_id: str, data: dict):
             'status': 'SUCCESS',
             'sensor_id': sensor_id,
             'processed_data': data,
+            'anomalous': bool(result.anomalies),
+            'ingestion': result.to_dict(),
             'timestamp': time.time()
         }
         
@@ -129,13 +607,141 @@ def process_sensor_data(self, sensor_id: str, data: dict):
         }
 
 @celery_app.task(bind=True)
-def generate_reports(self, report_type: str, parameters: dict = None):
+def query_sensor_rollups(self, sensor_id: str, start: float, end: float, resolution: int = None):
+    """
+    Read a sensor's rollup series
+    
+    Args:
+        sensor_id: ID of the sensor
+        start: Range start, epoch seconds
+        end: Range end, epoch seconds
+        resolution: Bucket width in seconds (60, 900 or 3600); by default
+            the finest one whose retained history covers start
+    """
+    try:
+        rollup = get_sensor_aggregator().query(sensor_id, start, end, resolution)
+        if rollup is None:
+            return {
+                'status': 'NOT_FOUND',
+                'sensor_id': sensor_id
+            }
+        
+        return {'status': 'SUCCESS', **rollup_to_dict(rollup)}
+        
+    except Exception as e:
+        logger.error(f"Error querying rollups for sensor {sensor_id}: {str(e)}")
+        return {
+            'status': 'ERROR',
+            'sensor_id': sensor_id,
+            'error': str(e)
+        }
+
+@celery_app.task(bind=True)
+def map_sensors(self, file_path: str, sensor_positions: dict, removed_sensors: list = None):
+    """
+    Place sensors in a processed BIM model and save the map used to enrich ingestion
+    
+    Args:
+        file_path: Path to the IFC file the sensors are placed in; its
+            processed model is taken from the model cache when available
+        sensor_positions: {sensor_id: [x, y, z]} in model coordinates
+        removed_sensors: Sensor ids to drop from the map
+    """
+    try:
+        if not IOT_SENSOR_MAP_PATH:
+            raise RuntimeError("IOT_SENSOR_MAP_PATH is not set: the sensor map has nowhere to be saved")
+        
+        sensor_map = get_sensor_map() or SensorElementMap()
+        if sensor_map.source != file_path:
+            processor = get_bim_processor()
+            model = processor.get_cached_model(file_path) or processor.process_ifc_file(file_path)
+            sensor_map.update(model, source=file_path)
+        
+        removed = sensor_map.remove_sensors(removed_sensors or [])
+        placed = sensor_map.place_sensors(sensor_positions or {})
+        sensor_map.save(IOT_SENSOR_MAP_PATH)
+        
+        logger.info(f"Mapped {placed} sensors to {file_path}")
+        
+        return {
+            'status': 'SUCCESS',
+            'file_path': file_path,
+            'placed': placed,
+            'removed': removed,
+            'sensors': [sensor_map.to_dict(sensor_id) for sensor_id in (sensor_positions or {})],
+            'statistics': sensor_map.statistics()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error mapping sensors to {file_path}: {str(e)}")
+        return {
+            'status': 'ERROR',
+            'file_path': file_path,
+            'error': str(e)
+        }
+
+@celery_app.task(bind=True)
+def detect_clashes(self, file_path: str, types_a: list = None, types_b: list = None,
+                   tolerance: float = 0.0, clearance: float = 0.0, num_workers: int = None):
+    """
+    Detect clashes between two sets of elements of a BIM model
+    
+    Progress is reported as candidate element pairs checked out of the total.
+    
+    Args:
+        file_path: Path to the IFC file; its processed model is taken from the
+            model cache when available
+        types_a, types_b: IFC types of each set, subtypes included (e.g.
+            ['IfcDistributionElement'] against ['IfcBeam', 'IfcColumn']);
+            None for every element
+        tolerance: Hard clashes shallower than this are ignored (model units)
+        clearance: Also report elements closer than this distance
+        num_workers: Threads checking element pairs
+    """
+    try:
+        logger.info(f"Detecting clashes in {file_path}")
+        
+        processor = get_bim_processor(num_workers)
+        model = processor.get_cached_model(file_path) or processor.process_ifc_file(file_path)
+        
+        detector = ClashDetector(tolerance=tolerance, clearance=clearance,
+                                 num_workers=num_workers or BIM_TESSELLATION_WORKERS)
+        clashes = detector.detect(model, types_a, types_b,
+                                  progress=_report_progress(self, 'Checking element pairs...'))
+        
+        output_path = f"clashes_{os.path.basename(file_path)}.json"
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump([clash.to_dict() for clash in clashes], f)
+        
+        detector.metrics.publish()
+        
+        return {
+            'status': 'SUCCESS',
+            'file_path': file_path,
+            'output_path': output_path,
+            'statistics': detector.statistics,
+            'top_clashes': [clash.to_dict() for clash in clashes[:CLASH_RESULT_LIMIT]],
+            'metrics': detector.metrics.to_dict()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error detecting clashes in {file_path}: {str(e)}")
+        return {
+            'status': 'ERROR',
+            'file_path': file_path,
+            'error': str(e)
+        }
+
+@celery_app.task(bind=True)
+def generate_reports(self, report_type: str, parameters: dict = None, compression: str = None):
     """
     Generate reports in background
     
     Args:
-        report_type: Type of report to generate
-        parameters: Report parameters
+        report_type: 'energy', 'maintenance' or 'asset'
+        parameters: Report parameters ('start', 'end', 'bucket', 'sensor_ids',
+            'detail' and report specific ones, see ReportEngine.generate)
+        compression: None, 'gzip' or 'zstd'
     """
     try:
         logger.info(f"Generating {report_type} report")
@@ -146,31 +752,22 @@ def generate_reports(self, report_type: str, parameters: dict = None):
             meta={'current': 0, 'total': 100, 'status': f'Generating {report_type} report...'}
         )
         
-        # Simulate report generation
-        import time
-        time.sleep(2)
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        file_name = f"{report_type}_{int(time.time())}.ndjson" + COMPRESSION_SUFFIXES.get(compression, '')
+        stats = get_report_engine().generate(report_type, parameters, os.path.join(REPORTS_DIR, file_name),
+                                             compression=compression)
         
-        # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={'current': 50, 'total': 100, 'status': 'Compiling data...'}
+        logger.info(
+            f"Report generation completed: {report_type} ({stats['computed_buckets']} buckets computed, "
+            f"{stats['cached_buckets']} cached, {stats['seconds']}s)"
         )
         
-        time.sleep(2)
-        
-        # Update progress
-        self.update_state(
-            state='PROGRESS',
-            meta={'current': 100, 'total': 100, 'status': 'Report ready'}
-        )
-        
-        logger.info(f"Report generation completed: {report_type}")
-        
         return {
             'status': 'SUCCESS',
             'report_type': report_type,
             'parameters': parameters,
-            'report_url': f"/reports/{report_type}_{int(time.time())}.pdf"
+            'report_url': f"/reports/{file_name}",
+            'statistics': stats
         }
         
     except Exception as e:
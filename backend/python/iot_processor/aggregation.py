@@ -0,0 +1,438 @@
+"""
+Streaming windowed aggregation of sensor time series
+
+Validated reading batches are folded into per-sensor rollups at several
+resolutions (1 min, 15 min and 1 h by default). Each resolution is a ring
+buffer of fixed capacity per sensor, so memory is bounded and old buckets
+are overwritten as time advances. Rollups of all sensors live in blocks of
+NumPy arrays and a whole batch is applied with a handful of vectorized
+operations.
+
+Each bucket keeps count, min, max, mean and the 50th/95th percentiles.
+Percentiles of a sensor's newest bucket come from a reservoir sample of
+its readings (exact up to RESERVOIR_SIZE readings per bucket); readings
+arriving late for an older bucket are merged as a count-weighted average.
+"""
+
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from iot_processor.ingestion import ReadingFrame
+
+# Resolution in seconds -> number of buckets kept per sensor
+DEFAULT_RESOLUTIONS = {
+    60: 6 * 60,  # 6 hours of 1 minute buckets
+    900: 7 * 96,  # 7 days of 15 minute buckets
+    3600: 366 * 24  # 1 year of hourly buckets
+}
+
+QUANTILES = {'p50': 0.5, 'p95': 0.95}
+
+# Sensors are allocated in blocks of rows so adding sensors never copies existing rollups
+BLOCK_ROWS = 256
+
+EMPTY_BUCKET = -1
+
+FIELD_DTYPES = {
+    'bucket': np.int32,
+    'count': np.int32,
+    'min': np.float32,
+    'max': np.float32,
+    'mean': np.float32,
+    **{name: np.float32 for name in QUANTILES}
+}
+
+# Readings of each sensor's newest bucket are reservoir-sampled so its
+# percentiles cover the whole bucket even when it fills over many batches
+RESERVOIR_SIZE = 128
+
+# Per-sensor sampling state: name -> (dtype, width)
+SAMPLE_DTYPES = {
+    'open': (np.int32, 1),
+    'seen': (np.int64, 1),
+    'sample': (np.float32, RESERVOIR_SIZE)
+}
+
+
+class RollupRing:
+    """Ring buffer of bucket rollups at one resolution, for every sensor"""
+
+    def __init__(self, resolution: int, capacity: int, seed: Optional[int] = None):
+        """
+        Args:
+            resolution: Bucket width in seconds
+            capacity: Buckets kept per sensor
+            seed: Seed of the reservoir sampling
+        """
+        self.resolution = int(resolution)
+        self.capacity = int(capacity)
+        self.blocks: List[Dict[str, np.ndarray]] = []
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def bytes_per_sensor(self) -> int:
+        slots = sum(np.dtype(dtype).itemsize for dtype in FIELD_DTYPES.values())
+        sample = sum(np.dtype(dtype).itemsize * width for dtype, width in SAMPLE_DTYPES.values())
+        return self.capacity * slots + sample
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for block in self.blocks for array in block.values())
+
+    def ensure_rows(self, rows: int) -> None:
+        """Allocate blocks until rows sensors fit"""
+        while len(self.blocks) * BLOCK_ROWS < rows:
+            block = {
+                name: np.zeros((BLOCK_ROWS, self.capacity), dtype=dtype)
+                for name, dtype in FIELD_DTYPES.items()
+            }
+            block['bucket'].fill(EMPTY_BUCKET)
+            for name, (dtype, width) in SAMPLE_DTYPES.items():
+                block[name] = np.zeros((BLOCK_ROWS, width) if width > 1 else BLOCK_ROWS, dtype=dtype)
+            block['open'].fill(EMPTY_BUCKET)
+            self.blocks.append(block)
+
+    def update(self, rows: np.ndarray, timestamps: np.ndarray, values: np.ndarray) -> None:
+        """
+        Fold readings into their buckets
+
+        Args:
+            rows: Sensor row of each reading
+            timestamps: Epoch milliseconds of each reading
+            values: Reading values
+        """
+        if not len(values):
+            return
+
+        groups, sorted_values = _group_buckets(rows, timestamps // (self.resolution * 1000), values)
+        group_rows, buckets = groups['row'], groups['bucket']
+
+        # A batch spanning more than capacity buckets maps several of them to one
+        # slot; only the newest of those can be kept
+        slots = buckets % self.capacity
+        slot_keys = group_rows * self.capacity + slots
+        _, last = np.unique(slot_keys[::-1], return_index=True)
+        keep = np.zeros(len(slot_keys), dtype=bool)
+        keep[len(slot_keys) - 1 - last] = True
+
+        group_blocks = group_rows // BLOCK_ROWS
+        for block_index in np.unique(group_blocks):
+            block = self.blocks[block_index]
+            in_block = np.flatnonzero(group_blocks == block_index)
+            self._sample(block, groups, in_block, sorted_values)
+
+            in_block = in_block[keep[in_block]]
+            self._merge(block, group_rows[in_block] % BLOCK_ROWS, slots[in_block],
+                        {name: array[in_block] for name, array in groups.items()})
+
+    def _sample(self, block: Dict[str, np.ndarray], groups: Dict[str, np.ndarray],
+                selected: np.ndarray, sorted_values: np.ndarray) -> None:
+        """
+        Add readings of each sensor's newest bucket to its reservoir sample
+
+        Percentiles of those groups are replaced by the reservoir's, which
+        covers every reading of the bucket so far rather than this batch only.
+        """
+        offsets = groups['row'][selected] % BLOCK_ROWS
+        buckets = groups['bucket'][selected]
+        open_buckets = block['open'][offsets]
+
+        # Groups are sorted by row then bucket: the last one of a row is its newest
+        newest = np.append(offsets[1:] != offsets[:-1], True)
+
+        # Readings of the open bucket first, then newer buckets restart the sample
+        current = buckets == open_buckets
+        self._fill(block, groups, selected[current], offsets[current], sorted_values)
+
+        newer = newest & (buckets > open_buckets)
+        restart = offsets[newer]
+        block['open'][restart] = buckets[newer]
+        block['seen'][restart] = 0
+        block['sample'][restart] = np.nan
+        self._fill(block, groups, selected[newer], restart, sorted_values)
+
+    def _fill(self, block: Dict[str, np.ndarray], groups: Dict[str, np.ndarray],
+              chosen: np.ndarray, offsets: np.ndarray, sorted_values: np.ndarray) -> None:
+        """Reservoir-sample the readings of chosen groups (one per row) into their rows"""
+        if not len(chosen):
+            return
+
+        counts = groups['count'][chosen]
+        first = np.cumsum(counts) - counts
+        within = np.arange(counts.sum()) - np.repeat(first, counts)
+        readings = sorted_values[np.repeat(groups['start'][chosen], counts) + within]
+        reading_offsets = np.repeat(offsets, counts)
+
+        # Algorithm R: the i-th reading of a bucket replaces a random entry with probability size / i
+        position = block['seen'][reading_offsets] + within
+        slot = np.where(position < RESERVOIR_SIZE, position,
+                        self._rng.integers(0, position + 1))
+        stored = slot < RESERVOIR_SIZE
+        block['sample'][reading_offsets[stored], slot[stored]] = readings[stored]
+        block['seen'][offsets] += counts
+
+        sample = np.sort(block['sample'][offsets], axis=1)
+        filled = np.minimum(block['seen'][offsets], RESERVOIR_SIZE)
+        row_index = np.arange(len(offsets))
+        for name, quantile in QUANTILES.items():
+            position = quantile * (filled - 1)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, filled - 1)
+            low, high = sample[row_index, lower], sample[row_index, upper]
+            groups[name][chosen] = low + (high - low) * (position - lower)
+        groups['sampled'][chosen] = True
+
+    def _merge(self, block: Dict[str, np.ndarray], offsets: np.ndarray, slots: np.ndarray,
+               groups: Dict[str, np.ndarray]) -> None:
+        """Merge grouped bucket statistics into one block's slots"""
+        current = block['bucket'][offsets, slots]
+
+        # Late readings for buckets already overwritten by newer ones are dropped
+        accept = current <= groups['bucket']
+        offsets, slots, current = offsets[accept], slots[accept], current[accept]
+        groups = {name: array[accept] for name, array in groups.items()}
+
+        # Start fresh when the slot still holds an older bucket
+        fresh = current != groups['bucket']
+        old_count = np.where(fresh, 0, block['count'][offsets, slots]).astype(np.float64)
+        new_count = groups['count'].astype(np.float64)
+        total = old_count + new_count
+
+        def merged(name: str) -> np.ndarray:
+            old = block[name][offsets, slots].astype(np.float64)
+            return (old * old_count + groups[name] * new_count) / total
+
+        block['mean'][offsets, slots] = merged('mean')
+        # Late readings of already closed buckets fall back to a count-weighted average
+        for name in QUANTILES:
+            block[name][offsets, slots] = np.where(groups['sampled'], groups[name], merged(name))
+        block['min'][offsets, slots] = np.where(
+            fresh, groups['min'], np.minimum(block['min'][offsets, slots], groups['min']))
+        block['max'][offsets, slots] = np.where(
+            fresh, groups['max'], np.maximum(block['max'][offsets, slots], groups['max']))
+        block['count'][offsets, slots] = total
+        block['bucket'][offsets, slots] = groups['bucket']
+
+    def read(self, row: int, first_bucket: int, last_bucket: int) -> Dict[str, np.ndarray]:
+        """Filled buckets of one sensor between two bucket indices (inclusive)"""
+        first_bucket = max(first_bucket, last_bucket - self.capacity + 1)
+        if row >= len(self.blocks) * BLOCK_ROWS or first_bucket > last_bucket:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in FIELD_DTYPES.items()}
+
+        block = self.blocks[row // BLOCK_ROWS]
+        offset = row % BLOCK_ROWS
+        wanted = np.arange(first_bucket, last_bucket + 1)
+        slots = wanted % self.capacity
+        filled = block['bucket'][offset, slots] == wanted
+        slots = slots[filled]
+        return {name: block[name][offset, slots] for name in FIELD_DTYPES}
+
+    def latest_bucket(self, row: int) -> int:
+        """Newest bucket index stored for a sensor, EMPTY_BUCKET if none"""
+        if row >= len(self.blocks) * BLOCK_ROWS:
+            return EMPTY_BUCKET
+        return int(self.blocks[row // BLOCK_ROWS]['open'][row % BLOCK_ROWS])
+
+
+class SensorAggregator:
+    """Rolling per-sensor rollups at several resolutions"""
+
+    def __init__(self, resolutions: Optional[Dict[int, int]] = None):
+        """
+        Args:
+            resolutions: Bucket width in seconds -> buckets kept per sensor
+        """
+        resolutions = resolutions or DEFAULT_RESOLUTIONS
+        self.rings = [RollupRing(resolution, capacity) for resolution, capacity in sorted(resolutions.items())]
+        self.sensor_ids: List[str] = []
+        self.units: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    @property
+    def resolutions(self) -> List[int]:
+        return [ring.resolution for ring in self.rings]
+
+    @property
+    def bytes_per_sensor(self) -> int:
+        """Memory bound of one sensor's rollups across all resolutions"""
+        return sum(ring.bytes_per_sensor for ring in self.rings)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in self.rings)
+
+    def update(self, frame: ReadingFrame) -> int:
+        """Fold a validated batch into every resolution; returns the number of readings applied"""
+        if not len(frame):
+            return 0
+
+        rows = self._sensor_rows(frame.sensor_ids, frame.units)
+        for ring in self.rings:
+            ring.ensure_rows(len(self.sensor_ids))
+            ring.update(rows, frame.timestamps, frame.values)
+        return len(frame)
+
+    def query(self, sensor_id: str, start: float, end: float,
+              resolution: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Rollup series of one sensor over [start, end]
+
+        Args:
+            sensor_id: Sensor to read
+            start: Range start, epoch seconds
+            end: Range end, epoch seconds
+            resolution: Bucket width in seconds; by default the finest
+                resolution whose retained history covers start
+
+        Returns:
+            Dict with the resolution, unit, per-bucket arrays ('timestamps'
+            in epoch seconds, 'count', 'min', 'max', 'mean', 'p50', 'p95')
+            and a 'summary' over the range, or None for unknown sensors
+        """
+        row = self._rows.get(sensor_id)
+        if row is None:
+            return None
+
+        ring = self._ring(resolution) if resolution is not None else self._covering_ring(row, start)
+        buckets = ring.read(row, int(start // ring.resolution), int(end // ring.resolution))
+
+        count = int(buckets['count'].sum())
+        summary = {'count': count, 'min': None, 'max': None, 'mean': None}
+        if count:
+            summary.update({
+                'min': float(buckets['min'].min()),
+                'max': float(buckets['max'].max()),
+                'mean': float(np.dot(buckets['mean'].astype(np.float64), buckets['count']) / count)
+            })
+
+        series = {name: array for name, array in buckets.items() if name != 'bucket'}
+        return {
+            'sensor_id': sensor_id,
+            'resolution': ring.resolution,
+            'unit': self.units[row],
+            'timestamps': buckets['bucket'].astype(np.int64) * ring.resolution,
+            **series,
+            'summary': summary
+        }
+
+    def save(self, path: str) -> None:
+        """Write all rollups to a single .npz file, atomically"""
+        arrays = {
+            'sensor_ids': np.array(self.sensor_ids, dtype=str),
+            'units': np.array(self.units, dtype=str),
+            'resolutions': np.array([[ring.resolution, ring.capacity] for ring in self.rings], dtype=np.int64)
+        }
+        for index, ring in enumerate(self.rings):
+            ring.ensure_rows(1)
+            for name in ring.blocks[0]:
+                arrays[f"ring{index}_{name}"] = np.concatenate([block[name] for block in ring.blocks])
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'SensorAggregator':
+        """Read rollups written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            aggregator = cls({int(resolution): int(capacity) for resolution, capacity in data['resolutions']})
+            aggregator.sensor_ids = data['sensor_ids'].tolist()
+            aggregator.units = data['units'].tolist()
+            aggregator._rows = {sensor_id: row for row, sensor_id in enumerate(aggregator.sensor_ids)}
+
+            for index, ring in enumerate(aggregator.rings):
+                ring.ensure_rows(len(aggregator.sensor_ids))
+                for name in (ring.blocks[0] if ring.blocks else ()):
+                    stored = data[f"ring{index}_{name}"]
+                    for block_index, block in enumerate(ring.blocks):
+                        part = stored[block_index * BLOCK_ROWS:(block_index + 1) * BLOCK_ROWS]
+                        block[name][:len(part)] = part
+
+        return aggregator
+
+    def _sensor_rows(self, sensor_ids: np.ndarray, units: np.ndarray) -> np.ndarray:
+        """Row of each reading's sensor, registering new sensors"""
+        unique_ids, first, inverse = np.unique(sensor_ids.astype(str), return_index=True, return_inverse=True)
+        unique_rows = np.empty(len(unique_ids), dtype=np.int64)
+
+        for index, sensor_id in enumerate(unique_ids.tolist()):
+            row = self._rows.get(sensor_id)
+            if row is None:
+                row = len(self.sensor_ids)
+                self._rows[sensor_id] = row
+                self.sensor_ids.append(sensor_id)
+                self.units.append('')
+            self.units[row] = units[first[index]]
+            unique_rows[index] = row
+
+        return unique_rows[inverse.ravel()]
+
+    def _ring(self, resolution: int) -> RollupRing:
+        for ring in self.rings:
+            if ring.resolution == resolution:
+                return ring
+        raise ValueError(f"Unsupported resolution: {resolution}. Expected one of {self.resolutions}")
+
+    def _covering_ring(self, row: int, start: float) -> RollupRing:
+        """Finest ring whose retained buckets reach back to start"""
+        for ring in self.rings:
+            latest = ring.latest_bucket(row)
+            if latest == EMPTY_BUCKET or (latest - ring.capacity + 1) * ring.resolution <= start:
+                return ring
+        return self.rings[-1]
+
+
+def _group_buckets(rows: np.ndarray, buckets: np.ndarray,
+                   values: np.ndarray) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Count, min, max, mean and percentiles per (row, bucket) from one sort, plus the sorted values"""
+    order = np.lexsort((values, buckets, rows))
+    rows, buckets, values = rows[order], buckets[order], values[order]
+
+    boundary = np.empty(len(order), dtype=bool)
+    boundary[0] = True
+    boundary[1:] = (rows[1:] != rows[:-1]) | (buckets[1:] != buckets[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], len(order))
+    counts = ends - starts
+
+    groups = {
+        'row': rows[starts],
+        'bucket': buckets[starts],
+        'start': starts,
+        'count': counts,
+        # Values are sorted within each group, so min/max are its first/last
+        'min': values[starts],
+        'max': values[ends - 1],
+        'mean': np.add.reduceat(values, starts) / counts,
+        'sampled': np.zeros(len(starts), dtype=bool)
+    }
+
+    # Linear interpolation between closest ranks, as numpy.percentile
+    for name, quantile in QUANTILES.items():
+        position = starts + quantile * (counts - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, ends - 1)
+        groups[name] = values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    return groups, values
+
+
+def rollup_to_dict(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-serializable copy of a query() result"""
+    return {
+        name: value.tolist() if isinstance(value, np.ndarray) else value
+        for name, value in rollup.items()
+    }
@@ -0,0 +1,270 @@
+"""
+Online anomaly detection over sensor reading batches
+
+Every sensor keeps an exponentially weighted mean and variance. Each
+reading is scored against its sensor's state before the state is updated
+(EWMA z-score), so a batch covering thousands of sensors is scored with a
+few vectorized operations per reading rank. Readings are flagged when
+|z| exceeds the threshold once a sensor has seen its warm-up readings.
+
+Optionally an IsolationForest is trained periodically on a bounded sample of
+recent (z-score, step) features and flags readings whose combination is
+unusual even when neither feature crosses the z threshold on its own.
+"""
+
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from iot_processor.ingestion import ReadingFrame
+
+try:
+    from sklearn.ensemble import IsolationForest
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+DEFAULT_ALPHA = 0.05
+# The variance is smoothed more slowly than the mean: a noisy variance
+# estimate fattens the z-score tails and raises false positives
+DEFAULT_VARIANCE_ALPHA = 0.01
+DEFAULT_THRESHOLD = 4.0
+DEFAULT_WARMUP = 20
+
+# Standard deviations are floored relative to the mean so a constant signal
+# does not turn every tiny change into an anomaly
+RELATIVE_STD_FLOOR = 1e-3
+ABSOLUTE_STD_FLOOR = 1e-9
+
+DEFAULT_FOREST_RETRAIN_READINGS = 100_000
+DEFAULT_FOREST_SAMPLE_SIZE = 20_000
+DEFAULT_FOREST_CONTAMINATION = 0.001
+
+
+@dataclass
+class AnomalyScores:
+    """Scores of one batch, with readings ordered by sensor and timestamp"""
+    sensor_ids: np.ndarray
+    timestamps: np.ndarray
+    values: np.ndarray
+    zscores: np.ndarray
+    forest_scores: Optional[np.ndarray]  # lower is more anomalous; None until a forest is trained
+    anomalous: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def count(self) -> int:
+        return int(np.count_nonzero(self.anomalous))
+
+    def anomalies(self) -> List[Dict[str, Any]]:
+        """Flagged readings as dicts"""
+        flagged = np.flatnonzero(self.anomalous)
+        return [
+            {
+                'sensor_id': self.sensor_ids[index],
+                'timestamp': int(self.timestamps[index]),
+                'value': float(self.values[index]),
+                'zscore': round(float(self.zscores[index]), 3),
+                'forest_score': round(float(self.forest_scores[index]), 4)
+                if self.forest_scores is not None else None
+            }
+            for index in flagged
+        ]
+
+
+class AnomalyDetector:
+    """EWMA z-score detector over many sensors, with an optional IsolationForest"""
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA, variance_alpha: float = DEFAULT_VARIANCE_ALPHA,
+                 threshold: float = DEFAULT_THRESHOLD,
+                 warmup: int = DEFAULT_WARMUP, forest: bool = False,
+                 forest_retrain_readings: int = DEFAULT_FOREST_RETRAIN_READINGS,
+                 forest_sample_size: int = DEFAULT_FOREST_SAMPLE_SIZE,
+                 forest_contamination: float = DEFAULT_FOREST_CONTAMINATION,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            alpha: EWMA smoothing factor of the mean; higher adapts faster
+            variance_alpha: EWMA smoothing factor of the variance
+            threshold: |z| above which a reading is flagged
+            warmup: Readings a sensor needs before it can be flagged
+            forest: Also score readings with a periodically trained IsolationForest
+            forest_retrain_readings: Scored readings between forest trainings
+            forest_sample_size: Recent feature rows kept for training
+            forest_contamination: Expected share of anomalies in the training sample
+            seed: Seed of the training sample and the forest
+        """
+        if forest and not SKLEARN_AVAILABLE:
+            raise ImportError("scikit-learn is not available. Please install scikit-learn for IsolationForest scoring.")
+
+        self.alpha = alpha
+        self.variance_alpha = variance_alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.forest_enabled = forest
+        self.forest_retrain_readings = forest_retrain_readings
+        self.forest_sample_size = forest_sample_size
+        self.forest_contamination = forest_contamination
+        self.forest = None
+        self.seed = seed
+
+        self._rows: Dict[str, int] = {}
+        self._mean = np.zeros(0)
+        self._var = np.zeros(0)
+        self._last = np.zeros(0)
+        self._count = np.zeros(0, dtype=np.int64)
+
+        self._rng = np.random.default_rng(seed)
+        self._sample = np.empty((0, 2))
+        self._sample_seen = 0
+        self._since_training = 0
+
+    @property
+    def sensors(self) -> int:
+        return len(self._rows)
+
+    def score(self, frame: ReadingFrame) -> AnomalyScores:
+        """Score a validated batch and update every sensor's state"""
+        if not len(frame):
+            empty = np.empty(0)
+            return AnomalyScores(frame.sensor_ids, frame.timestamps, frame.values,
+                                 empty, None, np.zeros(0, dtype=bool))
+
+        rows = self._sensor_rows(frame.sensor_ids)
+        order = np.lexsort((frame.timestamps, rows))
+        rows = rows[order]
+        values = frame.values[order]
+
+        # Rank of each reading within its sensor; readings of equal rank are
+        # independent and are processed together
+        boundary = np.empty(len(rows), dtype=bool)
+        boundary[0] = True
+        boundary[1:] = rows[1:] != rows[:-1]
+        starts = np.flatnonzero(boundary)
+        counts = np.diff(np.append(starts, len(rows)))
+        rank = np.arange(len(rows)) - np.repeat(starts, counts)
+        by_rank = np.argsort(rank, kind='stable')
+        rank_edges = np.searchsorted(rank[by_rank], np.arange(counts.max() + 1))
+
+        zscores = np.empty(len(rows))
+        steps = np.empty(len(rows))
+        warm = np.empty(len(rows), dtype=bool)
+        for first, last in zip(rank_edges[:-1], rank_edges[1:]):
+            index = by_rank[first:last]
+            zscores[index], steps[index], warm[index] = self._step(rows[index], values[index])
+
+        anomalous = warm & (np.abs(zscores) > self.threshold)
+
+        forest_scores = None
+        if self.forest_enabled:
+            features = np.column_stack((zscores, steps))[warm]
+            if self.forest is not None and len(features):
+                forest_scores = np.full(len(rows), np.nan)
+                forest_scores[warm] = self.forest.decision_function(features)
+                anomalous |= warm & (forest_scores < 0)
+            self._update_forest(features)
+
+        return AnomalyScores(
+            sensor_ids=frame.sensor_ids[order],
+            timestamps=frame.timestamps[order],
+            values=values,
+            zscores=zscores,
+            forest_scores=forest_scores,
+            anomalous=anomalous
+        )
+
+    def _step(self, rows: np.ndarray, values: np.ndarray):
+        """Score one reading per sensor against its state, then fold it in"""
+        mean = self._mean[rows]
+        var = self._var[rows]
+        count = self._count[rows]
+        last = self._last[rows]
+
+        std = np.maximum(np.sqrt(var), RELATIVE_STD_FLOOR * np.abs(mean) + ABSOLUTE_STD_FLOOR)
+        warm = count >= self.warmup
+        zscores = np.where(warm, (values - mean) / std, 0.0)
+        steps = np.where(count > 0, (values - last) / std, 0.0)
+
+        # Warm-up uses the running average; afterwards outliers are clipped so a
+        # spike does not inflate the variance it is judged against
+        alpha = np.maximum(self.alpha, 1.0 / (count + 1))
+        variance_alpha = np.maximum(self.variance_alpha, 1.0 / (count + 1))
+        diff = values - mean
+        diff = np.where(warm, np.clip(diff, -self.threshold * std, self.threshold * std), diff)
+
+        self._mean[rows] = mean + alpha * diff
+        self._var[rows] = (1 - variance_alpha) * (var + variance_alpha * diff * diff)
+        self._count[rows] = count + 1
+        self._last[rows] = values
+        return zscores, steps, warm
+
+    def _update_forest(self, features: np.ndarray) -> None:
+        """Keep a reservoir sample of features and retrain the forest when due"""
+        if len(features):
+            size = self.forest_sample_size
+            position = self._sample_seen + np.arange(len(features))
+            slot = np.where(position < size, position, self._rng.integers(0, position + 1))
+            stored = slot < size
+
+            grow = min(size, self._sample_seen + len(features)) - len(self._sample)
+            if grow > 0:
+                self._sample = np.concatenate((self._sample, np.empty((grow, 2))))
+            self._sample[slot[stored]] = features[stored]
+            self._sample_seen += len(features)
+            self._since_training += len(features)
+
+        if self._since_training >= self.forest_retrain_readings:
+            self.train_forest()
+
+    def train_forest(self) -> None:
+        """Fit a new IsolationForest on the current feature sample"""
+        if not len(self._sample):
+            return
+        forest = IsolationForest(contamination=self.forest_contamination, random_state=self.seed)
+        forest.fit(self._sample)
+        self.forest = forest
+        self._since_training = 0
+
+    def save(self, path: str) -> None:
+        """Write the detector state (including a trained forest) atomically"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def load(path: str) -> 'AnomalyDetector':
+        """Read a detector written by save()"""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def _sensor_rows(self, sensor_ids: np.ndarray) -> np.ndarray:
+        """Row of each reading's sensor, growing the state arrays for new sensors"""
+        unique_ids, inverse = np.unique(sensor_ids.astype(str), return_inverse=True)
+        unique_rows = np.array([self._rows.setdefault(sensor_id, len(self._rows))
+                                for sensor_id in unique_ids.tolist()], dtype=np.int64)
+
+        if len(self._rows) > len(self._mean):
+            capacity = max(len(self._rows), 2 * len(self._mean), 64)
+            extra = capacity - len(self._mean)
+            self._mean = np.concatenate((self._mean, np.zeros(extra)))
+            self._var = np.concatenate((self._var, np.zeros(extra)))
+            self._last = np.concatenate((self._last, np.zeros(extra)))
+            self._count = np.concatenate((self._count, np.zeros(extra, dtype=np.int64)))
+
+        return unique_rows[inverse.ravel()]
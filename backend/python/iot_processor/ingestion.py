@@ -0,0 +1,360 @@
+"""
+Batched sensor reading ingestion
+
+Readings arrive from the MQTT gateway in batches, either as a list of
+{'sensor_id', 'timestamp', 'value', 'unit'} records or as the same fields
+in columns. Each batch is validated and converted to canonical units with
+vectorized NumPy/pandas operations, grouped per sensor and time window,
+and written as one bulk operation of bucket upserts. An optional
+aggregator (see iot_processor.aggregation) and anomaly detector (see
+iot_processor.anomaly) are fed the same validated batch. With a sensor map
+(see bim_processor.sensor_mapping) buckets and anomalies carry the GlobalIds
+of the model element, storey and space each sensor is placed in.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from pymongo import MongoClient, UpdateOne
+    PYMONGO_AVAILABLE = True
+except ImportError:
+    PYMONGO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('sensor_id', 'timestamp', 'value')
+DEFAULT_WINDOW_SECONDS = 60
+
+# Readings further in the future than this are rejected (clock skew allowance)
+DEFAULT_MAX_FUTURE_SECONDS = 300
+
+# Numeric timestamps above this are epoch milliseconds, below it epoch seconds
+EPOCH_MS_THRESHOLD = 1e11
+
+# Unit aliases -> (canonical unit, scale, offset): canonical = value * scale + offset
+UNIT_CONVERSIONS = {
+    '': ('', 1.0, 0.0),
+    # Temperature
+    'C': ('C', 1.0, 0.0), '°C': ('C', 1.0, 0.0), 'degC': ('C', 1.0, 0.0), 'celsius': ('C', 1.0, 0.0),
+    'F': ('C', 5 / 9, -32 * 5 / 9), '°F': ('C', 5 / 9, -32 * 5 / 9), 'degF': ('C', 5 / 9, -32 * 5 / 9),
+    'K': ('C', 1.0, -273.15),
+    # Power
+    'W': ('W', 1.0, 0.0), 'kW': ('W', 1e3, 0.0), 'MW': ('W', 1e6, 0.0),
+    # Energy
+    'kWh': ('kWh', 1.0, 0.0), 'Wh': ('kWh', 1e-3, 0.0), 'MWh': ('kWh', 1e3, 0.0), 'J': ('kWh', 1 / 3.6e6, 0.0),
+    # Pressure
+    'Pa': ('Pa', 1.0, 0.0), 'hPa': ('Pa', 1e2, 0.0), 'kPa': ('Pa', 1e3, 0.0), 'bar': ('Pa', 1e5, 0.0),
+    # Ratios
+    '%': ('%', 1.0, 0.0), 'ratio': ('%', 100.0, 0.0),
+}
+
+
+@dataclass
+class ReadingFrame:
+    """Validated readings of one batch as parallel arrays, in canonical units"""
+    sensor_ids: np.ndarray  # object array of str
+    timestamps: np.ndarray  # int64 epoch milliseconds
+    values: np.ndarray  # float64
+    units: np.ndarray  # object array of canonical unit strings
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+@dataclass
+class IngestionResult:
+    """Counts of one ingested batch"""
+    received: int = 0
+    accepted: int = 0
+    buckets: int = 0
+    sensors: int = 0
+    rejected: Dict[str, int] = field(default_factory=dict)
+    anomalies: List[Dict[str, Any]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary suitable for task results"""
+        return {
+            'received': self.received,
+            'accepted': self.accepted,
+            'rejected': sum(self.rejected.values()),
+            'rejections': self.rejected,
+            'buckets': self.buckets,
+            'sensors': self.sensors,
+            'anomalies': self.anomalies,
+            'seconds': round(self.seconds, 4)
+        }
+
+
+class MongoSensorStore:
+    """
+    Sensor readings stored as one MongoDB document per sensor and time window
+
+    Each bucket document holds the window's readings as parallel
+    'timestamps'/'values' arrays plus running count, sum, min and max.
+    A batch is written with a single unordered bulk_write of upserts, so
+    readings for a window that spans several batches are appended to the
+    same document. Element, storey and space ids, when mapped, are set on every
+    write so they follow sensors that are moved or remapped. Flagged
+    anomalies go to a separate collection.
+    """
+
+    def __init__(self, collection, anomaly_collection=None):
+        self.collection = collection
+        self.anomaly_collection = anomaly_collection
+
+    @classmethod
+    def from_uri(cls, uri: str, database: str, collection: str,
+                 anomaly_collection: Optional[str] = None) -> 'MongoSensorStore':
+        if not PYMONGO_AVAILABLE:
+            raise ImportError("pymongo is not available. Please install pymongo to store sensor readings.")
+        client = MongoClient(uri)
+        store = cls(client[database][collection],
+                    client[database][anomaly_collection] if anomaly_collection else None)
+        store.collection.create_index([('sensor_id', 1), ('window_start', 1)])
+        if store.anomaly_collection is not None:
+            store.anomaly_collection.create_index([('sensor_id', 1), ('timestamp', 1)])
+        return store
+
+    def write_buckets(self, buckets: List[Dict[str, Any]]) -> int:
+        """Upsert buckets in one bulk operation; returns the number of operations"""
+        operations = [
+            UpdateOne(
+                {'_id': f"{bucket['sensor_id']}:{bucket['window_start']}"},
+                {
+                    **({'$set': {'element_id': bucket['element_id'], 'storey_id': bucket['storey_id'],
+                                 'space_id': bucket['space_id']}}
+                       if 'element_id' in bucket else {}),
+                    '$setOnInsert': {
+                        'sensor_id': bucket['sensor_id'],
+                        'window_start': bucket['window_start'],
+                        'window_seconds': bucket['window_seconds'],
+                        'unit': bucket['unit']
+                    },
+                    '$inc': {'count': bucket['count'], 'sum': bucket['sum']},
+                    '$min': {'min': bucket['min']},
+                    '$max': {'max': bucket['max']},
+                    '$push': {
+                        'timestamps': {'$each': bucket['timestamps'].tolist()},
+                        'values': {'$each': bucket['values'].tolist()}
+                    }
+                },
+                upsert=True
+            )
+            for bucket in buckets
+        ]
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def write_anomalies(self, anomalies: List[Dict[str, Any]]) -> int:
+        """Insert flagged readings; returns the number written"""
+        if self.anomaly_collection is None or not anomalies:
+            return 0
+        # insert_many adds '_id' to the documents it is given
+        self.anomaly_collection.insert_many([dict(anomaly) for anomaly in anomalies], ordered=False)
+        return len(anomalies)
+
+
+class SensorBatchIngestor:
+    """Validates, converts, groups and stores batches of sensor readings"""
+
+    def __init__(self, store: Optional[MongoSensorStore] = None,
+                 window_seconds: int = DEFAULT_WINDOW_SECONDS,
+                 max_future_seconds: float = DEFAULT_MAX_FUTURE_SECONDS,
+                 aggregator=None, detector=None, sensor_map=None):
+        """
+        Args:
+            store: Bucket store, None to validate and group without storing
+            window_seconds: Width of the per-sensor time windows readings are grouped into
+            max_future_seconds: Readings timestamped further ahead are rejected
+            aggregator: Optional SensorAggregator updated with every accepted batch
+            detector: Optional AnomalyDetector scoring every accepted batch
+            sensor_map: Optional SensorElementMap adding element, storey
+                and space ids to buckets and anomalies
+        """
+        self.store = store
+        self.window_seconds = int(window_seconds)
+        self.max_future_seconds = max_future_seconds
+        self.aggregator = aggregator
+        self.detector = detector
+        self.sensor_map = sensor_map
+
+    def ingest(self, readings) -> IngestionResult:
+        """
+        Ingest one batch of readings
+
+        Args:
+            readings: List of reading dicts, or a dict of equally long columns
+
+        Returns:
+            IngestionResult with accepted/rejected counts
+        """
+        start = time.perf_counter()
+        frame, rejected = self.prepare(readings)
+        buckets = self.group(frame)
+
+        if self.store is not None and buckets:
+            self.store.write_buckets(buckets)
+
+        if self.aggregator is not None:
+            self.aggregator.update(frame)
+
+        anomalies = []
+        if self.detector is not None:
+            anomalies = self.detector.score(frame).anomalies()
+            if self.sensor_map is not None and anomalies:
+                element_ids, storey_ids, space_ids = self.sensor_map.lookup(
+                    np.array([anomaly['sensor_id'] for anomaly in anomalies], dtype=object)
+                )
+                for anomaly, element_id, storey_id, space_id in zip(anomalies, element_ids, storey_ids, space_ids):
+                    anomaly['element_id'] = element_id
+                    anomaly['storey_id'] = storey_id
+                    anomaly['space_id'] = space_id
+            if self.store is not None and anomalies:
+                self.store.write_anomalies(anomalies)
+
+        return IngestionResult(
+            received=len(frame) + sum(rejected.values()),
+            accepted=len(frame),
+            buckets=len(buckets),
+            sensors=len(set(bucket['sensor_id'] for bucket in buckets)),
+            rejected=rejected,
+            anomalies=anomalies,
+            seconds=time.perf_counter() - start
+        )
+
+    def prepare(self, readings) -> Tuple[ReadingFrame, Dict[str, int]]:
+        """Validate readings and convert them to canonical units"""
+        table = pd.DataFrame(readings)
+        if table.empty:
+            return _empty_frame(), {}
+
+        missing = [name for name in REQUIRED_FIELDS if name not in table.columns]
+        if missing:
+            raise ValueError(f"Sensor readings are missing fields: {', '.join(missing)}")
+
+        sensor_ids = table['sensor_id']
+        has_sensor = sensor_ids.notna().to_numpy() & (sensor_ids.astype(str).str.len() > 0).to_numpy()
+        values = pd.to_numeric(table['value'], errors='coerce').to_numpy(dtype=np.float64)
+        has_value = np.isfinite(values)
+        timestamps, has_timestamp = _parse_timestamps(table['timestamp'])
+        not_future = timestamps <= (time.time() + self.max_future_seconds) * 1000
+
+        units = table['unit'] if 'unit' in table.columns else pd.Series('', index=table.index)
+        values, canonical_units = _convert_units(values, units.fillna('').astype(str))
+
+        # Each rejected reading is counted once, under the first failing check
+        rejected = {}
+        valid = np.ones(len(table), dtype=bool)
+        for reason, check in (('missing_sensor_id', has_sensor), ('invalid_value', has_value),
+                              ('invalid_timestamp', has_timestamp), ('future_timestamp', not_future)):
+            failed = int(np.count_nonzero(valid & ~check))
+            if failed:
+                rejected[reason] = failed
+            valid &= check
+
+        frame = ReadingFrame(
+            sensor_ids=sensor_ids.to_numpy(dtype=object)[valid].astype(str).astype(object),
+            timestamps=timestamps[valid],
+            values=values[valid],
+            units=canonical_units[valid]
+        )
+        return frame, rejected
+
+    def group(self, frame: ReadingFrame) -> List[Dict[str, Any]]:
+        """Group readings per sensor and time window into bucket dicts"""
+        if not len(frame):
+            return []
+
+        window_ms = self.window_seconds * 1000
+        sensor_codes, sensors = pd.factorize(frame.sensor_ids)
+        windows = frame.timestamps // window_ms
+
+        order = np.lexsort((frame.timestamps, windows, sensor_codes))
+        sensor_codes = sensor_codes[order]
+        windows = windows[order]
+        timestamps = frame.timestamps[order]
+        values = frame.values[order]
+        units = frame.units[order]
+
+        boundary = np.empty(len(order), dtype=bool)
+        boundary[0] = True
+        boundary[1:] = (sensor_codes[1:] != sensor_codes[:-1]) | (windows[1:] != windows[:-1])
+        starts = np.flatnonzero(boundary)
+        ends = np.append(starts[1:], len(order))
+
+        counts = ends - starts
+        sums = np.add.reduceat(values, starts)
+        minimums = np.minimum.reduceat(values, starts)
+        maximums = np.maximum.reduceat(values, starts)
+
+        buckets = [
+            {
+                'sensor_id': sensors[sensor_codes[first]],
+                'window_start': int(windows[first] * self.window_seconds),
+                'window_seconds': self.window_seconds,
+                'unit': units[first],
+                'count': int(count),
+                'sum': float(total),
+                'min': float(minimum),
+                'max': float(maximum),
+                'timestamps': timestamps[first:last],
+                'values': values[first:last]
+            }
+            for first, last, count, total, minimum, maximum
+            in zip(starts, ends, counts, sums, minimums, maximums)
+        ]
+
+        if self.sensor_map is not None:
+            # One lookup per distinct sensor, spread to its buckets by sensor code
+            element_ids, storey_ids, space_ids = self.sensor_map.lookup(np.asarray(sensors, dtype=object))
+            for bucket, code in zip(buckets, sensor_codes[starts]):
+                bucket['element_id'] = element_ids[code]
+                bucket['storey_id'] = storey_ids[code]
+                bucket['space_id'] = space_ids[code]
+
+        return buckets
+
+
+def _empty_frame() -> ReadingFrame:
+    return ReadingFrame(
+        sensor_ids=np.empty(0, dtype=object),
+        timestamps=np.empty(0, dtype=np.int64),
+        values=np.empty(0, dtype=np.float64),
+        units=np.empty(0, dtype=object)
+    )
+
+
+def _parse_timestamps(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Epoch milliseconds from epoch seconds/milliseconds or ISO 8601 strings, plus a validity mask"""
+    numeric = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64)
+    milliseconds = np.where(numeric >= EPOCH_MS_THRESHOLD, numeric, numeric * 1000)
+
+    text = np.isnan(numeric) & column.notna().to_numpy()
+    if text.any():
+        parsed = pd.to_datetime(column[text].astype(str), utc=True, errors='coerce', format='ISO8601')
+        since_epoch = (parsed - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(milliseconds=1)
+        milliseconds[text] = since_epoch.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    valid = np.isfinite(milliseconds)
+    return np.where(valid, milliseconds, 0).astype(np.int64), valid
+
+
+def _convert_units(values: np.ndarray, units: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert values to canonical units; unknown units are kept unchanged"""
+    codes, unique_units = pd.factorize(units)
+    conversions = [UNIT_CONVERSIONS.get(unit, (unit, 1.0, 0.0)) for unit in unique_units]
+    if not conversions:
+        return values, np.empty(0, dtype=object)
+
+    canonical = np.array([conversion[0] for conversion in conversions], dtype=object)
+    scale = np.array([conversion[1] for conversion in conversions])
+    offset = np.array([conversion[2] for conversion in conversions])
+    return values * scale[codes] + offset[codes], canonical[codes]
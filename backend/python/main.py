@@ -0,0 +1,220 @@
+"""
+Query service for processed BIM models
+
+Serves element, property and geometry queries from the memory-mapped model
+stores that BIM processing writes to BIM_MODEL_STORE_DIR (see
+bim_processor.model_store). A store is mapped on first use and kept open
+until its file is replaced, so requests read straight from the map without
+loading or parsing the model. Endpoints that read stores are plain
+functions, which FastAPI runs in its threadpool so file access never
+blocks the event loop. Run several worker processes
+(uvicorn main:app --workers N) to use more cores: they map the same files
+and share the pages through the operating system's page cache.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+
+from bim_processor.model_store import STORE_SUFFIX, ModelStore
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BIM_MODEL_STORE_DIR = os.getenv('BIM_MODEL_STORE_DIR', 'model_store')
+MAX_PAGE_SIZE = 10_000
+# Mesh responses are sent in pieces of this size, sliced from the store's map
+MESH_CHUNK_BYTES = 1 << 20
+
+app = FastAPI(title='Digital Twin Python Services')
+
+# Open stores by model id with the modification time of the mapped file
+_stores: Dict[str, Tuple[int, ModelStore]] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(model_id: str) -> ModelStore:
+    """Mapped store of a model, reopened when its file has been replaced"""
+    if os.path.basename(model_id) != model_id or model_id in ('', '.', '..'):
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_id}")
+    path = os.path.join(BIM_MODEL_STORE_DIR, f"{model_id}{STORE_SUFFIX}")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_id}")
+
+    with _stores_lock:
+        cached = _stores.get(model_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            store = ModelStore.open(path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error opening model store {path}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Model store unreadable: {model_id}")
+        # Requests still reading the replaced store keep their views; the
+        # old map is released with the last of them
+        _stores[model_id] = (mtime, store)
+        return store
+
+
+def get_row(store: ModelStore, element_id: str) -> int:
+    """Row of an element given by step id or GlobalId"""
+    row = store.row(element_id)
+    if row is None:
+        row = store.row_by_global_id(element_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Element not found: {element_id}")
+    return row
+
+
+def parse_box(bbox: Optional[str]) -> Tuple[Optional[List[float]], Optional[List[float]]]:
+    """'minx,miny,minz,maxx,maxy,maxz' as (box_min, box_max)"""
+    if bbox is None:
+        return None, None
+    try:
+        values = [float(value) for value in bbox.split(',')]
+    except ValueError:
+        values = []
+    if len(values) != 6:
+        raise HTTPException(status_code=400, detail="bbox must be six comma-separated numbers")
+    return values[:3], values[3:]
+
+
+def iter_buffers(*arrays) -> Iterator[bytes]:
+    """Contents of arrays in MESH_CHUNK_BYTES pieces, without joining them first"""
+    for array in arrays:
+        view = memoryview(array).cast('B')
+        for start in range(0, len(view), MESH_CHUNK_BYTES):
+            yield bytes(view[start:start + MESH_CHUNK_BYTES])
+
+
+def mesh_response(store: ModelStore, mesh: int, transform: Optional[List[float]] = None) -> Response:
+    """Vertices followed by faces, raw little-endian, with their layout in headers"""
+    vertices, faces, _ = store.mesh(mesh)
+    headers = {
+        'Content-Length': str(vertices.nbytes + faces.nbytes),
+        'X-Mesh': str(mesh),
+        'X-Vertex-Count': str(len(vertices)),
+        'X-Vertex-Dtype': vertices.dtype.str,
+        'X-Face-Count': str(len(faces)),
+        'X-Face-Dtype': faces.dtype.str
+    }
+    if transform is not None:
+        headers['X-Transform'] = ','.join(repr(value) for value in transform)
+    return StreamingResponse(iter_buffers(vertices, faces), media_type='application/octet-stream',
+                             headers=headers)
+
+
+@app.get('/health')
+async def health():
+    return {'status': 'ok'}
+
+
+if PROMETHEUS_AVAILABLE:
+    @app.get('/metrics')
+    async def metrics():
+        registry = REGISTRY
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            # Aggregate every worker process
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get('/models')
+def list_models():
+    try:
+        names = sorted(os.listdir(BIM_MODEL_STORE_DIR))
+    except FileNotFoundError:
+        names = []
+    return {'models': [name[:-len(STORE_SUFFIX)] for name in names if name.endswith(STORE_SUFFIX)]}
+
+
+@app.get('/models/{model_id}')
+def get_model(model_id: str):
+    store = get_store(model_id)
+    return {
+        **store.header,
+        'elements': len(store),
+        'meshes': store.mesh_count,
+        'types': store.type_counts(),
+        'storeys': store.storeys,
+        'spaces': store.spaces
+    }
+
+
+@app.get('/models/{model_id}/structure')
+def get_structure(model_id: str):
+    """Site -> building -> storey -> space tree with the elements each node contains"""
+    store = get_store(model_id)
+    if store.spatial_structure is None:
+        raise HTTPException(status_code=404, detail=f"Model has no spatial structure: {model_id}")
+    return store.spatial_structure
+
+
+@app.get('/models/{model_id}/elements')
+def list_elements(model_id: str,
+                  types: Optional[List[str]] = Query(None, alias='type'),
+                  storeys: Optional[List[str]] = Query(None, alias='storey'),
+                  spaces: Optional[List[str]] = Query(None, alias='space'),
+                  bbox: Optional[str] = None,
+                  offset: int = Query(0, ge=0),
+                  limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE)):
+    """Elements matching every given filter (IFC types, storey and space GlobalIds, intersecting box)"""
+    store = get_store(model_id)
+    box_min, box_max = parse_box(bbox)
+    rows = store.select(types=types, storeys=storeys, spaces=spaces, box_min=box_min, box_max=box_max)
+    page = rows[offset:offset + limit].tolist()
+    return {
+        'total': len(rows),
+        'offset': offset,
+        'elements': [store.element(row) for row in page]
+    }
+
+
+@app.get('/models/{model_id}/elements/{element_id}')
+def get_element(model_id: str, element_id: str):
+    store = get_store(model_id)
+    return store.element(get_row(store, element_id))
+
+
+@app.get('/models/{model_id}/elements/{element_id}/properties')
+def get_element_properties(model_id: str, element_id: str):
+    store = get_store(model_id)
+    # Stored as a JSON object; returned as is
+    return Response(content=bytes(store.property_bytes(get_row(store, element_id))),
+                    media_type='application/json')
+
+
+@app.get('/models/{model_id}/elements/{element_id}/geometry')
+def get_element_geometry(model_id: str, element_id: str):
+    """The element's mesh in local coordinates, with its transform if it is instanced"""
+    store = get_store(model_id)
+    row = get_row(store, element_id)
+    mesh = int(store.element_mesh[row])
+    if mesh < 0:
+        raise HTTPException(status_code=404, detail=f"Element has no geometry: {element_id}")
+    return mesh_response(store, mesh, store.transform(row))
+
+
+@app.get('/models/{model_id}/meshes/{mesh}')
+def get_mesh(model_id: str, mesh: int):
+    """A stored mesh, shared by every element listing it"""
+    store = get_store(model_id)
+    if not 0 <= mesh < store.mesh_count:
+        raise HTTPException(status_code=404, detail=f"Mesh not found: {mesh}")
+    return mesh_response(store, mesh)
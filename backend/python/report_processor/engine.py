@@ -0,0 +1,401 @@
+"""
+Report generation over columnar sensor data
+
+A report covers [start, end) split into time buckets (hour, day or week).
+For each bucket the report type computes a partial aggregate per sensor
+from the source's rolled-up windows. Partials of completed buckets are
+cached per (report type, partial parameters, bucket), so a recurring daily
+or weekly report only computes the buckets that are new since its last
+run. Each bucket's rows are written to the output as soon as they are
+computed and only a per-group summary is kept in memory.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from bim_processor.export import open_text_output
+from iot_processor.ingestion import EPOCH_MS_THRESHOLD
+from report_processor.sources import bucket_starts
+
+# Bump when a report's partial layout changes to invalidate cached partials
+PARTIAL_FORMAT_VERSION = 1
+
+BUCKET_SECONDS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400}
+
+# Weeks start on Monday; the epoch was a Thursday
+BUCKET_ORIGINS = {'hour': 0, 'day': 0, 'week': 4 * 86400}
+
+DEFAULT_BUCKET = 'day'
+DEFAULT_RANGE_DAYS = 7
+
+# Buckets ending less than this long ago may still receive late readings and are not cached
+DEFAULT_SETTLE_SECONDS = 3600
+
+# Consecutive uncached buckets fetched from the source in one query
+FETCH_BUCKETS = 32
+
+# Output rows buffered before they are folded into the summary
+SUMMARY_BATCH_ROWS = 250_000
+
+
+class Report:
+    """A report type: per-bucket partials, output rows and a summary"""
+
+    name = ''
+    # Parameters that change the partials and therefore key the cache
+    partial_parameters: tuple = ()
+    # Column the summary is grouped by, and how each summary column is reduced
+    summary_key = ''
+    summary_aggregations: Dict[str, str] = {}
+
+    def partial(self, windows: pd.DataFrame, anomalies: pd.DataFrame, bucket_seconds: int) -> pd.DataFrame:
+        """Per-sensor aggregate of one bucket"""
+        raise NotImplementedError
+
+    def rows(self, partial: pd.DataFrame, parameters: Dict[str, Any]) -> pd.DataFrame:
+        """Output rows of one bucket"""
+        raise NotImplementedError
+
+    def finish_summary(self, summary: pd.DataFrame, buckets: int, bucket_seconds: int,
+                       parameters: Dict[str, Any]) -> pd.DataFrame:
+        """Derived columns of the reduced summary"""
+        return summary
+
+
+def _grouped(partial: pd.DataFrame, mapping: Optional[Dict[str, str]], key: str,
+             aggregations: Dict[str, str]) -> pd.DataFrame:
+    """
+    Partial rows reduced per group of a {sensor_id: group} mapping
+
+    Unmapped sensors are their own group; without a mapping the rows are
+    only renamed and sorted.
+    """
+    if not mapping:
+        return partial.rename(columns={'sensor_id': key}).sort_values(key, ignore_index=True)
+    groups = partial['sensor_id'].map(mapping).fillna(partial['sensor_id'])
+    return partial.assign(sensor_id=groups).rename(columns={'sensor_id': key}).groupby(
+        key, sort=True
+    ).agg(aggregations).reset_index()
+
+
+class EnergyReport(Report):
+    """Consumption, peak demand and cost per sensor group"""
+
+    name = 'energy'
+    summary_key = 'group'
+    summary_aggregations = {'energy_kwh': 'sum', 'peak_kw': 'max', 'cost': 'sum'}
+
+    def partial(self, windows, anomalies, bucket_seconds):
+        power = windows['unit'] == 'W'
+        energy = windows['unit'] == 'kWh'
+        windows = windows[power | energy]
+        power = power[windows.index]
+
+        # Power sensors: mean power over the covered time; energy sensors report interval consumption
+        mean_kw = windows['sum'] / windows['count'] / 1000
+        return pd.DataFrame({
+            'sensor_id': windows['sensor_id'],
+            'energy_kwh': np.where(power, mean_kw * windows['seconds'] / 3600, windows['sum']),
+            'peak_kw': np.where(power, windows['max'] / 1000, np.nan)
+        }).reset_index(drop=True)
+
+    def rows(self, partial, parameters):
+        tariff = float(parameters.get('tariff_per_kwh', 0.0))
+        # Sum of the sensors' peaks: an upper bound of the group's coincident peak
+        rows = _grouped(partial.assign(power_sensors=partial['peak_kw'].notna()), parameters.get('groups'),
+                        'group', {'energy_kwh': 'sum', 'peak_kw': 'sum', 'power_sensors': 'sum'})
+        return rows.assign(
+            peak_kw=rows['peak_kw'].where(rows.pop('power_sensors') > 0),
+            cost=rows['energy_kwh'] * tariff
+        )
+
+
+class MaintenanceReport(Report):
+    """Data coverage and flagged anomalies per sensor"""
+
+    name = 'maintenance'
+    summary_key = 'sensor_id'
+    summary_aggregations = {'readings': 'sum', 'anomalies': 'sum', 'covered_seconds': 'sum',
+                            'min': 'min', 'max': 'max', 'bucket_start': 'max'}
+
+    def partial(self, windows, anomalies, bucket_seconds):
+        flagged = anomalies.set_index('sensor_id')['anomalies']
+        return pd.DataFrame({
+            'sensor_id': windows['sensor_id'],
+            'readings': windows['count'],
+            'covered_seconds': windows['seconds'],
+            'anomalies': windows['sensor_id'].map(flagged).fillna(0),
+            'min': windows['min'],
+            'max': windows['max']
+        }).reset_index(drop=True)
+
+    def rows(self, partial, parameters):
+        return partial.assign(availability=np.minimum(
+            partial['covered_seconds'] / parameters['bucket_seconds'], 1.0
+        )).sort_values('sensor_id', ignore_index=True)
+
+    def finish_summary(self, summary, buckets, bucket_seconds, parameters):
+        summary = summary.rename(columns={'bucket_start': 'last_bucket'}).assign(
+            availability=np.minimum(summary['covered_seconds'] / (buckets * bucket_seconds), 1.0),
+            anomaly_rate=summary['anomalies'] / summary['readings'].where(summary['readings'] > 0)
+        )
+        # Sensors needing attention first
+        return summary.sort_values(['anomalies', 'availability'], ascending=[False, True])
+
+
+class AssetReport(Report):
+    """Operating hours, availability and value range per asset"""
+
+    name = 'asset'
+    partial_parameters = ('active_threshold',)
+    summary_key = 'asset_id'
+    summary_aggregations = {'operating_hours': 'sum', 'covered_seconds': 'sum',
+                            'readings': 'sum', 'sum': 'sum', 'min': 'min', 'max': 'max'}
+
+    def partial(self, windows, anomalies, bucket_seconds):
+        # Windows whose mean exceeds active_threshold count as operating time
+        active_share = (windows['active_windows'] / windows['windows']).fillna(0)
+        return pd.DataFrame({
+            'sensor_id': windows['sensor_id'],
+            'operating_hours': active_share * windows['seconds'] / 3600,
+            'covered_seconds': windows['seconds'],
+            'readings': windows['count'],
+            'sum': windows['sum'],
+            'min': windows['min'],
+            'max': windows['max']
+        }).reset_index(drop=True)
+
+    def rows(self, partial, parameters):
+        rows = _grouped(partial, parameters.get('assets'), 'asset_id', self.summary_aggregations)
+        return rows.assign(mean=rows['sum'] / rows['readings'])
+
+    def finish_summary(self, summary, buckets, bucket_seconds, parameters):
+        return summary.assign(
+            mean=summary['sum'] / summary['readings'],
+            availability=np.minimum(summary['covered_seconds'] / (buckets * bucket_seconds), 1.0)
+        ).sort_values('operating_hours', ascending=False)
+
+
+REPORTS = {report.name: report for report in (EnergyReport(), MaintenanceReport(), AssetReport())}
+REPORT_TYPES = tuple(REPORTS)
+
+
+class ReportEngine:
+    """Generates reports from a reading source, caching per-bucket partials"""
+
+    def __init__(self, source, cache=None, namespace: str = '',
+                 settle_seconds: float = DEFAULT_SETTLE_SECONDS):
+        """
+        Args:
+            source: FrameReadingSource, MongoReadingSource or compatible
+            cache: Optional ProcessedModelCache holding partials
+            namespace: Identifies the source's data in cache keys
+            settle_seconds: Buckets ending less than this long ago are not cached
+        """
+        self.source = source
+        self.cache = cache
+        self.namespace = namespace
+        self.settle_seconds = settle_seconds
+
+    def generate(self, report_type: str, parameters: Optional[Dict[str, Any]], output_path: str,
+                 compression: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate a report as NDJSON
+
+        The output holds a 'report' header record, one 'row' record per output
+        row in bucket order (unless 'detail' is False) and one 'summary'
+        record per summary group.
+
+        Args:
+            report_type: One of REPORT_TYPES
+            parameters: 'start'/'end' (epoch seconds or ISO 8601; default the
+                last DEFAULT_RANGE_DAYS days), 'bucket' ('hour', 'day' or
+                'week'), 'sensor_ids', 'detail' (False writes the summary
+                only), plus report specific parameters ('groups',
+                'tariff_per_kwh', 'assets', 'active_threshold')
+            output_path: Destination file path
+            compression: None, 'gzip' or 'zstd'
+
+        Returns:
+            Statistics of the run and the path written
+        """
+        if report_type not in REPORTS:
+            raise ValueError(f"Unsupported report type: {report_type}. Expected one of {REPORT_TYPES}")
+
+        started = time.perf_counter()
+        report = REPORTS[report_type]
+        parameters = self._normalize(parameters or {})
+        buckets = self._buckets(parameters)
+
+        detail = parameters.get('detail', True)
+        summary = None
+        pending: List[pd.DataFrame] = []
+        pending_rows = 0
+        rows_written = 0
+        cached = 0
+        with open_text_output(output_path, compression) as stream:
+            header = {'record': 'report', 'report_type': report_type,
+                      **{key: value for key, value in parameters.items() if key != 'bucket_seconds'}}
+            stream.write(json.dumps(header, default=str) + '\n')
+
+            for bucket_start, partial, from_cache in self._partials(report, parameters, buckets):
+                cached += from_cache
+                rows = report.rows(partial, parameters)
+                if rows.empty:
+                    continue
+
+                rows.insert(0, 'bucket_start', bucket_start)
+                if detail:
+                    _write_records(stream, rows.assign(record='row'))
+                    rows_written += len(rows)
+
+                pending.append(rows)
+                pending_rows += len(rows)
+                if pending_rows >= SUMMARY_BATCH_ROWS:
+                    summary = self._reduce(report, summary, pending)
+                    pending, pending_rows = [], 0
+
+            if pending:
+                summary = self._reduce(report, summary, pending)
+
+            if summary is not None:
+                summary = report.finish_summary(summary, len(buckets), parameters['bucket_seconds'], parameters)
+                _write_records(stream, summary.reset_index().assign(record='summary'))
+
+        return {
+            'report_type': report_type,
+            'output_path': output_path,
+            'start': parameters['start'],
+            'end': parameters['end'],
+            'bucket': parameters['bucket'],
+            'buckets': len(buckets),
+            'cached_buckets': cached,
+            'computed_buckets': len(buckets) - cached,
+            'rows': rows_written,
+            'summary_rows': 0 if summary is None else len(summary),
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+    @staticmethod
+    def _reduce(report: Report, summary: Optional[pd.DataFrame], rows: List[pd.DataFrame]) -> pd.DataFrame:
+        """Fold buffered output rows into the running summary"""
+        frames = rows if summary is None else [summary.reset_index(), *rows]
+        return pd.concat(frames, ignore_index=True).groupby(report.summary_key).agg(report.summary_aggregations)
+
+    def _normalize(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Resolve the range and bucket width; start/end are aligned to bucket boundaries"""
+        bucket = parameters.get('bucket', DEFAULT_BUCKET)
+        if bucket not in BUCKET_SECONDS:
+            raise ValueError(f"Unsupported report bucket: {bucket}. Expected one of {tuple(BUCKET_SECONDS)}")
+        bucket_seconds = BUCKET_SECONDS[bucket]
+        origin = BUCKET_ORIGINS[bucket]
+
+        end = _epoch_seconds(parameters['end']) if parameters.get('end') is not None else int(time.time())
+        start = _epoch_seconds(parameters['start']) if parameters.get('start') is not None \
+            else end - DEFAULT_RANGE_DAYS * 86400
+        if start >= end:
+            raise ValueError("Report start must be before its end")
+
+        # Extend the range to whole buckets
+        start = int(bucket_starts(np.array([start]), bucket_seconds, origin)[0])
+        last = int(bucket_starts(np.array([end - 1]), bucket_seconds, origin)[0])
+        normalized = {**parameters, 'start': start, 'end': last + bucket_seconds,
+                      'bucket': bucket, 'bucket_seconds': bucket_seconds}
+        if parameters.get('sensor_ids') is not None:
+            normalized['sensor_ids'] = sorted(set(parameters['sensor_ids']))
+        return normalized
+
+    def _buckets(self, parameters: Dict[str, Any]) -> List[int]:
+        return list(range(parameters['start'], parameters['end'], parameters['bucket_seconds']))
+
+    def _partials(self, report: Report, parameters: Dict[str, Any], buckets: List[int]):
+        """Yield (bucket_start, partial, from_cache) in bucket order"""
+        pending: Dict[int, Any] = {}
+        for index, bucket_start in enumerate(buckets):
+            if bucket_start in pending:
+                yield (bucket_start, *pending.pop(bucket_start))
+                continue
+
+            partial = self._cached(report, parameters, bucket_start)
+            if partial is not None:
+                yield bucket_start, partial, True
+                continue
+
+            # Fetch this and the following uncached buckets in one source query
+            span = [bucket_start]
+            for following in buckets[index + 1:index + FETCH_BUCKETS]:
+                partial = self._cached(report, parameters, following)
+                if partial is not None:
+                    pending[following] = (partial, True)
+                    break
+                span.append(following)
+
+            computed = self._compute(report, parameters, span)
+            for following in span[1:]:
+                pending[following] = (computed[following], False)
+            yield bucket_start, computed[bucket_start], False
+
+    def _compute(self, report: Report, parameters: Dict[str, Any], span: List[int]) -> Dict[int, pd.DataFrame]:
+        """Partials of consecutive buckets from one source query, cached when complete"""
+        bucket_seconds = parameters['bucket_seconds']
+        origin = BUCKET_ORIGINS[parameters['bucket']]
+        start, end = span[0], span[-1] + bucket_seconds
+        sensor_ids = parameters.get('sensor_ids')
+
+        windows = self.source.window_aggregates(start, end, bucket_seconds, origin, sensor_ids,
+                                                parameters.get('active_threshold'))
+        anomalies = self.source.anomaly_counts(start, end, bucket_seconds, origin, sensor_ids)
+        windows_by_bucket = dict(tuple(windows.groupby('bucket_start', sort=False)))
+        anomalies_by_bucket = dict(tuple(anomalies.groupby('bucket_start', sort=False)))
+
+        computed = {}
+        settled = time.time() - self.settle_seconds
+        for bucket_start in span:
+            partial = report.partial(
+                windows_by_bucket.get(bucket_start, windows.iloc[:0]),
+                anomalies_by_bucket.get(bucket_start, anomalies.iloc[:0]),
+                bucket_seconds
+            )
+            computed[bucket_start] = partial
+            if self.cache is not None and bucket_start + bucket_seconds <= settled:
+                self.cache.put(self._key(report, parameters, bucket_start), partial)
+        return computed
+
+    def _cached(self, report: Report, parameters: Dict[str, Any], bucket_start: int) -> Optional[pd.DataFrame]:
+        if self.cache is None:
+            return None
+        return self.cache.get(self._key(report, parameters, bucket_start))
+
+    def _key(self, report: Report, parameters: Dict[str, Any], bucket_start: int) -> str:
+        """Cache key of one bucket's partial"""
+        fingerprint = json.dumps({
+            'format': PARTIAL_FORMAT_VERSION,
+            'namespace': self.namespace,
+            'report_type': report.name,
+            'parameters': {name: parameters.get(name) for name in ('sensor_ids', *report.partial_parameters)},
+            'bucket': parameters['bucket'],
+            'bucket_start': bucket_start
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+
+def _write_records(stream, frame: pd.DataFrame) -> None:
+    """Rows of frame as NDJSON lines (pandas >= 1.5 already ends the output with a newline)"""
+    lines = frame.to_json(orient='records', lines=True).rstrip('\n')
+    if lines:
+        stream.write(lines + '\n')
+
+
+def _epoch_seconds(value) -> int:
+    """Epoch seconds from epoch seconds/milliseconds or an ISO 8601 string (UTC unless zoned)"""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value / 1000) if value >= EPOCH_MS_THRESHOLD else int(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return int(timestamp.timestamp())
@@ -0,0 +1,174 @@
+"""
+Columnar sources of sensor data for reports
+
+A source returns sensor windows already rolled up per (sensor, report
+bucket) as a pandas DataFrame with the columns of WINDOW_COLUMNS, plus
+anomaly counts per (sensor, report bucket). MongoReadingSource pushes the
+rollup into a MongoDB aggregation pipeline over the ingestion bucket
+documents, so only one row per sensor and report bucket leaves the
+database; FrameReadingSource rolls up windows held in a DataFrame.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+WINDOW_COLUMNS = ['sensor_id', 'bucket_start', 'unit', 'windows', 'seconds',
+                  'count', 'sum', 'min', 'max', 'active_windows']
+ANOMALY_COLUMNS = ['sensor_id', 'bucket_start', 'anomalies']
+
+
+def empty_windows() -> pd.DataFrame:
+    return pd.DataFrame({name: pd.Series(dtype=object if name in ('sensor_id', 'unit') else np.float64)
+                         for name in WINDOW_COLUMNS})
+
+
+def empty_anomalies() -> pd.DataFrame:
+    return pd.DataFrame({'sensor_id': pd.Series(dtype=object),
+                         'bucket_start': pd.Series(dtype=np.int64),
+                         'anomalies': pd.Series(dtype=np.int64)})
+
+
+def bucket_starts(times: np.ndarray, bucket_seconds: int, origin: int) -> np.ndarray:
+    """Start (epoch seconds) of the report bucket containing each time"""
+    times = np.asarray(times, dtype=np.int64)
+    return times - (times - origin) % bucket_seconds
+
+
+class FrameReadingSource:
+    """Sensor windows and anomalies held in DataFrames"""
+
+    def __init__(self, windows: pd.DataFrame, anomalies: Optional[pd.DataFrame] = None):
+        """
+        Args:
+            windows: Ingestion windows with 'sensor_id', 'window_start' (epoch
+                seconds), 'window_seconds', 'unit', 'count', 'sum', 'min', 'max'
+            anomalies: Flagged readings with 'sensor_id' and 'timestamp'
+                (epoch milliseconds)
+        """
+        self.windows = windows.sort_values('window_start', kind='stable').reset_index(drop=True)
+        self.anomalies = anomalies.sort_values('timestamp', kind='stable').reset_index(drop=True) \
+            if anomalies is not None else None
+
+    def window_aggregates(self, start: int, end: int, bucket_seconds: int, origin: int = 0,
+                          sensor_ids: Optional[List[str]] = None,
+                          active_threshold: Optional[float] = None) -> pd.DataFrame:
+        """Windows in [start, end) rolled up per sensor and report bucket"""
+        first, last = np.searchsorted(self.windows['window_start'].to_numpy(), [start, end])
+        windows = self.windows.iloc[first:last]
+        if sensor_ids is not None:
+            windows = windows[windows['sensor_id'].isin(sensor_ids)]
+        if windows.empty:
+            return empty_windows()
+
+        windows = windows.assign(
+            bucket_start=bucket_starts(windows['window_start'].to_numpy(), bucket_seconds, origin),
+            windows=1,
+            active_windows=(windows['sum'] / windows['count'] > active_threshold).astype(np.int64)
+            if active_threshold is not None else np.nan
+        )
+        return windows.groupby(['sensor_id', 'bucket_start'], sort=False).agg(
+            unit=('unit', 'last'),
+            windows=('windows', 'sum'),
+            seconds=('window_seconds', 'sum'),
+            count=('count', 'sum'),
+            sum=('sum', 'sum'),
+            min=('min', 'min'),
+            max=('max', 'max'),
+            active_windows=('active_windows', 'sum' if active_threshold is not None else 'first')
+        ).reset_index()[WINDOW_COLUMNS]
+
+    def anomaly_counts(self, start: int, end: int, bucket_seconds: int, origin: int = 0,
+                       sensor_ids: Optional[List[str]] = None) -> pd.DataFrame:
+        """Flagged readings in [start, end) counted per sensor and report bucket"""
+        if self.anomalies is None:
+            return empty_anomalies()
+
+        first, last = np.searchsorted(self.anomalies['timestamp'].to_numpy(), [start * 1000, end * 1000])
+        anomalies = self.anomalies.iloc[first:last]
+        if sensor_ids is not None:
+            anomalies = anomalies[anomalies['sensor_id'].isin(sensor_ids)]
+        if anomalies.empty:
+            return empty_anomalies()
+
+        buckets = bucket_starts(anomalies['timestamp'].to_numpy() // 1000, bucket_seconds, origin)
+        return anomalies.assign(bucket_start=buckets).groupby(
+            ['sensor_id', 'bucket_start'], sort=False
+        ).size().rename('anomalies').reset_index()
+
+
+class MongoReadingSource:
+    """Ingestion bucket documents and anomalies in MongoDB, rolled up server-side"""
+
+    def __init__(self, store):
+        """
+        Args:
+            store: MongoSensorStore the ingestion tasks write to
+        """
+        self.store = store
+
+    def window_aggregates(self, start: int, end: int, bucket_seconds: int, origin: int = 0,
+                          sensor_ids: Optional[List[str]] = None,
+                          active_threshold: Optional[float] = None) -> pd.DataFrame:
+        """Windows in [start, end) rolled up per sensor and report bucket"""
+        match: Dict[str, Any] = {'window_start': {'$gte': start, '$lt': end}}
+        if sensor_ids is not None:
+            match['sensor_id'] = {'$in': list(sensor_ids)}
+
+        group: Dict[str, Any] = {
+            '_id': {
+                'sensor_id': '$sensor_id',
+                'bucket_start': _bucket_expression('$window_start', bucket_seconds, origin)
+            },
+            'unit': {'$last': '$unit'},
+            'windows': {'$sum': 1},
+            'seconds': {'$sum': '$window_seconds'},
+            'count': {'$sum': '$count'},
+            'sum': {'$sum': '$sum'},
+            'min': {'$min': '$min'},
+            'max': {'$max': '$max'}
+        }
+        if active_threshold is not None:
+            group['active_windows'] = {'$sum': {'$cond': [
+                {'$gt': [{'$divide': ['$sum', '$count']}, active_threshold]}, 1, 0
+            ]}}
+
+        rows = list(self.store.collection.aggregate(
+            [{'$match': match}, {'$group': group}], allowDiskUse=True
+        ))
+        if not rows:
+            return empty_windows()
+
+        frame = pd.DataFrame([{**row.pop('_id'), **row} for row in rows])
+        if 'active_windows' not in frame:
+            frame['active_windows'] = np.nan
+        return frame[WINDOW_COLUMNS]
+
+    def anomaly_counts(self, start: int, end: int, bucket_seconds: int, origin: int = 0,
+                       sensor_ids: Optional[List[str]] = None) -> pd.DataFrame:
+        """Flagged readings in [start, end) counted per sensor and report bucket"""
+        if self.store.anomaly_collection is None:
+            return empty_anomalies()
+
+        match: Dict[str, Any] = {'timestamp': {'$gte': start * 1000, '$lt': end * 1000}}
+        if sensor_ids is not None:
+            match['sensor_id'] = {'$in': list(sensor_ids)}
+
+        seconds = {'$toLong': {'$floor': {'$divide': ['$timestamp', 1000]}}}
+        rows = list(self.store.anomaly_collection.aggregate([
+            {'$match': match},
+            {'$group': {
+                '_id': {'sensor_id': '$sensor_id',
+                        'bucket_start': _bucket_expression(seconds, bucket_seconds, origin)},
+                'anomalies': {'$sum': 1}
+            }}
+        ], allowDiskUse=True))
+        if not rows:
+            return empty_anomalies()
+        return pd.DataFrame([{**row['_id'], 'anomalies': row['anomalies']} for row in rows])[ANOMALY_COLUMNS]
+
+
+def _bucket_expression(seconds, bucket_seconds: int, origin: int) -> Dict[str, Any]:
+    """Aggregation expression of bucket_starts() for one field"""
+    return {'$subtract': [seconds, {'$mod': [{'$subtract': [seconds, origin]}, bucket_seconds]}]}